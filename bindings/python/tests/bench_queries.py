@@ -0,0 +1,58 @@
+"""Compare cold and warm acquisition of the compiled C++ queries.
+
+Run with ``python bindings/python/tests/bench_queries.py [rounds]``.
+"""
+
+import subprocess
+import sys
+import time
+
+import tree_sitter
+import tree_sitter_cpp
+
+NAMES = ("highlights", "injections", "tags")
+
+COLD = """
+import time
+start = time.perf_counter()
+import tree_sitter_cpp
+for name in {names!r}:
+    tree_sitter_cpp.get_query(name)
+print(time.perf_counter() - start)
+"""
+
+
+def cold():
+    """Import the binding and compile every query in a fresh interpreter."""
+    output = subprocess.check_output([sys.executable, "-c", COLD.format(names=NAMES)])
+    return float(output)
+
+
+def uncached():
+    """Build a Language and compile every query, as callers had to before."""
+    start = time.perf_counter()
+    language = tree_sitter.Language(tree_sitter_cpp.language())
+    for name in NAMES:
+        tree_sitter.Query(language, getattr(tree_sitter_cpp, f"{name.upper()}_QUERY"))
+    return time.perf_counter() - start
+
+
+def warm():
+    """Fetch every query from the process-wide cache."""
+    start = time.perf_counter()
+    for name in NAMES:
+        tree_sitter_cpp.get_query(name)
+    return time.perf_counter() - start
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name in NAMES:
+        tree_sitter_cpp.get_query(name)
+    for label, measure in (("cold process", cold), ("uncached", uncached), ("warm", warm)):
+        best = min(measure() for _ in range(rounds))
+        print(f"{label:>12}: {best * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
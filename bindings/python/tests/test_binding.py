@@ -1,6 +1,8 @@
-from unittest import TestCase
+import os
+from unittest import TestCase, skipUnless
 
 import tree_sitter, tree_sitter_cpp
+from tree_sitter_cpp import _binding
 
 
 class TestLanguage(TestCase):
@@ -9,3 +11,67 @@ class TestLanguage(TestCase):
             tree_sitter.Language(tree_sitter_cpp.language())
         except Exception:
             self.fail("Error loading C++ grammar")
+
+    def test_language_is_shared(self):
+        self.assertIs(tree_sitter_cpp.get_language(), tree_sitter_cpp.get_language())
+
+
+class TestQueries(TestCase):
+    def test_queries_are_compiled_once(self):
+        for name in ("highlights", "injections", "tags"):
+            with self.subTest(name=name):
+                query = tree_sitter_cpp.get_query(name)
+                self.assertIsInstance(query, tree_sitter.Query)
+                self.assertIs(tree_sitter_cpp.get_query(name), query)
+
+    def test_unknown_query(self):
+        with self.assertRaises(ValueError):
+            tree_sitter_cpp.get_query("locals")
+
+    @skipUnless(hasattr(os, "fork"), "requires fork")
+    def test_forked_child_reuses_queries(self):
+        query = tree_sitter_cpp.get_query("tags")
+        pid = os.fork()
+        if pid == 0:
+            try:
+                parser = tree_sitter.Parser(tree_sitter_cpp.get_language())
+                tree = parser.parse(b"class A { void f(); };")
+                reused = tree_sitter_cpp.get_query("tags") is query
+                if hasattr(tree_sitter, "QueryCursor"):
+                    captures = tree_sitter.QueryCursor(query).captures(tree.root_node)
+                else:
+                    captures = query.captures(tree.root_node)
+                os._exit(0 if reused and captures else 1)
+            finally:
+                os._exit(1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+
+
+@skipUnless(hasattr(_binding, "extract_symbols"), "built without TREE_SITTER_LIB")
+class TestExtractSymbols(TestCase):
+    def test_records(self):
+        source = b"namespace n { class A : public B { int x; void f() { int y = 0; } }; }\n#include <vector>\n"
+        self.assertEqual(_binding.extract_symbols(source), [
+            (0, "A", "n::A", 1, 15, ("B",)),
+            (2, "x", "int", 1, 40, 0),
+            (1, "f", 0, 1, 43, "void"),
+            (4, "y", "int", 1, 58),
+            (6, "<vector>"),
+        ])
+
+    def test_depth(self):
+        source = b"namespace n { class A { int x; void f() { int y = 0; } }; int g() { int z = 1; } }\n"
+        self.assertEqual(_binding.extract_symbols(source, 0), [
+            (0, "A", "n::A", 1, 15, ()),
+            (1, "n::g", -1, 1, 59, "int"),
+        ])
+        self.assertEqual(_binding.extract_symbols(source, 1), [
+            (0, "A", "n::A", 1, 15, ()),
+            (2, "x", "int", 1, 29, 0),
+            (1, "f", 0, 1, 32, "void"),
+            (1, "n::g", -1, 1, 59, "int"),
+        ])
+        self.assertEqual(_binding.extract_symbols(source, 2), _binding.extract_symbols(source))
+        with self.assertRaises(ValueError):
+            _binding.extract_symbols(source, 3)
@@ -1,9 +1,34 @@
 """C++ grammar for tree-sitter"""
 
+import os as _os
 from importlib.resources import files as _files
+from threading import Lock as _Lock
 
 from ._binding import language
 
+_QUERY_FILES = {
+    "highlights": ("HIGHLIGHTS_QUERY", "highlights.scm"),
+    "injections": ("INJECTIONS_QUERY", "injections.scm"),
+    "tags": ("TAGS_QUERY", "tags.scm"),
+}
+
+# Process-wide Language and compiled Query objects, created on first use.
+# Objects created before a fork are inherited by the child as they are, so
+# pool workers forked after a warm-up never compile anything themselves.
+_cache = {}
+_lock = _Lock()
+
+
+def _reset_lock():
+    # A fork taken while another thread holds the lock would leave it locked
+    # forever in the child.
+    global _lock
+    _lock = _Lock()
+
+
+if hasattr(_os, "register_at_fork"):
+    _os.register_at_fork(after_in_child=_reset_lock)
+
 
 def _get_query(name, file):
     query = _files(f"{__package__}.queries") / file
@@ -11,6 +36,49 @@ def _get_query(name, file):
     return globals()[name]
 
 
+def get_language():
+    """Return the process-wide ``tree_sitter.Language`` for C++.
+
+    Requires the ``tree-sitter`` package (the ``core`` extra).
+    """
+    lang = _cache.get("language")
+    if lang is None:
+        with _lock:
+            lang = _cache.get("language")
+            if lang is None:
+                from tree_sitter import Language
+
+                lang = _cache["language"] = Language(language())
+    return lang
+
+
+def get_query(name):
+    """Return the process-wide compiled ``tree_sitter.Query`` for ``name``.
+
+    ``name`` is one of ``"highlights"``, ``"injections"`` or ``"tags"``. The
+    query is compiled once per process; call this before forking worker
+    processes to share the compiled query with them. Before tree-sitter 0.25
+    a ``Query`` owns the cursor that executes it; from 0.25 on execution goes
+    through a separate ``tree_sitter.QueryCursor``. Either way, threads must
+    not run the same query (or the same cursor) concurrently; on 0.25 and
+    later give each thread its own ``QueryCursor``.
+    """
+    if name not in _QUERY_FILES:
+        raise ValueError(f"unknown query {name!r}, expected one of {', '.join(_QUERY_FILES)}")
+    query = _cache.get(name)
+    if query is None:
+        lang = get_language()
+        with _lock:
+            query = _cache.get(name)
+            if query is None:
+                from tree_sitter import Query
+
+                attr, file = _QUERY_FILES[name]
+                source = globals().get(attr) or _get_query(attr, file)
+                query = _cache[name] = Query(lang, source)
+    return query
+
+
 def __getattr__(name):
     if name == "HIGHLIGHTS_QUERY":
         return _get_query("HIGHLIGHTS_QUERY", "highlights.scm")
@@ -24,6 +92,8 @@ def __getattr__(name):
 
 __all__ = [
     "language",
+    "get_language",
+    "get_query",
     "HIGHLIGHTS_QUERY",
     "INJECTIONS_QUERY",
     "TAGS_QUERY",
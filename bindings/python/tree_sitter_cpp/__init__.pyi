@@ -1,7 +1,11 @@
-from typing import Final
+from typing import Final, Literal
+
+from tree_sitter import Language, Query
 
 HIGHLIGHTS_QUERY: Final[str]
 INJECTIONS_QUERY: Final[str]
 TAGS_QUERY: Final[str]
 
 def language() -> object: ...
+def get_language() -> Language: ...
+def get_query(name: Literal["highlights", "injections", "tags"]) -> Query: ...
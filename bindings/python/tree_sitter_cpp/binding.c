@@ -1,6 +1,14 @@
 #include <Python.h>
 
+#ifdef TREE_SITTER_CPP_EXTRACT
+#include <stdbool.h>
+#include <stdlib.h>
+#include <string.h>
+
+#include <tree_sitter/api.h>
+#else
 typedef struct TSLanguage TSLanguage;
+#endif
 
 TSLanguage *tree_sitter_cpp(void);
 
@@ -8,9 +16,657 @@ static PyObject* _binding_language(PyObject *Py_UNUSED(self), PyObject *Py_UNUSE
     return PyCapsule_New(tree_sitter_cpp(), "tree_sitter.Language", NULL);
 }
 
+#ifdef TREE_SITTER_CPP_EXTRACT
+
+/*
+ * Bulk symbol extraction for my-cpp-parser.
+ *
+ * This is a port of the walker backend of CppParser (_traverse_node and the
+ * _walk_* handlers) and produces exactly the same record tuples, so one call
+ * per file replaces a Python object per visited node.
+ */
+
+enum {
+    RECORD_CLASS = 0,
+    RECORD_METHOD = 1,
+    RECORD_FIELD = 2,
+    RECORD_GLOBAL_VAR = 3,
+    RECORD_LOCAL_VAR = 4,
+    RECORD_USING = 5,
+    RECORD_INCLUDE = 6,
+};
+
+/* Extraction depths, in the order of EXTRACTION_DEPTHS in cpp_parser.py */
+enum {
+    DEPTH_DECLARATIONS = 0,
+    DEPTH_MEMBERS = 1,
+    DEPTH_LOCALS = 2,
+};
+
+enum {
+    WALK_DECLARATIONS,
+    WALK_LOCALS,
+    WALK_NAMESPACE,
+    WALK_CLASS,
+    WALK_FUNCTION,
+    WALK_FIELD,
+};
+
+typedef struct {
+    int mode;
+    Py_ssize_t current_class;
+    int pops;
+} Frame;
+
+typedef struct {
+    const char *source;
+    int depth;
+    PyObject *records;
+    TSTreeCursor cursor;
+    /* The joined namespace and class scope, with the length before each push */
+    char *scope;
+    size_t scope_length;
+    size_t scope_capacity;
+    size_t *pushes;
+    size_t push_count;
+    size_t push_capacity;
+} Extractor;
+
+static inline bool is_type(TSNode node, const char *type) {
+    return strcmp(ts_node_type(node), type) == 0;
+}
+
+static inline bool is_type_name(TSNode node) {
+    const char *type = ts_node_type(node);
+    return strcmp(type, "primitive_type") == 0 || strcmp(type, "type_identifier") == 0 ||
+           strcmp(type, "qualified_identifier") == 0;
+}
+
+static inline bool is_class(TSNode node) {
+    const char *type = ts_node_type(node);
+    return strcmp(type, "class_specifier") == 0 || strcmp(type, "struct_specifier") == 0;
+}
+
+static inline TSNode field(TSNode node, const char *name) {
+    return ts_node_child_by_field_name(node, name, (uint32_t)strlen(name));
+}
+
+static PyObject *text(Extractor *self, TSNode node) {
+    uint32_t start = ts_node_start_byte(node);
+    return PyUnicode_DecodeUTF8(self->source + start, ts_node_end_byte(node) - start, "ignore");
+}
+
+static PyObject *scope_text(Extractor *self) {
+    return PyUnicode_DecodeUTF8(self->scope, (Py_ssize_t)self->scope_length, "ignore");
+}
+
+/* Return the scope joined with a name, as "::".join(namespace_stack + [name]) */
+static PyObject *qualified_text(Extractor *self, TSNode node) {
+    if (self->scope_length == 0) {
+        return text(self, node);
+    }
+    uint32_t start = ts_node_start_byte(node), length = ts_node_end_byte(node) - start;
+    char *buffer = PyMem_Malloc(self->scope_length + 2 + length);
+    if (buffer == NULL) {
+        return PyErr_NoMemory();
+    }
+    memcpy(buffer, self->scope, self->scope_length);
+    memcpy(buffer + self->scope_length, "::", 2);
+    memcpy(buffer + self->scope_length + 2, self->source + start, length);
+    PyObject *result = PyUnicode_DecodeUTF8(buffer, (Py_ssize_t)(self->scope_length + 2 + length), "ignore");
+    PyMem_Free(buffer);
+    return result;
+}
+
+static bool push_scope(Extractor *self, TSNode node) {
+    uint32_t start = ts_node_start_byte(node), length = ts_node_end_byte(node) - start;
+    size_t needed = self->scope_length + 2 + length;
+    if (needed > self->scope_capacity) {
+        size_t capacity = needed * 2;
+        char *scope = PyMem_Realloc(self->scope, capacity);
+        if (scope == NULL) {
+            PyErr_NoMemory();
+            return false;
+        }
+        self->scope = scope;
+        self->scope_capacity = capacity;
+    }
+    if (self->push_count == self->push_capacity) {
+        size_t capacity = self->push_capacity ? self->push_capacity * 2 : 16;
+        size_t *pushes = PyMem_Realloc(self->pushes, capacity * sizeof(size_t));
+        if (pushes == NULL) {
+            PyErr_NoMemory();
+            return false;
+        }
+        self->pushes = pushes;
+        self->push_capacity = capacity;
+    }
+    self->pushes[self->push_count++] = self->scope_length;
+    if (self->scope_length > 0) {
+        memcpy(self->scope + self->scope_length, "::", 2);
+        self->scope_length += 2;
+    }
+    memcpy(self->scope + self->scope_length, self->source + start, length);
+    self->scope_length += length;
+    return true;
+}
+
+static void pop_scope(Extractor *self, int count) {
+    if (count > 0) {
+        self->push_count -= count;
+        self->scope_length = self->pushes[self->push_count];
+    }
+}
+
+/* Append a record built by Py_BuildValue, stealing the references passed with "N" */
+static bool append(Extractor *self, PyObject *record) {
+    if (record == NULL) {
+        return false;
+    }
+    int result = PyList_Append(self->records, record);
+    Py_DECREF(record);
+    return result == 0;
+}
+
+static PyObject *optional(PyObject *value) {
+    if (value == NULL) {
+        Py_INCREF(Py_None);
+        return Py_None;
+    }
+    return value;
+}
+
+/* The handlers return -1 on error, 0 to skip the children and 1 to descend with *children */
+
+static int walk_namespace(Extractor *self, Py_ssize_t current_class, Frame *children) {
+    TSTreeCursor *cursor = &self->cursor;
+    int pushed = 0;
+    bool found = false, ok = true;
+    if (ts_tree_cursor_goto_first_child(cursor)) {
+        do {
+            TSNode child = ts_tree_cursor_current_node(cursor);
+            if (found) {
+                continue;
+            }
+            if (is_type(child, "namespace_identifier") || is_type(child, "identifier")) {
+                ok = push_scope(self, child);
+                pushed = 1;
+                found = true;
+            } else if (is_type(child, "nested_namespace_specifier")) {
+                if (ts_tree_cursor_goto_first_child(cursor)) {
+                    do {
+                        TSNode name = ts_tree_cursor_current_node(cursor);
+                        if (ok && (is_type(name, "namespace_identifier") || is_type(name, "identifier"))) {
+                            ok = push_scope(self, name);
+                            pushed += ok;
+                        }
+                    } while (ts_tree_cursor_goto_next_sibling(cursor));
+                    ts_tree_cursor_goto_parent(cursor);
+                }
+                found = true;
+            }
+        } while (ok && ts_tree_cursor_goto_next_sibling(cursor));
+        ts_tree_cursor_goto_parent(cursor);
+    }
+    if (!ok) {
+        pop_scope(self, pushed);
+        return -1;
+    }
+    *children = (Frame){WALK_NAMESPACE, current_class, pushed};
+    return 1;
+}
+
+static int walk_class(Extractor *self, TSNode node, Frame *children) {
+    TSTreeCursor *cursor = &self->cursor;
+    TSNode name = {0};
+    bool named = false;
+    PyObject *bases = PyList_New(0);
+    if (bases == NULL) {
+        return -1;
+    }
+    bool ok = true;
+    if (ts_tree_cursor_goto_first_child(cursor)) {
+        do {
+            TSNode child = ts_tree_cursor_current_node(cursor);
+            if (is_type(child, "type_identifier")) {
+                if (!named) {
+                    name = child;
+                    named = true;
+                }
+            } else if (is_type(child, "base_class_clause")) {
+                if (ts_tree_cursor_goto_first_child(cursor)) {
+                    do {
+                        TSNode base = ts_tree_cursor_current_node(cursor);
+                        if (ok && (is_type(base, "type_identifier") || is_type(base, "qualified_identifier"))) {
+                            PyObject *base_name = text(self, base);
+                            ok = base_name != NULL && PyList_Append(bases, base_name) == 0;
+                            Py_XDECREF(base_name);
+                        }
+                    } while (ts_tree_cursor_goto_next_sibling(cursor));
+                    ts_tree_cursor_goto_parent(cursor);
+                }
+            }
+        } while (ok && ts_tree_cursor_goto_next_sibling(cursor));
+        ts_tree_cursor_goto_parent(cursor);
+    }
+    if (!ok || !named) {
+        Py_DECREF(bases);
+        return ok ? 0 : -1;
+    }
+
+    Py_ssize_t class_index = PyList_Size(self->records);
+    TSPoint point = ts_node_start_point(node);
+    if (!append(self, Py_BuildValue("(iNNIIN)", RECORD_CLASS, text(self, name), qualified_text(self, name),
+                                    point.row + 1, point.column + 1, PyList_AsTuple(bases)))) {
+        Py_DECREF(bases);
+        return -1;
+    }
+    Py_DECREF(bases);
+    /* The class body is the scope of nested classes and member aliases */
+    if (!push_scope(self, name)) {
+        return -1;
+    }
+    *children = (Frame){WALK_CLASS, class_index, 1};
+    return 1;
+}
+
+static int walk_function(Extractor *self, TSNode node, Py_ssize_t current_class, Frame *children) {
+    if (current_class >= 0 && self->depth < DEPTH_MEMBERS) {
+        return 0;
+    }
+    TSTreeCursor *cursor = &self->cursor;
+    TSNode name = {0}, return_type = {0};
+    bool named = false, typed = false;
+    if (ts_tree_cursor_goto_first_child(cursor)) {
+        do {
+            TSNode child = ts_tree_cursor_current_node(cursor);
+            if (is_type(child, "function_declarator")) {
+                if (ts_tree_cursor_goto_first_child(cursor)) {
+                    do {
+                        TSNode declarator = ts_tree_cursor_current_node(cursor);
+                        if (!named && (is_type(declarator, "identifier") || is_type(declarator, "field_identifier"))) {
+                            name = declarator;
+                            named = true;
+                        }
+                    } while (ts_tree_cursor_goto_next_sibling(cursor));
+                    ts_tree_cursor_goto_parent(cursor);
+                }
+            } else if (is_type_name(child)) {
+                return_type = child;
+                typed = true;
+            }
+        } while (ts_tree_cursor_goto_next_sibling(cursor));
+        ts_tree_cursor_goto_parent(cursor);
+    }
+    if (!named) {
+        return 0;
+    }
+
+    /* Global functions are prefixed with their namespace */
+    TSPoint point = ts_node_start_point(node);
+    PyObject *method_name = current_class < 0 ? qualified_text(self, name) : text(self, name);
+    PyObject *type_name = typed ? text(self, return_type) : NULL;
+    if (typed && type_name == NULL) {
+        Py_XDECREF(method_name);
+        return -1;
+    }
+    if (!append(self, Py_BuildValue("(iNnIIN)", RECORD_METHOD, method_name, current_class,
+                                    point.row + 1, point.column + 1, optional(type_name)))) {
+        return -1;
+    }
+    /* Function bodies are skipped entirely unless locals are extracted */
+    if (self->depth < DEPTH_LOCALS) {
+        return 0;
+    }
+    *children = (Frame){WALK_FUNCTION, current_class, 0};
+    return 1;
+}
+
+static int walk_field(Extractor *self, Py_ssize_t current_class, Frame *children) {
+    if (current_class < 0) {
+        return 0;
+    }
+    TSTreeCursor *cursor = &self->cursor;
+    TSNode type_node = {0};
+    bool typed = false, nested_class = false, ok = true;
+    if (ts_tree_cursor_goto_first_child(cursor)) {
+        do {
+            TSNode child = ts_tree_cursor_current_node(cursor);
+            if (!typed) {
+                if (is_type_name(child)) {
+                    type_node = child;
+                    typed = true;
+                } else if (is_class(child)) {
+                    nested_class = true;
+                }
+            } else if (is_type(child, "field_identifier") && self->depth >= DEPTH_MEMBERS) {
+                TSPoint point = ts_node_start_point(child);
+                ok = append(self, Py_BuildValue("(iNNIIn)", RECORD_FIELD, text(self, child), text(self, type_node),
+                                                point.row + 1, point.column + 1, current_class));
+            }
+        } while (ok && ts_tree_cursor_goto_next_sibling(cursor));
+        ts_tree_cursor_goto_parent(cursor);
+    }
+    if (!ok) {
+        return -1;
+    }
+    if (!nested_class) {
+        return 0;
+    }
+    *children = (Frame){WALK_FIELD, current_class, 0};
+    return 1;
+}
+
+/* Append a record for each identifier declared by the declaration under the cursor */
+static bool walk_variables(Extractor *self, int kind) {
+    TSTreeCursor *cursor = &self->cursor;
+    TSNode type_node = {0};
+    bool typed = false, ok = true;
+    if (ts_tree_cursor_goto_first_child(cursor)) {
+        do {
+            TSNode child = ts_tree_cursor_current_node(cursor);
+            if (!typed) {
+                if (is_type_name(child)) {
+                    type_node = child;
+                    typed = true;
+                }
+            } else if (is_type(child, "init_declarator")) {
+                TSNode declarator = field(child, "declarator");
+                if (!ts_node_is_null(declarator) && is_type(declarator, "identifier")) {
+                    TSPoint point = ts_node_start_point(declarator);
+                    PyObject *name = kind == RECORD_GLOBAL_VAR ? qualified_text(self, declarator) : text(self, declarator);
+                    ok = append(self, Py_BuildValue("(iNNII)", kind, name, text(self, type_node),
+                                                    point.row + 1, point.column + 1));
+                }
+            }
+        } while (ok && ts_tree_cursor_goto_next_sibling(cursor));
+        ts_tree_cursor_goto_parent(cursor);
+    }
+    return ok;
+}
+
+static bool append_using(Extractor *self, PyObject *name, PyObject *target) {
+    if (target == NULL || (name == NULL && PyErr_Occurred())) {
+        Py_XDECREF(name);
+        Py_XDECREF(target);
+        return false;
+    }
+    return append(self, Py_BuildValue("(iNNN)", RECORD_USING, scope_text(self), optional(name), target));
+}
+
+/* The name of a type in an alias, or NULL without an exception for anonymous classes */
+static PyObject *type_text(Extractor *self, TSNode node) {
+    if (ts_node_is_null(node)) {
+        return NULL;
+    }
+    const char *type = ts_node_type(node);
+    if (strcmp(type, "class_specifier") == 0 || strcmp(type, "struct_specifier") == 0 ||
+        strcmp(type, "union_specifier") == 0 || strcmp(type, "enum_specifier") == 0) {
+        TSNode name = field(node, "name");
+        return ts_node_is_null(name) ? NULL : text(self, name);
+    }
+    return text(self, node);
+}
+
+static bool walk_using(Extractor *self, TSNode node) {
+    const char *type = ts_node_type(node);
+    if (strcmp(type, "using_declaration") == 0) {
+        bool directive = false;
+        uint32_t count = ts_node_child_count(node);
+        for (uint32_t i = 0; i < count; i++) {
+            TSNode child = ts_node_child(node, i);
+            if (is_type(child, "namespace")) {
+                directive = true;
+            } else if (is_type(child, "identifier") || is_type(child, "qualified_identifier")) {
+                uint32_t start = ts_node_start_byte(child), end = ts_node_end_byte(child);
+                if (directive) {
+                    if (!append_using(self, NULL, text(self, child))) {
+                        return false;
+                    }
+                    continue;
+                }
+                /* A using declaration introduces the last component of its qualified name */
+                const char *last = NULL;
+                for (uint32_t j = start; j + 1 < end; j++) {
+                    if (self->source[j] == ':' && self->source[j + 1] == ':') {
+                        last = self->source + j + 2;
+                    }
+                }
+                if (last != NULL) {
+                    PyObject *name = PyUnicode_DecodeUTF8(last, self->source + end - last, "ignore");
+                    if (!append_using(self, name, text(self, child))) {
+                        return false;
+                    }
+                }
+            }
+        }
+    } else if (strcmp(type, "alias_declaration") == 0) {
+        TSNode name = field(node, "name"), descriptor = field(node, "type");
+        if (ts_node_is_null(name) || ts_node_is_null(descriptor)) {
+            return true;
+        }
+        PyObject *target = type_text(self, field(descriptor, "type"));
+        if (target == NULL || PyUnicode_GetLength(target) == 0) {
+            Py_XDECREF(target);
+            return !PyErr_Occurred();
+        }
+        return append_using(self, text(self, name), target);
+    } else if (strcmp(type, "type_definition") == 0) {
+        PyObject *target = type_text(self, field(node, "type"));
+        if (target == NULL || PyUnicode_GetLength(target) == 0) {
+            Py_XDECREF(target);
+            return !PyErr_Occurred();
+        }
+        TSTreeCursor *cursor = &self->cursor;
+        bool ok = true;
+        if (ts_tree_cursor_goto_first_child(cursor)) {
+            do {
+                const char *field_name = ts_tree_cursor_current_field_name(cursor);
+                if (field_name == NULL || strcmp(field_name, "declarator") != 0) {
+                    continue;
+                }
+                /* The type name of declarators such as *FooPtr is the innermost one */
+                TSNode declarator = ts_tree_cursor_current_node(cursor);
+                while (!ts_node_is_null(declarator) && !is_type(declarator, "type_identifier")) {
+                    declarator = field(declarator, "declarator");
+                }
+                if (!ts_node_is_null(declarator)) {
+                    Py_INCREF(target);
+                    ok = append_using(self, text(self, declarator), target);
+                }
+            } while (ok && ts_tree_cursor_goto_next_sibling(cursor));
+            ts_tree_cursor_goto_parent(cursor);
+        }
+        Py_DECREF(target);
+        return ok;
+    } else if (strcmp(type, "namespace_alias_definition") == 0) {
+        TSNode name = field(node, "name");
+        uint32_t count = ts_node_named_child_count(node);
+        if (ts_node_is_null(name) || count <= 1) {
+            return true;
+        }
+        return append_using(self, text(self, name), text(self, ts_node_named_child(node, count - 1)));
+    }
+    return true;
+}
+
+static bool walk_include(Extractor *self, TSNode node) {
+    TSNode path = field(node, "path");
+    if (ts_node_is_null(path) || !(is_type(path, "string_literal") || is_type(path, "system_lib_string"))) {
+        return true;
+    }
+    return append(self, Py_BuildValue("(iN)", RECORD_INCLUDE, text(self, path)));
+}
+
+static int walk_declarations(Extractor *self, TSNode node, Py_ssize_t current_class, Frame *children) {
+    const char *type = ts_node_type(node);
+    if (strcmp(type, "namespace_definition") == 0) {
+        return walk_namespace(self, current_class, children);
+    }
+    if (strcmp(type, "class_specifier") == 0 || strcmp(type, "struct_specifier") == 0) {
+        return walk_class(self, node, children);
+    }
+    if (strcmp(type, "function_definition") == 0) {
+        return walk_function(self, node, current_class, children);
+    }
+    if (strcmp(type, "field_declaration") == 0) {
+        return walk_field(self, current_class, children);
+    }
+    if (strcmp(type, "declaration") == 0) {
+        return walk_variables(self, RECORD_GLOBAL_VAR) ? 0 : -1;
+    }
+    if (strcmp(type, "preproc_include") == 0) {
+        return walk_include(self, node) ? 0 : -1;
+    }
+    if (strcmp(type, "using_declaration") == 0 || strcmp(type, "alias_declaration") == 0 ||
+        strcmp(type, "type_definition") == 0 || strcmp(type, "namespace_alias_definition") == 0) {
+        /* typedef can define a class, so the children are walked as well */
+        if (!walk_using(self, node)) {
+            return -1;
+        }
+    }
+    *children = (Frame){WALK_DECLARATIONS, current_class, 0};
+    return 1;
+}
+
+/* Walk the tree iteratively like CppParser._traverse_node, so deep nesting cannot overflow the C stack */
+static bool walk(Extractor *self) {
+    static const char *const follow[] = {NULL, NULL, "declaration_list", "field_declaration_list",
+                                         "compound_statement", NULL};
+    TSTreeCursor *cursor = &self->cursor;
+    Frame *frames = NULL;
+    size_t frame_count = 0, frame_capacity = 0;
+    int mode = WALK_DECLARATIONS;
+    Py_ssize_t current_class = -1;
+    bool ok = true;
+
+    while (true) {
+        TSNode node = ts_tree_cursor_current_node(cursor);
+        Frame children;
+        int descend = 0;
+        if (mode == WALK_DECLARATIONS) {
+            descend = walk_declarations(self, node, current_class, &children);
+        } else if (mode == WALK_LOCALS) {
+            if (is_type(node, "declaration") && !walk_variables(self, RECORD_LOCAL_VAR)) {
+                descend = -1;
+            } else {
+                children = (Frame){WALK_LOCALS, current_class, 0};
+                descend = 1;
+            }
+        } else if (mode == WALK_FIELD) {
+            if (is_class(node)) {
+                descend = walk_class(self, node, &children);
+            }
+        } else if (is_type(node, follow[mode])) {
+            /* Namespaces, classes and functions are only entered through their bodies */
+            children = (Frame){mode == WALK_FUNCTION ? WALK_LOCALS : WALK_DECLARATIONS, current_class, 0};
+            descend = 1;
+        }
+        if (descend < 0) {
+            ok = false;
+            break;
+        }
+
+        if (descend) {
+            if (ts_tree_cursor_goto_first_child(cursor)) {
+                if (frame_count == frame_capacity) {
+                    frame_capacity = frame_capacity ? frame_capacity * 2 : 64;
+                    Frame *grown = PyMem_Realloc(frames, frame_capacity * sizeof(Frame));
+                    if (grown == NULL) {
+                        PyErr_NoMemory();
+                        ok = false;
+                        break;
+                    }
+                    frames = grown;
+                }
+                frames[frame_count++] = children;
+                mode = children.mode;
+                current_class = children.current_class;
+                continue;
+            }
+            pop_scope(self, children.pops);
+        }
+
+        /* Move to the next sibling, going back up to the parents as needed */
+        while (true) {
+            if (frame_count == 0) {
+                PyMem_Free(frames);
+                return true;
+            }
+            if (ts_tree_cursor_goto_next_sibling(cursor)) {
+                break;
+            }
+            ts_tree_cursor_goto_parent(cursor);
+            pop_scope(self, frames[--frame_count].pops);
+        }
+        mode = frames[frame_count - 1].mode;
+        current_class = frames[frame_count - 1].current_class;
+    }
+    PyMem_Free(frames);
+    return ok;
+}
+
+static PyObject* _binding_extract_symbols(PyObject *Py_UNUSED(self), PyObject *args) {
+    const char *source;
+    Py_ssize_t length;
+    int depth = DEPTH_LOCALS;
+    if (!PyArg_ParseTuple(args, "y#|i:extract_symbols", &source, &length, &depth)) {
+        return NULL;
+    }
+    if (depth < DEPTH_DECLARATIONS || depth > DEPTH_LOCALS) {
+        PyErr_SetString(PyExc_ValueError, "depth must be 0 (declarations), 1 (members) or 2 (locals)");
+        return NULL;
+    }
+    if (length > UINT32_MAX) {
+        PyErr_SetString(PyExc_ValueError, "source is too large");
+        return NULL;
+    }
+
+    TSParser *parser = ts_parser_new();
+    if (parser == NULL || !ts_parser_set_language(parser, tree_sitter_cpp())) {
+        if (parser != NULL) {
+            ts_parser_delete(parser);
+        }
+        PyErr_SetString(PyExc_RuntimeError, "incompatible tree-sitter runtime");
+        return NULL;
+    }
+    TSTree *tree;
+    Py_BEGIN_ALLOW_THREADS
+    tree = ts_parser_parse_string(parser, NULL, source, (uint32_t)length);
+    Py_END_ALLOW_THREADS
+    ts_parser_delete(parser);
+    if (tree == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "parsing failed");
+        return NULL;
+    }
+
+    Extractor extractor = {
+        .source = source,
+        .depth = depth,
+        .records = PyList_New(0),
+        .cursor = ts_tree_cursor_new(ts_tree_root_node(tree)),
+    };
+    if (extractor.records != NULL && !walk(&extractor)) {
+        Py_CLEAR(extractor.records);
+    }
+    ts_tree_cursor_delete(&extractor.cursor);
+    ts_tree_delete(tree);
+    PyMem_Free(extractor.scope);
+    PyMem_Free(extractor.pushes);
+    return extractor.records;
+}
+
+#endif
+
 static PyMethodDef methods[] = {
     {"language", _binding_language, METH_NOARGS,
      "Get the tree-sitter language for this grammar."},
+#ifdef TREE_SITTER_CPP_EXTRACT
+    {"extract_symbols", _binding_extract_symbols, METH_VARARGS,
+     "Parse C++ source bytes and return the symbol records used by my-cpp-parser.\n\n"
+     "The optional depth is 0 to extract declarations only, 1 to add class members\n"
+     "and 2 (the default) to add local variables."},
+#endif
     {NULL, NULL, 0, NULL}
 };
 
@@ -0,0 +1,728 @@
+#!/usr/bin/env python
+"""
+C++解析器的规模扩展性基准测试
+
+生成不同规模的合成C++代码库，分别测量目录解析和链接阶段的耗时，
+通过每个文件的平均耗时是否保持稳定来验证解析过程随文件数线性扩展；
+也可以测量大头文件在一次小编辑后增量重新索引的延迟，
+或者对比query和walker两种提取后端的耗时与结果，以及提取过程中每个语法树节点的内存分配；
+还可以测量符号存储中每个符号占用的内存，以及新进程从启动到解析完第一个文件的耗时。
+--suite在合成代码库、test/corpus语料和examples上测量完整流水线各阶段的耗时、吞吐量和峰值内存，
+并可以与保存的基线对比，超出容差时以非零状态退出。
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import gc
+import tracemalloc
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from cpp_parser import (CppParser, EXTRACTION_BACKENDS, GRAMMAR_DIR, RECORD_CLASS, RECORD_METHOD,
+                        RECORD_FIELD, RECORD_GLOBAL_VAR, RECORD_LOCAL_VAR, load_native_extractor)
+
+# 在已有语法树上提取的后端；native后端自己解析源码，单独比较解析加提取的总耗时
+TREE_BACKENDS = ('query', 'walker')
+
+def generate_synthetic_repo(root_dir: str, file_count: int, classes_per_file: int = 3,
+                            nesting_depth: int = 1, locals_per_function: int = 2):
+    """生成包含file_count个源文件的合成C++代码库
+
+    文件分布在多个子目录和命名空间中，类之间跨文件继承并互相引用类型，
+    使类型映射和链接阶段的规模随文件数增长。nesting_depth为每个文件中
+    命名空间的嵌套层数，locals_per_function为每个函数体中的局部变量数。
+    """
+    for i in range(file_count):
+        sub_dir = os.path.join(root_dir, f"module{i % 16}")
+        os.makedirs(sub_dir, exist_ok=True)
+        namespaces = ([f"ns{i % 8}"] + [f"level{depth}" for depth in range(1, nesting_depth)])[:nesting_depth]
+
+        lines = [f'#include "file{max(i - 1, 0)}.h"']
+        lines.extend(f"namespace {namespace} {{" for namespace in namespaces)
+        for c in range(classes_per_file):
+            base = f" : public Class{i - 1}_{c}" if i > 0 else ""
+            statements = ([f"int result = value * {c};", f"Class{i}_{c}* self = this;"] +
+                          [f"int local{k} = value + {k};" for k in range(2, locals_per_function)])
+            statements = statements[:locals_per_function] + [f"return {'result' if locals_per_function else 'value'};"]
+            lines.append(f"class Class{i}_{c}{base} {{")
+            lines.append("public:")
+            lines.append(f"    int compute{c}(int value) {{ {' '.join(statements)} }}")
+            lines.append("private:")
+            lines.append(f"    int m_value{c};")
+            lines.append(f"    Class{max(i - 1, 0)}_{c} m_previous;")
+            lines.append("};")
+        statements = (["int total = count;", "double ratio = 0.5;"] +
+                      [f"int extra{k} = count + {k};" for k in range(2, locals_per_function)])[:locals_per_function]
+        lines.append(f"Class{i}_0 g_instance{i};")
+        lines.append(f"void helper{i}(int count) {{ {' '.join(statements)} }}")
+        lines.extend(f"}} // namespace {namespace}" for namespace in reversed(namespaces))
+
+        ext = ".h" if i % 2 == 0 else ".cpp"
+        with open(os.path.join(sub_dir, f"file{i}{ext}"), "w", encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+def run_benchmark(file_count: int, jobs: int, backend: str = 'walker') -> dict:
+    """在指定规模的合成代码库上运行一次解析，返回各阶段耗时"""
+    with tempfile.TemporaryDirectory(prefix="cpp_parser_bench_") as repo_dir:
+        generate_synthetic_repo(repo_dir, file_count)
+
+        parser = CppParser(repo_dir, backend=backend)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            parser.parse_directory(jobs=jobs)
+            total = time.perf_counter() - start
+
+            # 单独测量一次链接阶段
+            start = time.perf_counter()
+            parser._link_types()
+            link = time.perf_counter() - start
+
+    return {
+        'files': file_count,
+        'total': total,
+        'link': link,
+        'per_file_ms': total / file_count * 1000,
+    }
+
+def run_backend_comparison(file_count: int) -> dict:
+    """在同一批语法树上分别运行两种提取后端，只统计提取阶段的耗时并比较结果
+
+    绑定启用了原生提取时，另外统计native后端解析加提取的总耗时，
+    与tree-sitter解析加walker提取的耗时对比，并检查其结果与walker后端一致。
+    """
+    with tempfile.TemporaryDirectory(prefix="cpp_parser_bench_") as repo_dir:
+        generate_synthetic_repo(repo_dir, file_count)
+
+        parsers = {backend: CppParser(repo_dir, backend=backend) for backend in TREE_BACKENDS}
+        native_extract = load_native_extractor()
+        timings = dict.fromkeys(TREE_BACKENDS, 0.0)
+        parse_seconds = native_seconds = 0.0
+        mismatches = native_mismatches = 0
+        for root, _, files in os.walk(repo_dir):
+            for file in files:
+                with open(os.path.join(root, file), "rb") as f:
+                    content = f.read()
+                start = time.perf_counter()
+                tree = parsers['walker'].parser.parse(content)
+                parse_seconds += time.perf_counter() - start
+                results = {}
+                for backend, parser in parsers.items():
+                    records = []
+                    start = time.perf_counter()
+                    parser._extract_node(tree.root_node, content, records)
+                    timings[backend] += time.perf_counter() - start
+                    results[backend] = records
+                if results['query'] != results['walker']:
+                    mismatches += 1
+                if native_extract is not None:
+                    start = time.perf_counter()
+                    records = native_extract(content)
+                    native_seconds += time.perf_counter() - start
+                    if records != results['walker']:
+                        native_mismatches += 1
+
+    return {
+        'files': file_count,
+        'timings': timings,
+        'mismatches': mismatches,
+        'parse': parse_seconds,
+        'native': {'seconds': native_seconds, 'mismatches': native_mismatches} if native_extract else None,
+    }
+
+def count_nodes(tree) -> int:
+    """使用TreeCursor统计语法树的节点数"""
+    cursor = tree.walk()
+    count = 1
+    depth = 0
+    while True:
+        if cursor.goto_first_child():
+            depth += 1
+            count += 1
+            continue
+        while not cursor.goto_next_sibling():
+            if depth == 0:
+                return count
+            cursor.goto_parent()
+            depth -= 1
+        count += 1
+
+def run_allocation_benchmark(file_count: int, nesting_depth: int = 20000) -> dict:
+    """测量两种提取后端在每个语法树节点上的耗时与内存分配
+
+    内存分配用两种指标衡量：提取期间tracemalloc记录的峰值临时内存（扣除保留下来的
+    记录本身），以及第0代垃圾回收的触发次数（反映容器对象的分配频率）。
+    另外生成一个深度嵌套的函数体，验证遍历不受Python递归深度限制。
+    """
+    with tempfile.TemporaryDirectory(prefix="cpp_parser_bench_") as repo_dir:
+        generate_synthetic_repo(repo_dir, file_count)
+        sources = []
+        for root, _, files in os.walk(repo_dir):
+            for file in files:
+                with open(os.path.join(root, file), "rb") as f:
+                    sources.append(f.read())
+    nested = "int main() {" + "{ int value = 1;" * nesting_depth + "}" * nesting_depth + "}\n"
+    sources.append(nested.encode('utf-8'))
+
+    parsers = {backend: CppParser(".", backend=backend) for backend in TREE_BACKENDS}
+    trees = [parsers['walker'].parser.parse(content) for content in sources]
+    node_count = sum(count_nodes(tree) for tree in trees)
+
+    gen0_collections = [0]
+    def count_collections(phase, info):
+        if phase == 'start' and info['generation'] == 0:
+            gen0_collections[0] += 1
+
+    results = {}
+    for backend, parser in parsers.items():
+        # 先单独计时，避免tracemalloc的开销影响耗时
+        start = time.perf_counter()
+        for content, tree in zip(sources, trees):
+            parser._extract_node(tree.root_node, content, [])
+        elapsed = time.perf_counter() - start
+
+        gen0_collections[0] = 0
+        gc.collect()
+        gc.callbacks.append(count_collections)
+        tracemalloc.start()
+        peak_transient = 0
+        for content, tree in zip(sources, trees):
+            tracemalloc.reset_peak()
+            records = []
+            parser._extract_node(tree.root_node, content, records)
+            current, peak = tracemalloc.get_traced_memory()
+            peak_transient += peak - current
+            del records
+        tracemalloc.stop()
+        gc.callbacks.remove(count_collections)
+
+        results[backend] = {
+            'ns_per_node': elapsed / node_count * 1e9,
+            'transient_bytes_per_node': peak_transient / node_count,
+            'gen0_per_10k_nodes': gen0_collections[0] / node_count * 10000,
+        }
+
+    return {
+        'files': file_count,
+        'nodes': node_count,
+        'nesting_depth': nesting_depth,
+        'backends': results,
+    }
+
+# 紧凑符号存储之前的符号结构，仅用于内存基准对比：
+# 普通dataclass，每个实例带字典，位置元组中保存文件路径，字符串不驻留
+@dataclass
+class LegacyVariable:
+    name: str
+    type: str
+    full_type_path: str
+    location: Tuple[str, int, int]
+    parent_class: Optional[str] = None
+
+@dataclass
+class LegacyMethod:
+    name: str
+    location: Tuple[str, int, int]
+    parent_class: Optional[str] = None
+    return_type: Optional[str] = None
+    parameters: List[LegacyVariable] = None
+    local_variables: List[LegacyVariable] = None
+
+    def __post_init__(self):
+        self.parameters = [] if self.parameters is None else self.parameters
+        self.local_variables = [] if self.local_variables is None else self.local_variables
+
+@dataclass
+class LegacyClass:
+    name: str
+    full_path: str
+    location: Tuple[str, int, int]
+    methods: List[LegacyMethod] = None
+    variables: List[LegacyVariable] = None
+    parent_classes: List[str] = None
+    base_names: List[str] = None
+
+    def __post_init__(self):
+        self.methods = [] if self.methods is None else self.methods
+        self.variables = [] if self.variables is None else self.variables
+        self.parent_classes = [] if self.parent_classes is None else self.parent_classes
+        self.base_names = list(self.parent_classes) if self.base_names is None else self.base_names
+
+def apply_records_legacy(store: dict, file_path: str, records: list):
+    """按CppParser._apply_records的方式把提取记录回放为旧的符号结构"""
+    file_classes = {}
+    current_method = None
+    for index, record in enumerate(records):
+        kind = record[0]
+        if kind == RECORD_CLASS:
+            _, class_name, full_path, line, col, bases = record
+            class_obj = LegacyClass(class_name, full_path, (file_path, line, col), parent_classes=list(bases))
+            file_classes[index] = class_obj
+            store['classes'][full_path] = class_obj
+            store['type_map'][class_name] = full_path
+            store['type_map'][full_path] = full_path
+        elif kind == RECORD_METHOD:
+            _, method_name, class_index, line, col, return_type = record
+            if class_index >= 0:
+                class_obj = file_classes[class_index]
+                current_method = LegacyMethod(method_name, (file_path, line, col), class_obj.full_path, return_type)
+                class_obj.methods.append(current_method)
+            else:
+                current_method = LegacyMethod(method_name, (file_path, line, col), return_type=return_type)
+                store['global_methods'].append(current_method)
+        elif kind == RECORD_FIELD:
+            _, var_name, type_name, line, col, class_index = record
+            class_obj = file_classes[class_index]
+            class_obj.variables.append(LegacyVariable(var_name, type_name, type_name, (file_path, line, col),
+                                                      class_obj.full_path))
+        elif kind == RECORD_GLOBAL_VAR:
+            _, var_name, type_name, line, col = record
+            store['global_variables'].append(LegacyVariable(var_name, type_name, type_name, (file_path, line, col)))
+        elif kind == RECORD_LOCAL_VAR:
+            _, var_name, type_name, line, col = record
+            current_method.local_variables.append(LegacyVariable(var_name, type_name, type_name,
+                                                                 (file_path, line, col), current_method.name))
+
+def count_symbols(classes, global_methods, global_variables) -> int:
+    """统计类、方法和变量（包括成员变量和局部变量）的总数"""
+    count = len(global_variables)
+    for method in global_methods:
+        count += 1 + len(method.local_variables)
+    for class_obj in classes:
+        count += 1 + len(class_obj.variables)
+        for method in class_obj.methods:
+            count += 1 + len(method.local_variables)
+    return count
+
+def run_memory_benchmark(file_count: int) -> dict:
+    """测量符号存储中每个符号占用的内存，对比紧凑存储与之前的dataclass结构
+
+    两种存储回放同一批提取记录，记录在回放后立即释放，
+    因此tracemalloc统计到的净增内存即为存储本身保留的内存。
+    """
+    with tempfile.TemporaryDirectory(prefix="cpp_parser_bench_") as repo_dir:
+        generate_synthetic_repo(repo_dir, file_count)
+        file_paths = sorted(os.path.join(root, file) for root, _, files in os.walk(repo_dir) for file in files)
+
+        results = {}
+        for layout in ('legacy', 'compact'):
+            parser = CppParser(repo_dir)
+            store = {'classes': {}, 'global_methods': [], 'global_variables': [], 'type_map': {}}
+            gc.collect()
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                for file_path in file_paths:
+                    records, _ = parser._extract_file(file_path)
+                    if layout == 'legacy':
+                        apply_records_legacy(store, file_path, records)
+                    else:
+                        parser._apply_records(file_path, records)
+                    del records
+            gc.collect()
+            retained = tracemalloc.get_traced_memory()[0] - baseline
+            tracemalloc.stop()
+
+            if layout == 'legacy':
+                symbols = count_symbols(store['classes'].values(), store['global_methods'], store['global_variables'])
+            else:
+                symbols = count_symbols(parser.classes.values(), parser.global_methods, parser.global_variables)
+            results[layout] = {'symbols': symbols, 'bytes': retained, 'bytes_per_symbol': retained / symbols}
+
+    return {'files': file_count, 'layouts': results}
+
+# 在新进程中测量启动各阶段耗时的脚本
+STARTUP_SCRIPT = """
+import io, sys, time, contextlib
+start = time.perf_counter()
+from cpp_parser import CppParser
+imported = time.perf_counter()
+parser = CppParser(sys.argv[1], backend=sys.argv[3])
+created = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    parser.parse_file(sys.argv[2])
+parsed = time.perf_counter()
+print(imported - start, created - imported, parsed - created)
+"""
+
+def run_startup_benchmark(rounds: int = 10, backend: str = 'walker') -> dict:
+    """在新的Python进程中测量导入、创建解析器（加载语法）和解析第一个文件的耗时
+
+    每轮都启动一个新进程，因此测量的是命令行每次调用的真实启动开销。
+    """
+    bench_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory(prefix="cpp_parser_bench_") as repo_dir:
+        generate_synthetic_repo(repo_dir, 1)
+        first_file = os.path.join(repo_dir, "module0", "file0.h")
+
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            output = subprocess.run(
+                [sys.executable, "-c", STARTUP_SCRIPT, repo_dir, first_file, backend],
+                cwd=bench_dir, capture_output=True, text=True, check=True
+            ).stdout
+            wall = time.perf_counter() - start
+            import_time, create_time, parse_time = map(float, output.split())
+            samples.append((import_time, create_time, parse_time, create_time + parse_time, wall))
+
+    medians = [sorted(column)[len(column) // 2] * 1000 for column in zip(*samples)]
+    return dict(zip(('import_ms', 'create_ms', 'parse_ms', 'first_parse_ms', 'wall_ms'), medians))
+
+def generate_large_header(line_count: int) -> bytes:
+    """生成约line_count行的单个大头文件"""
+    lines = ["#pragma once", "namespace big {"]
+    index = 0
+    while len(lines) < line_count:
+        lines.append(f"class Widget{index} {{")
+        lines.append("public:")
+        lines.append(f"    int update{index}(int delta) {{ int next = delta + {index}; return next; }}")
+        lines.append("private:")
+        lines.append(f"    int m_state{index};")
+        lines.append("};")
+        index += 1
+    lines.append("} // namespace big")
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+def run_incremental_benchmark(line_count: int, rounds: int = 20) -> dict:
+    """测量大头文件中单次小编辑后增量重新索引的延迟"""
+    with tempfile.TemporaryDirectory(prefix="cpp_parser_bench_") as repo_dir:
+        header_path = os.path.join(repo_dir, "large.h")
+        content = generate_large_header(line_count)
+        with open(header_path, "wb") as f:
+            f.write(content)
+
+        parser = CppParser(repo_dir)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            parser.reindex_file(header_path)
+            full = time.perf_counter() - start
+
+            # 在文件中部反复插入并删除一个新成员变量，模拟保存时的小改动
+            insert_at = content.index(b"private:", len(content) // 2) + len(b"private:")
+            new_text = b"\n    double m_extra;"
+            latencies = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                parser.reindex_file(header_path, [(insert_at, insert_at, new_text)])
+                latencies.append(time.perf_counter() - start)
+                parser.reindex_file(header_path, [(insert_at, insert_at + len(new_text), b"")])
+
+    latencies.sort()
+    return {
+        'lines': line_count,
+        'full_ms': full * 1000,
+        'median_ms': latencies[len(latencies) // 2] * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+# tree-sitter测试语料的用例标题分隔行和源码与期望语法树之间的分隔行
+CORPUS_HEADER = re.compile(r'^={3,}')
+CORPUS_SEPARATOR = re.compile(r'^-{3,}\s*$')
+
+# 基准测试套件的工作负载
+SUITE_WORKLOADS = ('synthetic', 'corpus', 'examples')
+
+# 与基线对比的指标，以及低于该绝对差值时不视为回退（避免毫秒级的计时噪声）
+BASELINE_METRICS = {
+    'total_s': 0.005,
+    'discover_s': 0.005,
+    'parse_s': 0.005,
+    'link_s': 0.005,
+    'report_s': 0.005,
+    'peak_rss_mb': 2.0,
+}
+
+def extract_corpus_sources(corpus_dir: str, output_dir: str) -> int:
+    """把tree-sitter测试语料（corpus_dir下的*.txt）中每个用例的源码写成单独的.cpp文件
+
+    每个用例的源码位于标题分隔行之后、"---"分隔行之前。返回写出的文件数。
+    """
+    count = 0
+    for root, dirs, files in os.walk(corpus_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if not file.endswith('.txt'):
+                continue
+            with open(os.path.join(root, file), encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            target_dir = os.path.join(output_dir, os.path.relpath(root, corpus_dir), file[:-len('.txt')])
+            os.makedirs(target_dir, exist_ok=True)
+
+            index = 0
+            while index < len(lines):
+                if not CORPUS_HEADER.match(lines[index]):
+                    index += 1
+                    continue
+                # 跳过标题，直到结束的标题分隔行
+                index += 1
+                while index < len(lines) and not CORPUS_HEADER.match(lines[index]):
+                    index += 1
+                start = index + 1
+                index = start
+                while index < len(lines) and not CORPUS_SEPARATOR.match(lines[index]):
+                    index += 1
+                with open(os.path.join(target_dir, f"case{count:04d}.cpp"), "w", encoding='utf-8') as f:
+                    f.write("\n".join(lines[start:index]) + "\n")
+                count += 1
+    return count
+
+def prepare_workloads(work_dir: str, names: List[str], file_count: int, classes_per_file: int,
+                      nesting_depth: int, locals_per_function: int) -> List[Tuple[str, str]]:
+    """在work_dir中准备基准测试套件的工作负载，返回(名称, 源码目录)列表"""
+    workloads = []
+    for name in names:
+        if name == 'synthetic':
+            source_dir = os.path.join(work_dir, 'synthetic')
+            generate_synthetic_repo(source_dir, file_count, classes_per_file, nesting_depth, locals_per_function)
+        elif name == 'corpus':
+            source_dir = os.path.join(work_dir, 'corpus')
+            extract_corpus_sources(os.path.join(GRAMMAR_DIR, 'test', 'corpus'), source_dir)
+        else:
+            source_dir = os.path.join(GRAMMAR_DIR, 'examples')
+        workloads.append((name, source_dir))
+    return workloads
+
+# 在新进程中运行一次完整流水线并输出各阶段耗时和峰值内存的脚本，
+# 每次运行使用独立的进程，峰值RSS不受之前工作负载的影响
+SUITE_SCRIPT = """
+import os, sys, json, time, tempfile
+from cpp_parser import CppParser, Profiler
+source_dir, jobs, backend = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+profiler = Profiler(count_nodes=False)
+parser = CppParser(source_dir, backend=backend, profiler=profiler)
+start = time.perf_counter()
+parser.parse_directory(jobs=jobs)
+with tempfile.TemporaryDirectory() as output_dir:
+    parser.generate_markdown(os.path.join(output_dir, 'report.md'))
+total = time.perf_counter() - start
+try:
+    import resource
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    peak = peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+except ImportError:
+    peak = None
+print(json.dumps({'total': total, 'peak_rss_mb': peak, 'summary': profiler.summary(top=0)}))
+"""
+
+def run_suite_workload(source_dir: str, jobs: int, backend: str, rounds: int) -> dict:
+    """对一个工作负载运行rounds次完整流水线（解析、链接、生成报告），返回最快一次的结果
+
+    耗时不含创建解析器（加载语法和编译查询，见--startup），吞吐量按解析到生成报告的总耗时计算；
+    峰值RSS取所有轮次中的最大值。
+    """
+    bench_dir = os.path.dirname(os.path.abspath(__file__))
+    best, peak_rss = None, None
+    for _ in range(rounds):
+        output = subprocess.run(
+            [sys.executable, "-c", SUITE_SCRIPT, source_dir, str(jobs), backend],
+            cwd=bench_dir, capture_output=True, text=True, check=True
+        ).stdout
+        sample = json.loads(output)
+        if sample['peak_rss_mb'] is not None:
+            peak_rss = max(peak_rss or 0.0, sample['peak_rss_mb'])
+        if best is None or sample['total'] < best['total']:
+            best = sample
+
+    phases = best['summary']['phases']
+    files = best['summary']['files']
+    total = best['total']
+    result = {
+        'files': files['count'],
+        'bytes': files['bytes'],
+        'total_s': total,
+        'tree_sitter_s': files['parse_seconds'],
+        'extract_s': files['extract_seconds'],
+        'merge_s': files['merge_seconds'],
+        'files_per_s': files['count'] / total,
+        'mb_per_s': files['bytes'] / 1024 / 1024 / total,
+        'peak_rss_mb': peak_rss,
+    }
+    for phase in ('discover', 'parse', 'link', 'report'):
+        result[f'{phase}_s'] = phases.get(phase, {'seconds': 0.0})['seconds']
+    return result
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """与基线逐项比较，返回超过容差的回退描述
+
+    只比较输入相同（文件数和字节数一致）的工作负载；某项指标同时超过
+    基线的(1 + tolerance)倍和BASELINE_METRICS中的绝对差值时视为回退。
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('workloads', {}).get(name)
+        if base is None:
+            print(f"基线中没有工作负载 {name}，跳过对比")
+            continue
+        if (base['files'], base['bytes']) != (result['files'], result['bytes']):
+            print(f"工作负载 {name} 的输入与基线不同（{base['files']} 个文件 {base['bytes']} 字节），跳过对比")
+            continue
+        for metric, min_delta in BASELINE_METRICS.items():
+            current, previous = result.get(metric), base.get(metric)
+            if current is None or previous is None:
+                continue
+            if current > previous * (1 + tolerance) and current - previous > min_delta:
+                regressions.append(f"{name}.{metric}: {previous:.4f} -> {current:.4f} "
+                                   f"(+{(current / previous - 1) * 100 if previous else float('inf'):.1f}%)")
+    return regressions
+
+def run_suite(args) -> int:
+    """运行基准测试套件，打印结果表格，返回进程退出状态（有回退时为1）"""
+    config = {
+        'backend': args.backend,
+        'jobs': args.jobs,
+        'synthetic': {
+            'files': args.files,
+            'classes_per_file': args.classes_per_file,
+            'nesting_depth': args.nesting_depth,
+            'locals_per_function': args.locals_per_function,
+        },
+    }
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="cpp_parser_bench_") as work_dir:
+        workloads = prepare_workloads(work_dir, args.workloads, args.files, args.classes_per_file,
+                                      args.nesting_depth, args.locals_per_function)
+        print(f"{'工作负载':>10} {'文件数':>7} {'大小(MB)':>9} {'总耗时(s)':>10} {'解析(ms)':>9} "
+              f"{'其中ts(ms)':>10} {'提取(ms)':>9} {'链接(ms)':>9} {'报告(ms)':>9} {'文件/秒':>9} "
+              f"{'MB/秒':>7} {'峰值RSS(MB)':>11}")
+        for name, source_dir in workloads:
+            result = results[name] = run_suite_workload(source_dir, args.jobs, args.backend, args.rounds)
+            peak_rss = f"{result['peak_rss_mb']:.1f}" if result['peak_rss_mb'] is not None else "-"
+            print(f"{name:>10} {result['files']:>7} {result['bytes'] / 1024 / 1024:>9.2f} {result['total_s']:>10.3f} "
+                  f"{result['parse_s'] * 1000:>9.1f} {result['tree_sitter_s'] * 1000:>10.1f} "
+                  f"{result['extract_s'] * 1000:>9.1f} {result['link_s'] * 1000:>9.1f} "
+                  f"{result['report_s'] * 1000:>9.1f} {result['files_per_s']:>9.0f} {result['mb_per_s']:>7.2f} "
+                  f"{peak_rss:>11}")
+
+    report = {'config': config, 'workloads': results}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n已保存基线: {args.save_baseline}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('config') != config:
+        print(f"\n警告: 基线的配置 {baseline.get('config')} 与本次运行不同")
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n性能回退: {len(regressions)} 项指标超过基线 {args.tolerance * 100:.0f}% 以上")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\n与基线 {args.baseline} 相比没有超过 {args.tolerance * 100:.0f}% 的回退")
+    return 0
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='C++解析器规模扩展性基准测试')
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000, 50000],
+                            help='合成代码库的文件数 (默认: 1000 5000 10000 50000)')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=1, help='并行解析的进程数 (默认: 1)')
+    arg_parser.add_argument('--backend', choices=EXTRACTION_BACKENDS, default='walker',
+                            help='符号提取后端 (默认: walker)')
+    arg_parser.add_argument('--incremental', type=int, metavar='LINES',
+                            help='改为测量LINES行大头文件的增量重新索引延迟')
+    arg_parser.add_argument('--compare-backends', type=int, metavar='FILES',
+                            help='改为在FILES个合成文件上对比两种提取后端的耗时与结果')
+    arg_parser.add_argument('--allocations', type=int, metavar='FILES',
+                            help='改为在FILES个合成文件上测量两种提取后端每个节点的耗时与内存分配')
+    arg_parser.add_argument('--startup', action='store_true',
+                            help='改为测量新进程从启动到解析完第一个文件的耗时')
+    arg_parser.add_argument('--memory', type=int, metavar='FILES',
+                            help='改为在FILES个合成文件上测量符号存储中每个符号占用的内存')
+    suite = arg_parser.add_argument_group('基准测试套件', '使用--suite时测量完整流水线并可与基线对比')
+    suite.add_argument('--suite', action='store_true',
+                       help='改为在合成代码库、test/corpus和examples上测量各阶段耗时、吞吐量和峰值内存')
+    suite.add_argument('--workloads', nargs='+', choices=SUITE_WORKLOADS, default=list(SUITE_WORKLOADS),
+                       help='要运行的工作负载 (默认: 全部)')
+    suite.add_argument('--files', type=int, default=2000, help='合成代码库的文件数 (默认: 2000)')
+    suite.add_argument('--classes-per-file', type=int, default=3, help='合成代码库每个文件的类数 (默认: 3)')
+    suite.add_argument('--nesting-depth', type=int, default=1, help='合成代码库的命名空间嵌套层数 (默认: 1)')
+    suite.add_argument('--locals-per-function', type=int, default=2,
+                       help='合成代码库每个函数的局部变量数 (默认: 2)')
+    suite.add_argument('--rounds', type=int, default=3, help='每个工作负载的运行次数，取最快一次 (默认: 3)')
+    suite.add_argument('--json', metavar='FILE', help='把结果写入JSON文件')
+    suite.add_argument('--save-baseline', metavar='FILE', help='把结果保存为基线')
+    suite.add_argument('--baseline', metavar='FILE', help='与基线对比，有指标回退时以状态1退出')
+    suite.add_argument('--tolerance', type=float, default=0.2,
+                       help='允许的相对回退比例 (默认: 0.2，即20%%)')
+    args = arg_parser.parse_args()
+
+    if args.suite:
+        sys.exit(run_suite(args))
+
+    if args.startup:
+        result = run_startup_benchmark(backend=args.backend)
+        print(f"导入模块 {result['import_ms']:.1f} ms, 创建解析器(加载语法) {result['create_ms']:.1f} ms, "
+              f"解析第一个文件 {result['parse_ms']:.1f} ms")
+        print(f"创建解析器到完成首次解析 {result['first_parse_ms']:.1f} ms, "
+              f"进程总耗时(含解释器启动) {result['wall_ms']:.1f} ms")
+        return
+
+    if args.memory:
+        result = run_memory_benchmark(args.memory)
+        names = {'legacy': '改造前', 'compact': '紧凑存储'}
+        print(f"{'符号存储':>8} {'符号数':>10} {'总内存(MB)':>11} {'每符号(B)':>10}")
+        for layout, stats in result['layouts'].items():
+            print(f"{names[layout]:>8} {stats['symbols']:>10} {stats['bytes'] / 1024 / 1024:>11.2f} "
+                  f"{stats['bytes_per_symbol']:>10.1f}")
+        ratio = result['layouts']['legacy']['bytes_per_symbol'] / result['layouts']['compact']['bytes_per_symbol']
+        print(f"紧凑存储每个符号的内存为改造前的 1/{ratio:.2f}")
+        return
+
+    if args.allocations:
+        result = run_allocation_benchmark(args.allocations)
+        print(f"{result['files']} 个合成文件加一个 {result['nesting_depth']} 层嵌套的函数体，共 {result['nodes']} 个节点")
+        print(f"{'后端':>8} {'每节点(ns)':>11} {'每节点临时内存(B)':>18} {'每万节点gen0回收':>16}")
+        for backend, stats in result['backends'].items():
+            print(f"{backend:>8} {stats['ns_per_node']:>11.1f} {stats['transient_bytes_per_node']:>18.2f} "
+                  f"{stats['gen0_per_10k_nodes']:>16.2f}")
+        return
+
+    if args.compare_backends:
+        result = run_backend_comparison(args.compare_backends)
+        for backend, seconds in result['timings'].items():
+            print(f"{backend:>8}: 提取 {result['files']} 个文件耗时 {seconds * 1000:.1f} ms")
+        ratio = result['timings']['query'] / result['timings']['walker']
+        print(f"query后端耗时为walker后端的 {ratio:.2f} 倍，结果不一致的文件数: {result['mismatches']}")
+        native = result['native']
+        if native is None:
+            print("tree_sitter_cpp绑定编译时未启用原生提取，跳过native后端")
+        else:
+            walker_total = result['parse'] + result['timings']['walker']
+            print(f"  native: 解析加提取耗时 {native['seconds'] * 1000:.1f} ms，"
+                  f"tree-sitter解析加walker提取 {walker_total * 1000:.1f} ms，"
+                  f"加速 {walker_total / native['seconds']:.2f}x，与walker结果不一致的文件数: {native['mismatches']}")
+        return
+
+    if args.incremental:
+        result = run_incremental_benchmark(args.incremental)
+        print(f"{result['lines']} 行头文件: 完整索引 {result['full_ms']:.1f} ms, "
+              f"单次编辑后增量索引 中位数 {result['median_ms']:.2f} ms, 最大 {result['max_ms']:.2f} ms")
+        return
+
+    results = []
+    print(f"{'文件数':>8} {'总耗时(s)':>10} {'链接(ms)':>10} {'每文件(ms)':>11} {'相对最小规模':>12}")
+    for file_count in sorted(args.sizes):
+        result = run_benchmark(file_count, args.jobs, args.backend)
+        results.append(result)
+        ratio = result['per_file_ms'] / results[0]['per_file_ms']
+        print(f"{result['files']:>8} {result['total']:>10.2f} {result['link'] * 1000:>10.1f} "
+              f"{result['per_file_ms']:>11.3f} {ratio:>12.2f}x")
+
+    # 线性扩展时每文件耗时应基本不随规模增长
+    ratio = results[-1]['per_file_ms'] / results[0]['per_file_ms']
+    print(f"\n最大规模与最小规模的每文件耗时之比: {ratio:.2f}x (接近1表示线性扩展)")
+
+if __name__ == "__main__":
+    main()
@@ -2,76 +2,982 @@
 import os
 import sys
 import json
+import mmap
+import ctypes
+import time
+import hashlib
+import argparse
+import contextlib
+from itertools import count
+from operator import attrgetter
 from tree_sitter import Language, Parser
 from dataclasses import dataclass
-from typing import List, Dict, Optional, Tuple, Set
-import re
+from typing import List, Dict, Optional, Tuple, Set, Iterable, Iterator, AsyncIterator
 from pathlib import Path
 import logging
 
+# 模块日志：默认只输出警告和错误，命令行的-v和-vv分别打开INFO和DEBUG
+logger = logging.getLogger('cpp_parser')
+
 # 定义数据结构
+# 大型代码库的索引中符号对象数以百万计，因此符号类使用__slots__而不是实例字典，
+# 位置只保存文件ID和行列号，文件路径统一登记在FILE_TABLE中，名称和类型字符串
+# 在创建时驻留(sys.intern)，相同的类型名和命名空间路径在内存中只保存一份
+
+class FileTable:
+    """文件路径表：把文件路径映射为整数ID，符号只保存ID"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.paths: List[str] = []
+
+    def intern(self, file_path: str) -> int:
+        """返回文件路径的ID，首次出现时登记"""
+        file_id = self.ids.get(file_path)
+        if file_id is None:
+            file_id = len(self.paths)
+            self.ids[file_path] = file_id
+            self.paths.append(file_path)
+        return file_id
+
+    def lookup(self, file_path: str) -> Optional[int]:
+        """返回已登记的文件路径的ID，未登记时返回None"""
+        return self.ids.get(file_path)
+
+    def path(self, file_id: int) -> str:
+        return self.paths[file_id]
+
+# 进程内共享的文件路径表
+FILE_TABLE = FileTable()
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+class Symbol:
+    """符号的公共部分：位置保存为(文件ID, 行, 列)，通过location属性按原有的元组形式访问"""
+    __slots__ = ('file_id', 'line', 'column')
+
+    @property
+    def location(self) -> Tuple[str, int, int]:
+        """文件路径, 行, 列"""
+        return (FILE_TABLE.path(self.file_id), self.line, self.column)
+
+    @location.setter
+    def location(self, location: Tuple[str, int, int]):
+        file_path, self.line, self.column = location
+        self.file_id = FILE_TABLE.intern(file_path)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+class Variable(Symbol):
+    __slots__ = ('name', 'type', 'full_type_path', 'parent_class')
+    _fields = ('name', 'type', 'full_type_path', 'location', 'parent_class')
+
+    def __init__(self, name: str, type: str, full_type_path: str, location: Tuple[str, int, int],
+                 parent_class: Optional[str] = None):
+        self.name = sys.intern(name)
+        self.type = sys.intern(type)
+        self.full_type_path = sys.intern(full_type_path)
+        self.location = location
+        self.parent_class = _intern(parent_class)
+
+class Method(Symbol):
+    __slots__ = ('name', 'parent_class', 'return_type', 'full_return_type', '_parameters', '_local_variables')
+    _fields = ('name', 'location', 'parent_class', 'return_type', 'full_return_type', 'parameters', 'local_variables')
+
+    def __init__(self, name: str, location: Tuple[str, int, int], parent_class: Optional[str] = None,
+                 return_type: Optional[str] = None, parameters: List[Variable] = None,
+                 local_variables: List[Variable] = None):
+        self.name = sys.intern(name)
+        self.location = location
+        self.parent_class = _intern(parent_class)
+        self.return_type = _intern(return_type)
+        # 链接阶段解析的返回类型完整路径
+        self.full_return_type = self.return_type
+        # 参数列表目前不会被填充，需要时才创建
+        self._parameters = parameters
+        # 局部变量，None表示提取深度不含局部变量、尚未收集
+        self._local_variables = local_variables
+
+    @property
+    def parameters(self) -> List[Variable]:
+        if self._parameters is None:
+            self._parameters = []
+        return self._parameters
+
+    @property
+    def local_variables(self) -> List[Variable]:
+        """局部变量；尚未收集时为空列表，可以通过CppParser.load_local_variables加载"""
+        return self._local_variables if self._local_variables is not None else []
+
+    @local_variables.setter
+    def local_variables(self, local_variables: List[Variable]):
+        self._local_variables = local_variables
+
+    @property
+    def locals_collected(self) -> bool:
+        """局部变量是否已经收集"""
+        return self._local_variables is not None
+
+class Class(Symbol):
+    __slots__ = ('name', 'full_path', 'methods', 'variables', 'parent_classes', 'base_names')
+    _fields = ('name', 'full_path', 'location', 'methods', 'variables', 'parent_classes', 'base_names')
+
+    def __init__(self, name: str, full_path: str, location: Tuple[str, int, int],
+                 methods: List[Method] = None, variables: List[Variable] = None,
+                 parent_classes: List[str] = None, base_names: Tuple[str, ...] = None):
+        self.name = sys.intern(name)
+        self.full_path = sys.intern(full_path)
+        self.location = location
+        self.methods = methods if methods is not None else []
+        self.variables = variables if variables is not None else []
+        self.parent_classes = [sys.intern(base) for base in parent_classes] if parent_classes else []
+        # 源码中书写的基类名，链接阶段据此解析parent_classes
+        if base_names is None:
+            base_names = self.parent_classes
+        self.base_names = tuple(sys.intern(base) for base in base_names)
+
+class SymbolIndex:
+    """符号的内存索引：按短名称、限定名称和文件的哈希索引，以及基类到派生类的反向继承映射
+
+    索引包含类、方法、成员变量和全局变量（局部变量通过所属方法访问），
+    随CppParser合并或撤销符号增量维护，每个桶以对象id为键，增删都是O(1)。
+    """
+
+    def __init__(self):
+        self.by_name: Dict[str, Dict[int, Symbol]] = {}
+        self.by_qualified_name: Dict[str, Dict[int, Symbol]] = {}
+        self.by_file: Dict[int, Dict[int, Symbol]] = {}
+        # 基类完整路径 -> 派生类，按类当前的parent_classes维护
+        self.subclasses_by_base: Dict[str, Dict[int, Class]] = {}
+
+    @staticmethod
+    def _names(symbol) -> Tuple[str, str]:
+        """返回符号的(短名称, 限定名称)"""
+        if isinstance(symbol, Class):
+            return symbol.name, symbol.full_path
+        if symbol.parent_class is not None:
+            return symbol.name, f"{symbol.parent_class}::{symbol.name}"
+        # 全局方法和全局变量的名称已包含命名空间前缀
+        return symbol.name.rpartition('::')[2], symbol.name
+
+    @staticmethod
+    def _members(symbols):
+        """遍历一组顶层符号及其方法和成员变量，不包括局部变量"""
+        for symbol in symbols:
+            yield symbol
+            if isinstance(symbol, Class):
+                yield from symbol.variables
+                yield from symbol.methods
+
+    def add(self, symbols):
+        """登记一组新合并的类、全局方法和全局变量（连同其成员）"""
+        for symbol in self._members(symbols):
+            key = id(symbol)
+            name, qualified_name = self._names(symbol)
+            self.by_name.setdefault(name, {})[key] = symbol
+            self.by_qualified_name.setdefault(qualified_name, {})[key] = symbol
+            self.by_file.setdefault(symbol.file_id, {})[key] = symbol
+            if isinstance(symbol, Class):
+                for base in symbol.parent_classes:
+                    self.subclasses_by_base.setdefault(base, {})[key] = symbol
+
+    def remove(self, symbols):
+        """撤销一组类、全局方法和全局变量（连同其成员）"""
+        for symbol in self._members(symbols):
+            key = id(symbol)
+            name, qualified_name = self._names(symbol)
+            _discard(self.by_name, name, key)
+            _discard(self.by_qualified_name, qualified_name, key)
+            _discard(self.by_file, symbol.file_id, key)
+            if isinstance(symbol, Class):
+                for base in symbol.parent_classes:
+                    _discard(self.subclasses_by_base, base, key)
+
+    def rebase(self, class_obj: Class, parent_classes: List[str]):
+        """链接阶段重新解析基类后，更新类的parent_classes及反向继承映射"""
+        key = id(class_obj)
+        for base in class_obj.parent_classes:
+            _discard(self.subclasses_by_base, base, key)
+        class_obj.parent_classes = parent_classes
+        for base in parent_classes:
+            self.subclasses_by_base.setdefault(base, {})[key] = class_obj
+
+    def find(self, name: str) -> List[Symbol]:
+        """按短名称（不含命名空间和所属类）查找类、方法和变量"""
+        return list(self.by_name.get(name, {}).values())
+
+    def lookup(self, qualified_name: str) -> List[Symbol]:
+        """按限定名称查找，类为完整路径，成员为"类完整路径::成员名"，全局符号为带命名空间的名称"""
+        return list(self.by_qualified_name.get(qualified_name, {}).values())
+
+    def symbols_in_file(self, file_path: str) -> List[Symbol]:
+        """文件中定义的所有类、方法和变量（不包括局部变量）"""
+        file_id = FILE_TABLE.lookup(file_path)
+        if file_id is None:
+            return []
+        return list(self.by_file.get(file_id, {}).values())
+
+    def classes(self, full_path: str) -> List[Class]:
+        """按完整路径查找类，同名类在多个文件中定义时全部返回"""
+        return [symbol for symbol in self.by_qualified_name.get(full_path, {}).values()
+                if isinstance(symbol, Class)]
+
+    def methods_of(self, full_path: str) -> List[Method]:
+        """类的所有方法"""
+        return [method for class_obj in self.classes(full_path) for method in class_obj.methods]
+
+    def subclasses(self, base: str, recursive: bool = False) -> List[Class]:
+        """直接继承base（完整路径）的类，recursive为True时包括间接派生类"""
+        if not recursive:
+            return list(self.subclasses_by_base.get(base, {}).values())
+        result: Dict[int, Class] = {}
+        pending = [base]
+        while pending:
+            for key, class_obj in self.subclasses_by_base.get(pending.pop(), {}).items():
+                if key not in result:
+                    result[key] = class_obj
+                    pending.append(class_obj.full_path)
+        return list(result.values())
+
+def _discard(buckets: dict, bucket_key, key: int):
+    """从桶中移除一项，桶为空时删除该桶"""
+    bucket = buckets.get(bucket_key)
+    if bucket is not None:
+        bucket.pop(key, None)
+        if not bucket:
+            del buckets[bucket_key]
+
+def _qualify(scope: str, name: str) -> str:
+    """把名称限定到作用域中，全局作用域为空字符串"""
+    return f"{scope}::{name}" if scope else name
+
+class TypeResolver:
+    """按作用域解析类型名的完整路径
+
+    作用域是命名空间或类的完整路径，全局作用域为空字符串，嵌套类的作用域是外层类。
+    解析时从使用处的作用域逐层向外查找，每层先找该作用域中的类型和别名
+    （typedef、using别名、using声明和命名空间别名），再找本文件在该层的
+    using namespace指令（包括经#include传递可见的头文件中的指令）引入的命名空间。各层都找不到时，如果全库只有一个该短名称
+    的类型则使用它（近似头文件中的using指令），否则保持源码原文。
+
+    结果按(文件ID, 作用域, 名称)缓存，没有using namespace指令的文件共用缓存项。
+    登记或撤销类型时只清除同短名称的缓存，以及经过别名得到的缓存；
+    命名空间集合、别名或using指令变化时清空全部缓存。
+    """
+
+    def __init__(self):
+        self.types: Dict[str, int] = {}                    # 类完整路径 -> 定义次数
+        self.short_names: Dict[str, Dict[str, int]] = {}   # 短名称 -> {类完整路径: 定义次数}
+        self.namespaces: Dict[str, int] = {}               # 类所在的各层作用域 -> 其中的类数
+        self.aliases: Dict[str, List[Tuple[int, str, str]]] = {}  # 别名完整路径 -> [(文件ID, 所在作用域, 目标原文)]
+        self.directives: Dict[Tuple[int, str], List[str]] = {}    # (文件ID, 作用域) -> [using namespace的命名空间原文]
+        self.directive_files: Dict[int, int] = {}                 # 文件ID -> 该文件的using namespace指令数
+        self.included_directives: Dict[int, Tuple[int, ...]] = {}  # 文件ID -> 经#include可见的含指令文件
+        self.usings_by_file: Dict[int, List[Tuple[str, Optional[str], str]]] = {}
+        # 短名称 -> {(文件ID, 作用域, 名称): 完整路径}；经过别名得到的结果单独存放
+        self._cache: Dict[str, Dict[Tuple[int, str, str], str]] = {}
+        self._alias_cache: Dict[Tuple[int, str, str], str] = {}
+        self._via_alias = False
+
+    def add_type(self, full_path: str):
+        """登记一个类定义"""
+        self._count_type(full_path, 1)
+
+    def remove_type(self, full_path: str):
+        """撤销一个类定义"""
+        self._count_type(full_path, -1)
+
+    def _count_type(self, full_path: str, delta: int):
+        short_name = full_path.rpartition('::')[2]
+        _count(self.types, full_path, delta)
+        paths = self.short_names.setdefault(short_name, {})
+        _count(paths, full_path, delta)
+        if not paths:
+            del self.short_names[short_name]
+        
+        scopes_changed = False
+        scope = full_path.rpartition('::')[0]
+        while scope:
+            scopes_changed |= _count(self.namespaces, scope, delta)
+            scope = scope.rpartition('::')[0]
+        if scopes_changed:
+            self._invalidate()
+        else:
+            self._cache.pop(short_name, None)
+            self._alias_cache.clear()
+
+    def add_using(self, file_id: int, entry: Tuple[str, Optional[str], str]):
+        """登记文件中的一条(作用域, 别名, 目标原文)，别名为None表示using namespace指令"""
+        scope, name, target = entry
+        if name is None:
+            self.directives.setdefault((file_id, scope), []).append(target)
+            _count(self.directive_files, file_id, 1)
+        else:
+            self.aliases.setdefault(_qualify(scope, name), []).append((file_id, scope, target))
+        self.usings_by_file.setdefault(file_id, []).append(entry)
+        self._invalidate()
+
+    def remove_usings(self, file_id: int, entries: List[Tuple[str, Optional[str], str]]):
+        """撤销文件中的若干条using指令和别名"""
+        if not entries:
+            return
+        file_entries = self.usings_by_file.get(file_id, [])
+        for entry in entries:
+            file_entries.remove(entry)
+            self._discard_using(file_id, entry)
+        if not file_entries:
+            self.usings_by_file.pop(file_id, None)
+        self._invalidate()
+
+    def remove_file(self, file_id: int) -> bool:
+        """撤销文件中的全部using指令和别名，返回是否有撤销"""
+        entries = self.usings_by_file.pop(file_id, None)
+        if not entries:
+            return False
+        for entry in entries:
+            self._discard_using(file_id, entry)
+        self._invalidate()
+        return True
+
+    def _discard_using(self, file_id: int, entry: Tuple[str, Optional[str], str]):
+        scope, name, target = entry
+        if name is None:
+            key = (file_id, scope)
+            self.directives[key].remove(target)
+            if not self.directives[key]:
+                del self.directives[key]
+            _count(self.directive_files, file_id, -1)
+        else:
+            alias = _qualify(scope, name)
+            self.aliases[alias].remove((file_id, scope, target))
+            if not self.aliases[alias]:
+                del self.aliases[alias]
+
+    def set_included_directives(self, included: Dict[int, Tuple[int, ...]]):
+        """设置每个文件经#include可见的、含using namespace指令的其他文件"""
+        if included != self.included_directives:
+            self.included_directives = included
+            self._invalidate()
+
+    def _invalidate(self):
+        self._cache.clear()
+        self._alias_cache.clear()
+
+    def _directive_file(self, file_id: int) -> int:
+        """没有可见using namespace指令的文件返回-1，共用缓存项"""
+        if file_id in self.directive_files or file_id in self.included_directives:
+            return file_id
+        return -1
+
+    def _directive_namespaces(self, file_id: int, scope: str):
+        """生成文件在scope作用域可见的using namespace指令中的命名空间原文"""
+        yield from self.directives.get((file_id, scope), ())
+        for included in self.included_directives.get(file_id, ()):
+            yield from self.directives.get((included, scope), ())
+
+    def resolve(self, name: Optional[str], scope: str = "", file_id: int = -1) -> Optional[str]:
+        """解析在file_id文件的scope作用域中书写的类型名，找不到时返回原文"""
+        if not name or name in PRIMITIVE_TYPES:
+            return name
+        file_id = self._directive_file(file_id)
+        key = (file_id, scope, name)
+        short_name = name.rpartition('::')[2]
+        bucket = self._cache.get(short_name)
+        if bucket is not None and key in bucket:
+            return bucket[key]
+        if key in self._alias_cache:
+            return self._alias_cache[key]
+        
+        self._via_alias = False
+        result = self._lookup(name, scope, file_id, 0)
+        if self._via_alias:
+            self._alias_cache[key] = result
+        else:
+            if bucket is None:
+                bucket = self._cache[short_name] = {}
+            bucket[key] = result
+        return result
+
+    def _lookup(self, name: str, scope: str, file_id: int, depth: int) -> str:
+        """从scope开始逐层向外查找name，找不到时返回原文"""
+        if name.startswith('::'):
+            name = name[2:]
+            scope = ""
+        while True:
+            found = self._find(_qualify(scope, name), depth)
+            if found is None and file_id >= 0:
+                for namespace in self._directive_namespaces(file_id, scope):
+                    found = self._find(_qualify(self._namespace(namespace, scope, depth), name), depth)
+                    if found is not None:
+                        break
+            if found is not None:
+                return found
+            if not scope:
+                break
+            scope = scope.rpartition('::')[0]
+        
+        if '::' not in name:
+            paths = self.short_names.get(name)
+            if paths is not None and len(paths) == 1:
+                return next(iter(paths))
+        return name
+
+    def _find(self, path: str, depth: int) -> Optional[str]:
+        """完整路径path是已知类型或别名时返回其解析结果，否则返回None"""
+        if path in self.types:
+            return path
+        if depth >= MAX_ALIAS_DEPTH:
+            return None
+        entries = self.aliases.get(path)
+        if entries is not None:
+            self._via_alias = True
+            file_id, scope, target = entries[-1]
+            return self._lookup(target, scope, self._directive_file(file_id), depth + 1)
+        if self.aliases and '::' in path:
+            # 前缀可能是别名，例如命名空间别名fs::path
+            head, _, tail = path.rpartition('::')
+            resolved = self._find(head, depth + 1)
+            if resolved is not None and resolved != head:
+                return self._find(f"{resolved}::{tail}", depth + 1)
+        return None
+
+    def _namespace(self, namespace: str, scope: str, depth: int) -> str:
+        """解析using namespace指令中的命名空间名"""
+        if namespace.startswith('::'):
+            return namespace[2:]
+        while True:
+            candidate = _qualify(scope, namespace)
+            if candidate in self.namespaces:
+                return candidate
+            entries = self.aliases.get(candidate)
+            if entries is not None and depth < MAX_ALIAS_DEPTH:
+                self._via_alias = True
+                _, alias_scope, target = entries[-1]
+                return self._namespace(target, alias_scope, depth + 1)
+            if not scope:
+                return namespace
+            scope = scope.rpartition('::')[0]
+
+def _count(counts: dict, key, delta: int) -> bool:
+    """调整计数，计数归零时删除该项，返回该项是否新增或被删除"""
+    value = counts.get(key, 0) + delta
+    if value:
+        counts[key] = value
+        return value == delta
+    counts.pop(key, None)
+    return True
+
 @dataclass
-class Variable:
-    name: str
-    type: str
-    full_type_path: str
-    location: Tuple[str, int, int]  # 文件路径, 行, 列
-    parent_class: Optional[str] = None
+class SourceUnit:
+    """增量索引中的一个提取单元：命名空间之外（或之内）的一个顶层声明"""
+    start_byte: int
+    end_byte: int
+    start_point: Tuple[int, int]
+    namespace: str
+    symbols: list  # 本单元合并到全局结果中的类、全局方法和全局变量对象
+    usings: list   # 本单元登记到类型解析器中的(作用域, 别名, 目标原文)
+    includes: list  # 本单元的#include路径原文
 
 @dataclass
-class Method:
-    name: str
-    location: Tuple[str, int, int]  # 文件路径, 行, 列
-    parent_class: Optional[str] = None
-    return_type: Optional[str] = None
-    parameters: List[Variable] = None
-    local_variables: List[Variable] = None
-
-    def __post_init__(self):
-        if self.parameters is None:
-            self.parameters = []
-        if self.local_variables is None:
-            self.local_variables = []
+class FileState:
+    """增量索引保存的单个文件状态"""
+    content: bytes
+    tree: object
+    units: List[SourceUnit]
 
 @dataclass
-class Class:
-    name: str
-    full_path: str
-    location: Tuple[str, int, int]  # 文件路径, 行, 列
-    methods: List[Method] = None
-    variables: List[Variable] = None
-    parent_classes: List[str] = None
-
-    def __post_init__(self):
-        if self.methods is None:
-            self.methods = []
-        if self.variables is None:
-            self.variables = []
-        if self.parent_classes is None:
-            self.parent_classes = []
+class FileProfile:
+    """性能剖析中单个文件的耗时（秒）和规模"""
+    size: int = 0
+    read: float = 0.0
+    parse: float = 0.0
+    extract: float = 0.0
+    merge: float = 0.0
+    nodes: int = 0
+    cache_hit: bool = False
+
+# 提取单元的节点类型，即_traverse_node中专门处理的声明节点
+UNIT_NODE_TYPES = ('class_specifier', 'struct_specifier', 'function_definition', 'field_declaration', 'declaration',
+                   'using_declaration', 'alias_declaration', 'type_definition', 'namespace_alias_definition',
+                   'preproc_include')
+
+# 声明别名或引入命名空间的节点类型
+USING_NODE_TYPES = ('using_declaration', 'alias_declaration', 'type_definition', 'namespace_alias_definition')
+
+# 单文件提取记录的类型。每个文件的提取结果是按遍历顺序排列的紧凑元组列表，
+# 其中的类型名均为源码原文，不依赖解析器的全局状态，因此可以在子进程中生成
+# 或从缓存加载后交给主进程合并，类型的完整路径统一在链接阶段解析：
+#   (RECORD_CLASS, 类名, 完整路径, 行, 列, (基类名, ...))
+#   (RECORD_METHOD, 方法名, 所属类记录下标或-1, 行, 列, 返回类型)
+#   (RECORD_FIELD, 变量名, 类型名, 行, 列, 所属类记录下标)
+#   (RECORD_GLOBAL_VAR, 变量名, 类型名, 行, 列)
+#   (RECORD_LOCAL_VAR, 变量名, 类型名, 行, 列)  归属于之前最近的方法记录
+#   (RECORD_USING, 作用域, 别名, 目标原文)  别名为None表示using namespace指令
+#   (RECORD_INCLUDE, 路径原文)  包括引号或尖括号，如"a/b.h"、<vector>
+RECORD_CLASS = 0
+RECORD_METHOD = 1
+RECORD_FIELD = 2
+RECORD_GLOBAL_VAR = 3
+RECORD_LOCAL_VAR = 4
+RECORD_USING = 5
+RECORD_INCLUDE = 6
+
+# 解析缓存格式版本，提取逻辑或记录格式发生变化时必须递增，使旧缓存失效
+CACHE_VERSION = 5
+
+# 不需要解析完整路径的内置类型
+PRIMITIVE_TYPES = frozenset(('int', 'char', 'float', 'double', 'bool', 'void', 'unsigned', 'signed', 'long', 'short'))
+
+# 解析别名链的最大深度，防止循环别名
+MAX_ALIAS_DEPTH = 16
+
+# walker后端的遍历模式：DECLARATIONS按节点类型分派处理函数，LOCALS只收集局部变量，
+# FIELD只进入成员声明中定义的嵌套类，其余模式只进入命名空间、类或函数的主体节点
+# （_WALK_FOLLOW中对应的节点类型）
+_WALK_DECLARATIONS = 0
+_WALK_LOCALS = 1
+_WALK_NAMESPACE = 2
+_WALK_CLASS = 3
+_WALK_FUNCTION = 4
+_WALK_FIELD = 5
+_WALK_FOLLOW = (None, None, 'declaration_list', 'field_declaration_list', 'compound_statement', None)
+
+# 不小于该大小的源文件通过只读内存映射交给tree-sitter
+MMAP_MIN_SIZE = 1 << 20
+
+# 异步解析时同时读取的文件数，NFS等高延迟存储上可以调大
+ASYNC_READ_CONCURRENCY = 16
+
+# 报告写入文件的缓冲区大小，以及每次合并写入的行数
+REPORT_BUFFER_SIZE = 1 << 20
+REPORT_BATCH_ROWS = 4096
+
+# 符号索引导出（JSONL和SQLite）的表及各表的列
+INDEX_COLUMNS = {
+    'files': ('id', 'path'),
+    'classes': ('id', 'name', 'full_path', 'file_id', 'line', 'col'),
+    'bases': ('class_id', 'position', 'name', 'full_path'),
+    'methods': ('id', 'class_id', 'name', 'return_type', 'full_return_type', 'file_id', 'line', 'col'),
+    'variables': ('id', 'scope', 'class_id', 'method_id', 'name', 'type', 'full_type_path', 'file_id', 'line', 'col'),
+}
+
+INDEX_SCHEMA = """
+CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT NOT NULL);
+CREATE TABLE classes (id INTEGER PRIMARY KEY, name TEXT NOT NULL, full_path TEXT NOT NULL,
+                      file_id INTEGER NOT NULL REFERENCES files(id), line INTEGER, col INTEGER);
+CREATE TABLE bases (class_id INTEGER NOT NULL REFERENCES classes(id), position INTEGER NOT NULL,
+                    name TEXT NOT NULL, full_path TEXT NOT NULL);
+CREATE TABLE methods (id INTEGER PRIMARY KEY, class_id INTEGER REFERENCES classes(id), name TEXT NOT NULL,
+                      return_type TEXT, full_return_type TEXT,
+                      file_id INTEGER NOT NULL REFERENCES files(id), line INTEGER, col INTEGER);
+-- scope为member（类成员）、global（全局变量）或local（局部变量）
+CREATE TABLE variables (id INTEGER PRIMARY KEY, scope TEXT NOT NULL, class_id INTEGER REFERENCES classes(id),
+                        method_id INTEGER REFERENCES methods(id), name TEXT NOT NULL, type TEXT,
+                        full_type_path TEXT, file_id INTEGER NOT NULL REFERENCES files(id),
+                        line INTEGER, col INTEGER);
+"""
+
+INDEX_INDEXES = """
+CREATE INDEX classes_name ON classes(name);
+CREATE INDEX classes_full_path ON classes(full_path);
+CREATE INDEX classes_file ON classes(file_id);
+CREATE INDEX bases_class ON bases(class_id);
+CREATE INDEX bases_full_path ON bases(full_path);
+CREATE INDEX methods_name ON methods(name);
+CREATE INDEX methods_class ON methods(class_id);
+CREATE INDEX methods_file ON methods(file_id);
+CREATE INDEX variables_name ON variables(name);
+CREATE INDEX variables_method ON variables(method_id);
+CREATE INDEX variables_file ON variables(file_id);
+"""
+
+# 性能剖析的阶段，可以对其中一个阶段单独启用cProfile或tracemalloc
+PROFILE_PHASES = ('discover', 'parse', 'link', 'report', 'export')
+
+# 性能剖析摘要中tracemalloc列出的分配位置数
+PROFILE_TOP_ALLOCATIONS = 10
+
+# 终端上进度行的最短刷新间隔（秒）
+PROGRESS_REFRESH_INTERVAL = 0.2
+
+# 输出到管道或文件时，进度日志的记录间隔（秒）
+PROGRESS_LOG_INTERVAL = 5.0
+
+# 未启用性能剖析时各阶段使用的空上下文
+_NO_PROFILE = contextlib.nullcontext()
+
+# 解析的源文件扩展名
+SOURCE_EXTENSIONS = ('.cpp', '.cc', '.cxx', '.h', '.hpp', '.hxx')
+
+# 可选的提取后端：query使用编译后的tree-sitter查询，walker为逐节点遍历语法树，
+# native在tree_sitter_cpp绑定的C代码中完成解析和遍历（需在编译绑定时启用）
+EXTRACTION_BACKENDS = ('query', 'walker', 'native')
+
+# 可选的提取深度：declarations只提取类、全局函数、全局变量、using和#include，
+# members另外提取类的方法和成员变量，locals另外提取函数体内的局部变量。
+# 前两者不进入函数体，局部变量可以之后通过load_local_variables按方法加载
+EXTRACTION_DEPTHS = ('declarations', 'members', 'locals')
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# query后端使用的符号查询
+SYMBOLS_QUERY_PATH = os.path.join(MODULE_DIR, 'queries', 'symbols.scm')
+
+# C++语法的固定版本，requirements.txt中的tree-sitter-cpp绑定固定为同一版本
+TREE_SITTER_CPP_VERSION = '0.23.4'
+# 本仓库（tree-sitter-cpp）的根目录，没有可用的Python绑定时从这里的语法源码编译语言库
+GRAMMAR_DIR = os.path.abspath(os.path.join(MODULE_DIR, '..'))
+# 编译出的语言库缓存目录（相对于本模块而不是当前工作目录），文件名包含语法源码的内容哈希
+GRAMMAR_BUILD_DIR = os.path.join(MODULE_DIR, 'build')
+
+# query后端中作为容器的捕获，以及容器对应的作用域类型
+_CONTAINER_CAPTURES = frozenset(('namespace', 'class', 'function', 'declaration', 'field'))
+_SCOPE_OPEN = 0               # 继续提取声明：文件顶层、命名空间体、具名类的类体
+_SCOPE_CLASS = 1              # 类或结构体，类名之前尚未确定是否具名
+_SCOPE_FUNCTION = 2           # 函数定义，函数名之前尚未确定是否具名
+_SCOPE_DECLARATION = 3        # 全局变量声明
+_SCOPE_FIELD = 4              # 类成员声明
+_SCOPE_LOCAL = 5              # 具名函数的函数体，只收集局部变量
+_SCOPE_LOCAL_DECLARATION = 6  # 函数体内的变量声明
+_SCOPE_CLOSED = 7             # 不再提取任何符号
+
+class ParseCache:
+    """基于文件内容哈希的磁盘解析缓存
+
+    缓存项保存单个文件的提取记录，键由文件内容与版本盐（缓存格式版本、
+    tree-sitter版本和语言库内容）共同计算得出，因此文件内容、语法或
+    提取逻辑任一变化都会自然失效。写入先落到临时文件再原子替换，
+    多个进程或CI节点可以安全地共享同一个缓存目录。
+    """
+
+    def __init__(self, cache_dir: str, language_path: str, variant: str = ""):
+        self.cache_dir = os.path.abspath(cache_dir)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.salt = self._compute_salt(language_path, variant)
+
+    @staticmethod
+    def _compute_salt(language_path: str, variant: str = "") -> bytes:
+        """计算版本盐：缓存格式版本 + tree-sitter版本 + 提取方式 + 语言库内容哈希"""
+        digest = hashlib.sha256()
+        digest.update(f"{CACHE_VERSION}:{_tree_sitter_version()}:{variant}:".encode('utf-8'))
+        with open(language_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.digest()
+
+    def key_for(self, content: bytes) -> str:
+        """计算文件内容对应的缓存键"""
+        digest = hashlib.sha256(self.salt)
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key[2:] + '.json')
+
+    def get(self, key: str) -> Optional[list]:
+        """读取缓存的提取记录，未命中或缓存项损坏时返回None"""
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        records = []
+        for record in data:
+            if record[0] == RECORD_CLASS:
+                record[5] = tuple(record[5])
+            records.append(tuple(record))
+        return records
+
+    def put(self, key: str, records: list):
+        """原子地写入一个缓存项"""
+        entry_path = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            logger.warning("写入解析缓存 %s 时出错: %s", entry_path, e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+class Progress:
+    """解析进度：已解析的文件数、速度（文件/秒）和预计剩余时间
+
+    stream是终端时用回车原地刷新同一行，并且不受日志级别影响；
+    否则（管道、CI日志）每隔PROGRESS_LOG_INTERVAL秒记录一条INFO日志，不输出控制字符。
+    """
+
+    def __init__(self, total: int, stream=None):
+        self.total = total
+        self.done = 0
+        self.stream = stream if stream is not None else sys.stderr
+        self.inline = self.stream.isatty()
+        self.enabled = self.inline or logger.isEnabledFor(logging.INFO)
+        self.interval = PROGRESS_REFRESH_INTERVAL if self.inline else PROGRESS_LOG_INTERVAL
+        self.start = self.last = time.monotonic()
+        self._line_shown = False
+    
+    def __enter__(self):
+        global _active_progress
+        _active_progress = self
+        return self
+    
+    def __exit__(self, *exc_info):
+        global _active_progress
+        _active_progress = None
+        self.clear()
+        if self.enabled and self.done:
+            elapsed = time.monotonic() - self.start
+            logger.info("已解析 %d 个文件，用时 %.1f 秒，%.1f 个文件/秒",
+                        self.done, elapsed, self.done / elapsed if elapsed > 0 else 0.0)
+    
+    def advance(self, count: int = 1):
+        """记录新解析完成的文件数，距上次输出超过刷新间隔时输出进度"""
+        self.done += count
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if now - self.last < self.interval:
+            return
+        self.last = now
+        
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        text = f"已解析 {self.done}/{self.total} 个文件 ({self.done * 100 / max(self.total, 1):.1f}%)，{rate:.1f} 个文件/秒"
+        if rate > 0 and self.done < self.total:
+            text += f"，预计剩余 {(self.total - self.done) / rate:.0f} 秒"
+        if self.inline:
+            self.stream.write(f"\r{text}\033[K")
+            self.stream.flush()
+            self._line_shown = True
+        else:
+            logger.info("%s", text)
+    
+    def clear(self):
+        """清除终端上的进度行，下次刷新时重新显示"""
+        if self._line_shown:
+            self.stream.write("\r\033[K")
+            self.stream.flush()
+            self._line_shown = False
+
+# 当前正在显示的进度，输出日志前由_clear_progress_line清除进度行
+_active_progress: Optional[Progress] = None
+
+def _clear_progress_line(record) -> bool:
+    """日志处理器的过滤器：输出日志前先清除终端上的进度行，避免日志与进度行混在一起"""
+    if _active_progress is not None:
+        _active_progress.clear()
+    return True
+
+class Profiler:
+    """按阶段和文件统计耗时的性能剖析器，只在启用性能剖析时创建
+
+    阶段耗时为主进程中的墙钟时间；逐文件记录读取、tree-sitter解析、符号提取和
+    合并的耗时以及语法树节点数，并行解析时由工作进程记录后随结果带回。
+    cprofile_phase和tracemalloc_phase分别指定只在哪个阶段内启用cProfile和tracemalloc；
+    count_nodes为False时不统计节点数，用于只需要阶段耗时的基准测试。
+    """
+
+    def __init__(self, cprofile_phase: Optional[str] = None, tracemalloc_phase: Optional[str] = None,
+                 count_nodes: bool = True):
+        self.phases: Dict[str, List[float]] = {}  # 阶段 -> [累计秒数, 次数]
+        self.files: Dict[str, FileProfile] = {}
+        self.cprofile_phase = cprofile_phase
+        self.tracemalloc_phase = tracemalloc_phase
+        self.count_nodes = count_nodes
+        self.cprofile_stats = None
+        self.allocations: Optional[dict] = None
+    
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """统计一个阶段的耗时，需要时在该阶段内启用cProfile或tracemalloc"""
+        profile = None
+        started_tracing = False
+        if name == self.tracemalloc_phase:
+            import tracemalloc
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+        if name == self.cprofile_phase:
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                self._add_cprofile(profile)
+            if name == self.tracemalloc_phase:
+                self._take_allocations(name, started_tracing)
+            totals = self.phases.setdefault(name, [0.0, 0])
+            totals[0] += elapsed
+            totals[1] += 1
+    
+    def file(self, file_path: str) -> FileProfile:
+        """返回文件的耗时记录，不存在时创建"""
+        profile = self.files.get(file_path)
+        if profile is None:
+            profile = self.files[file_path] = FileProfile()
+        return profile
+    
+    def take_files(self) -> Dict[str, FileProfile]:
+        """取出并清空已记录的文件耗时，供工作进程随结果带回主进程"""
+        files, self.files = self.files, {}
+        return files
+    
+    def merge_files(self, files: Optional[Dict[str, FileProfile]]):
+        """合并工作进程带回的文件耗时"""
+        if not files:
+            return
+        for file_path, profile in files.items():
+            merged = self.file(file_path)
+            merged.size, merged.nodes, merged.cache_hit = profile.size, profile.nodes, profile.cache_hit
+            merged.read += profile.read
+            merged.parse += profile.parse
+            merged.extract += profile.extract
+    
+    def _add_cprofile(self, profile):
+        import pstats
+        if self.cprofile_stats is None:
+            self.cprofile_stats = pstats.Stats(profile)
+        else:
+            self.cprofile_stats.add(profile)
+    
+    def _take_allocations(self, name: str, started_tracing: bool):
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+        top = snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]
+        self.allocations = {
+            'phase': name,
+            'current_bytes': current,
+            'peak_bytes': peak,
+            'top': [{'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                     'size_bytes': stat.size, 'count': stat.count} for stat in top],
+        }
+    
+    def dump_cprofile(self, output_file: str) -> bool:
+        """把cProfile结果保存为pstats文件，没有结果时返回False"""
+        if self.cprofile_stats is None:
+            return False
+        self.cprofile_stats.dump_stats(output_file)
+        return True
+    
+    def summary(self, top: int = 10, root: Optional[str] = None) -> dict:
+        """生成可序列化为JSON的剖析摘要，slowest_files为总耗时最长的top个文件"""
+        def seconds(value):
+            return round(value, 6)
+        
+        def total(profile):
+            return profile.read + profile.parse + profile.extract + profile.merge
+        
+        files = self.files.values()
+        result = {
+            'phases': {name: {'seconds': seconds(elapsed), 'calls': calls}
+                       for name, (elapsed, calls) in self.phases.items()},
+            'files': {
+                'count': len(self.files),
+                'bytes': sum(profile.size for profile in files),
+                'nodes': sum(profile.nodes for profile in files),
+                'cache_hits': sum(profile.cache_hit for profile in files),
+                'read_seconds': seconds(sum(profile.read for profile in files)),
+                'parse_seconds': seconds(sum(profile.parse for profile in files)),
+                'extract_seconds': seconds(sum(profile.extract for profile in files)),
+                'merge_seconds': seconds(sum(profile.merge for profile in files)),
+            },
+        }
+        
+        slowest = sorted(self.files.items(), key=lambda item: total(item[1]), reverse=True)[:top]
+        result['slowest_files'] = [{
+            'path': os.path.relpath(file_path, root) if root and os.path.isabs(file_path) else file_path,
+            'bytes': profile.size,
+            'nodes': profile.nodes,
+            'read_seconds': seconds(profile.read),
+            'parse_seconds': seconds(profile.parse),
+            'extract_seconds': seconds(profile.extract),
+            'merge_seconds': seconds(profile.merge),
+            'total_seconds': seconds(total(profile)),
+        } for file_path, profile in slowest]
+        
+        if self.cprofile_stats is not None:
+            entries = sorted(self.cprofile_stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+            result['cprofile'] = {
+                'phase': self.cprofile_phase,
+                'functions': [{
+                    'function': f"{os.path.basename(filename)}:{line}({function})",
+                    'calls': calls,
+                    'own_seconds': seconds(own_time),
+                    'cumulative_seconds': seconds(cumulative_time),
+                } for (filename, line, function), (_, calls, own_time, cumulative_time, _) in entries[:top]],
+            }
+        if self.allocations is not None:
+            result['tracemalloc'] = self.allocations
+        return result
 
 class CppParser:
-    def __init__(self, cpp_dir: str):
+    def __init__(self, cpp_dir: str, cache_dir: Optional[str] = None, backend: str = 'walker',
+                 profiler: Optional[Profiler] = None, depth: str = 'locals'):
         # 初始化Tree-sitter
         self.parser = Parser()
         
-        # 检查是否存在已编译的语言库
-        language_path = 'build/my-languages.so'
-        if not os.path.exists(language_path):
-            print(f"未找到编译后的语言库，正在编译...")
-            self.build_tree_sitter_lib()
-        
-        # 加载C++语言支持
-        self.language = Language(language_path, 'cpp')
+        # 加载C++语言支持，同一进程内只加载一次
+        self.language, language_path = load_cpp_language()
         self.parser.set_language(self.language)
         
+        # 符号提取后端，query后端的查询只需编译一次
+        if backend not in EXTRACTION_BACKENDS:
+            raise ValueError(f"未知的提取后端: {backend}，可选: {', '.join(EXTRACTION_BACKENDS)}")
+        if depth not in EXTRACTION_DEPTHS:
+            raise ValueError(f"未知的提取深度: {depth}，可选: {', '.join(EXTRACTION_DEPTHS)}")
+        self.symbol_query = None
+        self.native_extract = None
+        if backend == 'native':
+            self.native_extract = load_native_extractor()
+            if self.native_extract is None:
+                logger.warning("tree_sitter_cpp绑定编译时未启用原生提取，改用walker后端")
+                backend = 'walker'
+        if backend == 'query' and depth != 'locals':
+            # 查询引擎总会访问整棵语法树，无法跳过函数体，只有遍历器能受益于较浅的提取深度
+            logger.debug("提取深度为%s时使用walker后端", depth)
+            backend = 'walker'
+        self.backend = backend
+        cache_variant = backend
+        if backend == 'query':
+            self.symbol_query, query_digest = load_symbol_query()
+            cache_variant = f"{backend}:{query_digest}"
+        
+        # 提取深度，只有locals深度进入函数体
+        self.depth = depth
+        self.depth_level = EXTRACTION_DEPTHS.index(depth)
+        self.collect_members = depth != 'declarations'
+        self.collect_locals = depth == 'locals'
+        if not self.collect_locals:
+            cache_variant = f"{cache_variant}:{depth}"
+        
         # 存储结果
         self.classes: Dict[str, Class] = {}
         self.global_variables: List[Variable] = []
         self.global_methods: List[Method] = []
         
-        # 存储包含路径映射
-        self.include_map: Dict[str, str] = {}
+        # 按名称、文件和基类查询符号的索引，随符号的合并和撤销增量维护
+        self.index = SymbolIndex()
+        
+        # 每个文件中#include的路径原文，以及据此解析出的文件级包含关系图（按需构建）
+        self.include_map: Dict[str, List[str]] = {}
+        self._include_graph: Optional[Dict[str, List[str]]] = None
         
         # 代码根目录
         self.cpp_dir = os.path.abspath(cpp_dir)
@@ -79,439 +985,1654 @@ class CppParser:
         # 已处理的文件集合
         self.processed_files: Set[str] = set()
         
-        # 类型映射，用于解析类型完整路径
-        self.type_map: Dict[str, str] = {}
+        # 按作用域解析类型完整路径的解析器
+        self.resolver = TypeResolver()
         
-        # 命名空间栈
-        self.namespace_stack: List[str] = []
+        # 是否有新合并的记录尚未经过链接阶段
+        self._needs_link = False
         
-    @staticmethod
-    def build_tree_sitter_lib():
-        """编译Tree-sitter C++语言支持"""
-        from tree_sitter import Language
-        import os
+        # 增量索引的文件状态（源码、语法树和提取单元），只保存通过reindex_file索引的文件
+        self.file_states: Dict[str, FileState] = {}
         
-        print("开始编译Tree-sitter C++语言支持...")
+        # 命名空间栈
+        self.namespace_stack: List[str] = []
         
-        # 确保build目录存在
-        build_dir = "build"
-        language_so = os.path.join(build_dir, "my-languages.so")
-        os.makedirs(build_dir, exist_ok=True)
+        # 基于内容哈希的解析缓存，未指定缓存目录时不启用
+        self.cache_dir = cache_dir
+        self.cache: Optional[ParseCache] = ParseCache(cache_dir, language_path, cache_variant) if cache_dir else None
+        self.cache_hits = 0
+        self.cache_misses = 0
         
-        # 获取当前脚本目录和tree-sitter-cpp目录的绝对路径
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        tree_sitter_cpp_dir = os.path.abspath(os.path.join(current_dir, '..'))
+        # 性能剖析器，未启用时为None
+        self.profiler = profiler
         
-        print(f"当前目录: {current_dir}")
-        print(f"tree-sitter-cpp目录: {tree_sitter_cpp_dir}")
+    @staticmethod
+    def build_tree_sitter_lib() -> str:
+        """从本仓库的语法源码编译Tree-sitter C++语言库，返回语言库路径
+
+        语言库按语法源码和tree-sitter版本的内容哈希缓存在GRAMMAR_BUILD_DIR中，
+        缓存存在时直接返回，不再重新编译。
+        """
+        src_dir = os.path.join(GRAMMAR_DIR, 'src')
+        parser_c = os.path.join(src_dir, 'parser.c')
+        if not os.path.exists(parser_c):
+            raise FileNotFoundError(
+                f"找不到语法源码: {parser_c}，请先运行tree-sitter generate生成，"
+                f"或安装tree-sitter-cpp=={TREE_SITTER_CPP_VERSION}")
         
-        # 检查源文件是否存在
-        grammar_js = os.path.join(tree_sitter_cpp_dir, "grammar.js")
-        if not os.path.exists(grammar_js):
-            print(f"错误: 找不到grammar.js文件: {grammar_js}")
-            raise FileNotFoundError(f"找不到grammar.js文件: {grammar_js}")
+        # 缓存键：tree-sitter版本 + 参与编译的全部源文件内容
+        sources = [parser_c]
+        for name in ('scanner.c', 'scanner.cc'):
+            if os.path.exists(os.path.join(src_dir, name)):
+                sources.append(os.path.join(src_dir, name))
+        header_dir = os.path.join(src_dir, 'tree_sitter')
+        if os.path.isdir(header_dir):
+            sources.extend(os.path.join(header_dir, name) for name in sorted(os.listdir(header_dir)))
+        digest = hashlib.sha256(_tree_sitter_version().encode('utf-8'))
+        for source in sources:
+            digest.update(os.path.relpath(source, src_dir).encode('utf-8'))
+            with open(source, 'rb') as f:
+                digest.update(f.read())
+        language_so = os.path.join(GRAMMAR_BUILD_DIR, f"cpp-{digest.hexdigest()[:16]}.so")
+        if os.path.exists(language_so):
+            return language_so
         
-        # 编译语言库
+        logger.info("开始编译Tree-sitter C++语言支持...")
+        os.makedirs(GRAMMAR_BUILD_DIR, exist_ok=True)
+        # 先编译到临时文件再原子替换，并发启动的进程不会加载到不完整的语言库
+        temp_path = f"{language_so}.{os.getpid()}.tmp"
         try:
-            Language.build_library(
-                language_so,
-                [tree_sitter_cpp_dir]
-            )
-            print(f"Tree-sitter C++语言库编译成功: {language_so}")
-            return language_so
+            Language.build_library(temp_path, [GRAMMAR_DIR])
+            os.replace(temp_path, language_so)
         except Exception as e:
-            print(f"编译Tree-sitter C++语言库时出错: {e}")
+            logger.error("编译Tree-sitter C++语言库时出错: %s", e)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
             raise
+        logger.info("Tree-sitter C++语言库编译成功: %s", language_so)
+        return language_so
     
     def parse_file(self, file_path: str):
         """解析单个C++源文件"""
         if file_path in self.processed_files:
             return
         
-        print(f"正在解析文件: {file_path}")
+        logger.debug("正在解析文件: %s", file_path)
         
         self.processed_files.add(file_path)
         
+        records, cache_hit = self._extract_file(file_path)
+        self._count_cache_result(cache_hit)
+        self._merge_records(file_path, records)
+    
+    def _phase(self, name: str):
+        """返回统计一个阶段耗时的上下文，未启用性能剖析时为空上下文"""
+        if self.profiler is None:
+            return _NO_PROFILE
+        return self.profiler.phase(name)
+    
+    def _merge_records(self, file_path: str, records: list, symbols: Optional[list] = None):
+        """合并一个文件的提取记录并标记需要重新链接，启用性能剖析时记录合并耗时"""
+        profiler = self.profiler
+        if profiler is None:
+            self._apply_records(file_path, records, symbols)
+        else:
+            start = time.perf_counter()
+            self._apply_records(file_path, records, symbols)
+            profiler.file(file_path).merge += time.perf_counter() - start
+        self._needs_link = True
+    
+    def parse_buffers(self, buffers: Iterable[Tuple[str, bytes]], jobs: int = 1) -> Iterator[Tuple[str, list]]:
+        """解析内存中的源码，逐个产出(名称, 新增的类、全局方法和全局变量)
+
+        buffers是(名称, 源码字节)的任意可迭代对象，按需逐个消费，不读写文件系统。
+        每个缓冲区的语法树在提取完成后立即释放，峰值内存不随批次大小增长。
+        名称已解析过时先撤销旧的符号。类型的完整路径仍由链接阶段统一解析，
+        生成报告或导出时会自动链接。jobs大于1时由工作进程解析，
+        每个进程复用自己的Parser，在途的缓冲区不超过jobs的两倍。
+        """
+        if jobs > 1:
+            results = self._extract_buffers_parallel(buffers, jobs)
+        else:
+            results = ((name, self._extract_content(content, name)) for name, content in buffers)
+        
+        for name, (records, cache_hit) in results:
+            logger.debug("正在解析缓冲区: %s", name)
+            if name in self.processed_files:
+                self._retract_file(name)
+            self.processed_files.add(name)
+            self._count_cache_result(cache_hit)
+            symbols = []
+            self._merge_records(name, records, symbols)
+            yield name, symbols
+    
+    def _extract_buffers_parallel(self, buffers: Iterable[Tuple[str, bytes]], jobs: int):
+        """在进程池中提取缓冲区，按输入顺序产出(名称, (提取记录, 是否命中缓存))"""
+        from collections import deque
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=self._worker_initargs()) as executor:
+            in_flight = deque()
+            for name, content in buffers:
+                in_flight.append((name, executor.submit(_extract_buffer_in_worker, name, content)))
+                if len(in_flight) >= jobs * 2:
+                    name, future = in_flight.popleft()
+                    yield name, self._take_worker_result(future)
+            while in_flight:
+                name, future = in_flight.popleft()
+                yield name, self._take_worker_result(future)
+    
+    def _worker_initargs(self) -> tuple:
+        """工作进程初始化参数，启用性能剖析时工作进程也记录各文件耗时"""
+        profiler = self.profiler
+        return (self.cpp_dir, self.cache_dir, self.backend,
+                profiler is not None, profiler is None or profiler.count_nodes, self.depth)
+    
+    def _take_worker_result(self, future):
+        """取出工作进程的结果，并合并随结果带回的文件耗时"""
+        result, file_profiles = future.result()
+        if self.profiler is not None:
+            self.profiler.merge_files(file_profiles)
+        return result
+    
+    def _extract_file(self, file_path: str) -> Tuple[list, bool]:
+        """读取并解析单个文件，返回按遍历顺序排列的提取记录及是否命中缓存
+
+        该方法只使用本实例的Parser和缓存，不读写类、方法、变量等全局结果，
+        既用于串行解析，也在并行模式下于工作进程中调用。
+        大文件通过只读内存映射交给tree-sitter，不再整体读入一份bytes副本。
+        """
         try:
+            if self.profiler is not None:
+                return self._extract_file_profiled(file_path)
             with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < MMAP_MIN_SIZE:
+                    return self._extract_content(f.read(), file_path)
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                    return self._extract_content(content, file_path)
+        except Exception as e:
+            logger.warning("解析文件 %s 时出错: %s", file_path, e)
+            return [], False
+    
+    def _extract_file_profiled(self, file_path: str) -> Tuple[list, bool]:
+        """与_extract_file相同，另外记录读取文件（或建立内存映射）的耗时"""
+        start = time.perf_counter()
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < MMAP_MIN_SIZE:
                 content = f.read()
+                self.profiler.file(file_path).read += time.perf_counter() - start
+                return self._extract_content(content, file_path)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                self.profiler.file(file_path).read += time.perf_counter() - start
+                return self._extract_content(content, file_path)
+    
+    def _extract_content(self, content, name: str) -> Tuple[list, bool]:
+        """解析一段源码，返回按遍历顺序排列的提取记录及是否命中缓存
+
+        content可以是bytes或mmap等支持缓冲区协议的对象。提取时只切片并解码
+        名称和类型所在的字节范围，不会解码整个文件。
+        """
+        records = []
+        try:
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.key_for(content)
+                cached_records = self.cache.get(cache_key)
+                if cached_records is not None:
+                    if self.profiler is not None:
+                        profile = self.profiler.file(name)
+                        profile.size, profile.cache_hit = len(content), True
+                    return cached_records, True
             
-            tree = self.parser.parse(content)
-            root_node = tree.root_node
-            
-            # 重置当前文件的命名空间栈
-            self.namespace_stack = []
+            if self.profiler is not None:
+                return self._extract_content_profiled(content, name, cache_key)
             
-            # 解析文件
-            self._traverse_node(root_node, content, file_path)
+            if self.native_extract is not None:
+                # 解析和遍历都在C代码中完成，一次调用得到整个文件的记录。
+                # 绑定使用受限API，只接受bytes，内存映射的大文件在这里复制一份
+                records = self.native_extract(bytes(content), self.depth_level)
+            else:
+                tree = self.parser.parse(content)
+                
+                # 提取完成后立即释放语法树，不保留到下一个文件
+                self._extract_node(tree.root_node, content, records)
+                del tree
             
-            # 文件解析完成后，修复可能缺失的命名空间信息
-            self._fix_missing_namespaces()
+            # 只缓存完整提取成功的结果
+            if cache_key is not None:
+                self.cache.put(cache_key, records)
             
         except Exception as e:
-            print(f"解析文件 {file_path} 时出错: {e}")
-    
-    def _traverse_node(self, node, content: bytes, file_path: str, current_class: Optional[Class] = None):
-        """遍历语法树节点"""
-        # 检查节点类型
-        if node.type == 'namespace_definition':
-            # 查找命名空间名称
-            namespace_name = None
-            for child in node.children:
-                if child.type == 'identifier':
-                    namespace_name = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
-                    self.namespace_stack.append(namespace_name)
-                    print(f"进入命名空间: {namespace_name}, 当前栈: {self.namespace_stack}")
-                    break
-            
-            # 处理命名空间内的声明
-            for child in node.children:
-                if child.type == 'declaration_list':
-                    for decl in child.children:
-                        self._traverse_node(decl, content, file_path, current_class)
-                    break
-            
-            # 退出命名空间
-            if namespace_name:
-                self.namespace_stack.pop()
+            logger.warning("解析文件 %s 时出错: %s", name, e)
         
-        elif node.type == 'class_specifier' or node.type == 'struct_specifier':
-            # 处理类定义
-            class_name = None
-            for child in node.children:
-                if child.type == 'type_identifier':
-                    class_name = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
-                    break
-            
-            if class_name:
-                # 查找基类
-                base_classes = []
-                for child in node.children:
-                    if child.type == 'base_class_clause':
-                        for base_child in child.children:
-                            if base_child.type == 'type_identifier':
-                                base_name = content[base_child.start_byte:base_child.end_byte].decode('utf-8', errors='ignore')
-                                # 尝试使用完整路径
-                                if base_name in self.type_map:
-                                    base_name = self.type_map[base_name]
-                                base_classes.append(base_name)
-                            elif base_child.type == 'qualified_identifier':
-                                base_name = content[base_child.start_byte:base_child.end_byte].decode('utf-8', errors='ignore')
-                                base_classes.append(base_name)
-                
-                # 创建完整路径，确保包含命名空间
-                ns_prefix = '::'.join(self.namespace_stack) if self.namespace_stack else ""
-                full_path = f"{ns_prefix}::{class_name}" if ns_prefix else class_name
-                
-                print(f"找到类: {class_name}, 命名空间: {ns_prefix}, 完整路径: {full_path}")
+        return records, False
+    
+    def _extract_content_profiled(self, content, name: str, cache_key: Optional[str]) -> Tuple[list, bool]:
+        """与_extract_content的解析和提取部分相同，另外记录各步耗时和语法树节点数
+
+        节点数在计时之外单独统计，不计入解析和提取的耗时。
+        """
+        records = []
+        profile = self.profiler.file(name)
+        start = time.perf_counter()
+        if self.native_extract is not None:
+            # 原生提取无法分开统计解析和提取，全部计入提取耗时，也不统计节点数
+            records = self.native_extract(bytes(content), self.depth_level)
+            profile.extract += time.perf_counter() - start
+            profile.size = len(content)
+            if cache_key is not None:
+                self.cache.put(cache_key, records)
+            return records, False
+        tree = self.parser.parse(content)
+        parsed = time.perf_counter()
+        self._extract_node(tree.root_node, content, records)
+        profile.parse += parsed - start
+        profile.extract += time.perf_counter() - parsed
+        profile.size = len(content)
+        if self.profiler.count_nodes:
+            profile.nodes = _count_nodes(tree.root_node)
+        del tree
+        
+        if cache_key is not None:
+            self.cache.put(cache_key, records)
+        return records, False
+    
+    def _count_cache_result(self, cache_hit: bool):
+        """统计缓存命中情况"""
+        if self.cache is None:
+            return
+        if cache_hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+    
+    def _apply_records(self, file_path: str, records: list, symbols: Optional[list] = None,
+                       usings: Optional[list] = None, includes: Optional[list] = None):
+        """按顺序回放单个文件的提取记录，合并到类、全局方法和全局变量中
+
+        类型名在此保持源码原文，完整路径由链接阶段_link_types统一解析。
+        如果传入symbols，新建的类、全局方法和全局变量对象会依次追加到其中；
+        usings和includes分别收集登记到类型解析器的using指令和别名，以及#include路径。
+        """
+        self._include_graph = None
+        # 本文件中的类对象，按类记录下标索引
+        file_classes: Dict[int, Class] = {}
+        current_method = None
+        new_symbols = []
+        debug = logger.isEnabledFor(logging.DEBUG)
+        
+        for index, record in enumerate(records):
+            kind = record[0]
+            if kind == RECORD_CLASS:
+                _, class_name, full_path, line, col, bases = record
+                if debug:
+                    logger.debug("找到类: %s, 完整路径: %s", class_name, full_path)
                 
                 # 创建类对象
                 class_obj = Class(
                     name=class_name,
                     full_path=full_path,
-                    location=(file_path, node.start_point[0] + 1, node.start_point[1] + 1),
-                    parent_classes=base_classes
+                    location=(file_path, line, col),
+                    parent_classes=list(bases)
                 )
-                
-                # 存储类对象
-                self.classes[full_path] = class_obj
-                
-                # 将类名映射到完整路径 - 这很重要，用于正确引用类型
-                self.type_map[class_name] = full_path
-                
-                # 如果我们有命名空间，也添加一个从完整名称到类型的映射
-                if ns_prefix:
-                    qualified_name = f"{ns_prefix}::{class_name}"
-                    self.type_map[qualified_name] = full_path
-                
-                # 处理类内部的字段和方法
-                for child in node.children:
-                    if child.type == 'field_declaration_list':
-                        for field in child.children:
-                            self._traverse_node(field, content, file_path, class_obj)
-        
-        elif node.type == 'function_definition':
-            # 处理函数/方法定义
-            method_name = None
-            return_type = None
-            method_obj = None
-            # 查找方法名
-            for child in node.children:
-                if child.type == 'function_declarator':
-                    for decl_child in child.children:
-                        if decl_child.type in ['identifier', 'field_identifier']:
-                            method_name = content[decl_child.start_byte:decl_child.end_byte].decode('utf-8', errors='ignore')
-                            break
-                elif child.type in ['primitive_type', 'type_identifier', 'qualified_identifier']:
-                    return_type = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
-            if method_name:
-                # 创建方法对象
-                if current_class:
+                file_classes[index] = class_obj
+                self._register_class(class_obj)
+                self.resolver.add_type(full_path)
+                new_symbols.append(class_obj)
+            
+            elif kind == RECORD_METHOD:
+                _, method_name, class_index, line, col, return_type = record
+                if class_index >= 0:
                     # 类方法
-                    method = Method(
+                    class_obj = file_classes[class_index]
+                    current_method = Method(
                         name=method_name,
-                        location=(file_path, node.start_point[0] + 1, node.start_point[1] + 1),
-                        parent_class=current_class.full_path,
-                        return_type=return_type
+                        location=(file_path, line, col),
+                        parent_class=class_obj.full_path,
+                        return_type=return_type,
+                        local_variables=[] if self.collect_locals else None
                     )
-                    current_class.methods.append(method)
-                    method_obj = method
+                    class_obj.methods.append(current_method)
                 else:
                     # 全局方法
-                    ns_prefix = '::'.join(self.namespace_stack) if self.namespace_stack else ""
-                    full_name = f"{ns_prefix}::{method_name}" if ns_prefix else method_name
-                    method = Method(
-                        name=full_name,
-                        location=(file_path, node.start_point[0] + 1, node.start_point[1] + 1),
-                        return_type=return_type
+                    current_method = Method(
+                        name=method_name,
+                        location=(file_path, line, col),
+                        return_type=return_type,
+                        local_variables=[] if self.collect_locals else None
                     )
-                    self.global_methods.append(method)
-                    method_obj = method
-            # 递归遍历函数体，收集局部变量
-            for child in node.children:
-                if child.type == 'compound_statement' and method_obj is not None:
-                    self._collect_local_variables(child, content, file_path, method_obj)
-        
-        elif node.type == 'field_declaration':
-            # 处理类成员变量
-            if current_class:
-                type_name = None
-                for child in node.children:
-                    if child.type in ['primitive_type', 'type_identifier', 'qualified_identifier']:
-                        type_name = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
-                        break
-                
-                if type_name:
-                    # 尝试使用完整的类型路径
-                    full_type = type_name
-                    if type_name in self.type_map:
-                        full_type = self.type_map[type_name]
-                    
-                    # 查找变量名
-                    for child in node.children:
-                        if child.type == 'field_identifier':
-                            var_name = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
-                            
-                            var = Variable(
-                                name=var_name,
-                                type=type_name,
-                                full_type_path=full_type,
-                                location=(file_path, child.start_point[0] + 1, child.start_point[1] + 1),
-                                parent_class=current_class.full_path
-                            )
-                            current_class.variables.append(var)
-        
-        elif node.type == 'declaration':
-            # 处理变量声明
-            type_name = None
-            for child in node.children:
-                if child.type in ['primitive_type', 'type_identifier', 'qualified_identifier']:
-                    type_name = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
-                    break
+                    self.global_methods.append(current_method)
+                    new_symbols.append(current_method)
             
-            if type_name:
-                # 尝试使用完整的类型路径
-                full_type = type_name
-                if type_name in self.type_map:
-                    full_type = self.type_map[type_name]
-                
-                # 查找变量名
-                for child in node.children:
-                    if child.type == 'init_declarator':
-                        for decl_child in child.children:
-                            if decl_child.type == 'identifier':
-                                var_name = content[decl_child.start_byte:decl_child.end_byte].decode('utf-8', errors='ignore')
-                                
-                                # 添加命名空间前缀
-                                ns_prefix = '::'.join(self.namespace_stack) if self.namespace_stack else ""
-                                full_name = f"{ns_prefix}::{var_name}" if ns_prefix else var_name
-                                
-                                var = Variable(
-                                    name=full_name,
-                                    type=type_name,
-                                    full_type_path=full_type,
-                                    location=(file_path, decl_child.start_point[0] + 1, decl_child.start_point[1] + 1)
-                                )
-                                self.global_variables.append(var)
-        
-        # 对于未特别处理的节点，继续递归遍历
+            elif kind == RECORD_FIELD:
+                _, var_name, type_name, line, col, class_index = record
+                class_obj = file_classes[class_index]
+                class_obj.variables.append(Variable(
+                    name=var_name,
+                    type=type_name,
+                    full_type_path=type_name,
+                    location=(file_path, line, col),
+                    parent_class=class_obj.full_path
+                ))
+            
+            elif kind == RECORD_GLOBAL_VAR:
+                _, var_name, type_name, line, col = record
+                var = Variable(
+                    name=var_name,
+                    type=type_name,
+                    full_type_path=type_name,
+                    location=(file_path, line, col)
+                )
+                self.global_variables.append(var)
+                new_symbols.append(var)
+            
+            elif kind == RECORD_LOCAL_VAR:
+                _, var_name, type_name, line, col = record
+                current_method.local_variables.append(Variable(
+                    name=var_name,
+                    type=type_name,
+                    full_type_path=type_name,
+                    location=(file_path, line, col),
+                    parent_class=current_method.name
+                ))
+            
+            elif kind == RECORD_USING:
+                entry = record[1:]
+                self.resolver.add_using(FILE_TABLE.intern(file_path), entry)
+                if usings is not None:
+                    usings.append(entry)
+            
+            elif kind == RECORD_INCLUDE:
+                self.include_map.setdefault(file_path, []).append(record[1])
+                if includes is not None:
+                    includes.append(record[1])
+        
+        self.index.add(new_symbols)
+        if symbols is not None:
+            symbols.extend(new_symbols)
+    
+    def _register_class(self, class_obj: Class):
+        """存储类对象，同一完整路径的类以最后登记的为准"""
+        self.classes[class_obj.full_path] = class_obj
+    
+    def _traverse_node(self, node, content: bytes, records: list, current_class: int = -1,
+                       mode: int = _WALK_DECLARATIONS):
+        """使用TreeCursor迭代遍历node子树，将提取到的符号追加到records中
+
+        current_class为当前所在类的类记录在records中的下标，-1表示不在类中；
+        mode为node所在层的遍历模式，例如从函数体开始以_WALK_LOCALS只收集局部变量。
+        遍历不递归，也不创建子节点列表：游标按先序移动，每层的遍历模式和所在类
+        保存在显式的栈中。DECLARATIONS模式下按节点类型查处理函数表，处理函数读取
+        节点的直接子节点生成记录，并返回子节点的遍历模式，返回None表示不进入子节点。
+        """
+        cursor = node.walk()
+        handlers = self._WALK_HANDLERS
+        namespace_stack = self.namespace_stack
+        # 每进入一层子节点压入一项：(该层的遍历模式, 所在类, 退出时弹出的命名空间层数)
+        frames = []
+        
+        while True:
+            current = cursor.node
+            node_type = current.type
+            children = None
+            if mode == _WALK_DECLARATIONS:
+                handler = handlers.get(node_type)
+                if handler is None:
+                    # 未特别处理的节点，继续遍历其子节点
+                    children = (_WALK_DECLARATIONS, current_class, 0)
+                else:
+                    children = handler(self, cursor, current, content, records, current_class)
+            elif mode == _WALK_LOCALS:
+                if node_type == 'declaration':
+                    self._walk_local_declaration(cursor, content, records)
+                children = (_WALK_LOCALS, current_class, 0)
+            elif mode == _WALK_FIELD:
+                if node_type == 'class_specifier' or node_type == 'struct_specifier':
+                    children = self._walk_class(cursor, current, content, records, current_class)
+            elif node_type == _WALK_FOLLOW[mode]:
+                # 命名空间、类和函数只进入其主体节点
+                children = (_WALK_LOCALS if mode == _WALK_FUNCTION else _WALK_DECLARATIONS, current_class, 0)
+            
+            if children is not None:
+                if cursor.goto_first_child():
+                    frames.append(children)
+                    mode, current_class = children[0], children[1]
+                    continue
+                if children[2]:
+                    del namespace_stack[-children[2]:]
+            
+            # 没有可进入的子节点时，移动到下一个兄弟节点，必要时先逐层返回父节点
+            while True:
+                if not frames:
+                    return
+                if cursor.goto_next_sibling():
+                    break
+                cursor.goto_parent()
+                popped = frames.pop()
+                if popped[2]:
+                    del namespace_stack[-popped[2]:]
+            mode, current_class = frames[-1][0], frames[-1][1]
+    
+    def _walk_namespace(self, cursor, node, content: bytes, records: list, current_class: int):
+        """命名空间：记录名称（包括C++17嵌套命名空间的多层名称），只进入声明列表"""
+        pushed = 0
+        found = False
+        for child in _cursor_children(cursor):
+            if found:
+                continue
+            if child.type in ('namespace_identifier', 'identifier'):
+                self.namespace_stack.append(content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore'))
+                pushed = 1
+                found = True
+            elif child.type == 'nested_namespace_specifier':
+                for name_node in _cursor_children(cursor):
+                    if name_node.type in ('namespace_identifier', 'identifier'):
+                        self.namespace_stack.append(
+                            content[name_node.start_byte:name_node.end_byte].decode('utf-8', errors='ignore'))
+                        pushed += 1
+                found = True
+        return (_WALK_NAMESPACE, current_class, pushed)
+    
+    def _walk_class(self, cursor, node, content: bytes, records: list, current_class: int):
+        """类或结构体：具名时生成类记录，只进入类体"""
+        class_name = None
+        base_classes = []
+        for child in _cursor_children(cursor):
+            if child.type == 'type_identifier':
+                if class_name is None:
+                    class_name = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
+            elif child.type == 'base_class_clause':
+                for base_child in _cursor_children(cursor):
+                    if base_child.type in ('type_identifier', 'qualified_identifier'):
+                        base_classes.append(content[base_child.start_byte:base_child.end_byte].decode('utf-8', errors='ignore'))
+        if class_name is None:
+            return None
+        
+        # 创建完整路径，包含命名空间和外层类
+        ns_prefix = '::'.join(self.namespace_stack) if self.namespace_stack else ""
+        full_path = f"{ns_prefix}::{class_name}" if ns_prefix else class_name
+        
+        class_index = len(records)
+        records.append((
+            RECORD_CLASS, class_name, full_path,
+            node.start_point[0] + 1, node.start_point[1] + 1, tuple(base_classes)
+        ))
+        # 类体是嵌套类和类内别名的作用域
+        self.namespace_stack.append(class_name)
+        return (_WALK_CLASS, class_index, 1)
+    
+    def _walk_function(self, cursor, node, content: bytes, records: list, current_class: int):
+        """函数/方法定义：具名时生成方法记录，只进入函数体收集局部变量
+
+        提取深度不含局部变量时不进入函数体，不含成员时也不生成类方法的记录。
+        """
+        if current_class >= 0 and not self.collect_members:
+            return None
+        method_name = None
+        return_type = None
+        for child in _cursor_children(cursor):
+            if child.type == 'function_declarator':
+                found = False
+                for decl_child in _cursor_children(cursor):
+                    if not found and decl_child.type in ('identifier', 'field_identifier'):
+                        method_name = content[decl_child.start_byte:decl_child.end_byte].decode('utf-8', errors='ignore')
+                        found = True
+            elif child.type in ('primitive_type', 'type_identifier', 'qualified_identifier'):
+                return_type = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
+        if method_name is None:
+            return None
+        
+        if current_class < 0:
+            # 全局方法，添加命名空间前缀
+            ns_prefix = '::'.join(self.namespace_stack) if self.namespace_stack else ""
+            method_name = f"{ns_prefix}::{method_name}" if ns_prefix else method_name
+        records.append((
+            RECORD_METHOD, method_name, current_class,
+            node.start_point[0] + 1, node.start_point[1] + 1, return_type
+        ))
+        return (_WALK_FUNCTION, current_class, 0) if self.collect_locals else None
+    
+    def _walk_field(self, cursor, node, content: bytes, records: list, current_class: int):
+        """类成员变量；成员声明中定义了嵌套类时只进入该类"""
+        if current_class < 0:
+            return None
+        type_name = None
+        nested_class = False
+        for child in _cursor_children(cursor):
+            if type_name is None:
+                if child.type in ('primitive_type', 'type_identifier', 'qualified_identifier'):
+                    type_name = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
+                elif child.type in ('class_specifier', 'struct_specifier'):
+                    nested_class = True
+            elif child.type == 'field_identifier' and self.collect_members:
+                var_name = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
+                records.append((
+                    RECORD_FIELD, var_name, type_name,
+                    child.start_point[0] + 1, child.start_point[1] + 1, current_class
+                ))
+        return (_WALK_FIELD, current_class, 0) if nested_class else None
+    
+    def _walk_declaration(self, cursor, node, content: bytes, records: list, current_class: int):
+        """全局变量声明，添加命名空间前缀，不进入子节点"""
+        ns_prefix = '::'.join(self.namespace_stack) if self.namespace_stack else ""
+        for var_name, type_name, row, column in self._iter_declared_variables(cursor, content):
+            full_name = f"{ns_prefix}::{var_name}" if ns_prefix else var_name
+            records.append((RECORD_GLOBAL_VAR, full_name, type_name, row, column))
+        return None
+    
+    def _walk_using(self, cursor, node, content: bytes, records: list, current_class: int):
+        """using指令、using声明和别名：生成记录，继续遍历子节点（typedef中可能定义类）"""
+        scope = '::'.join(self.namespace_stack)
+        for name, target in self._using_entries(node, content):
+            records.append((RECORD_USING, scope, name, target))
+        return (_WALK_DECLARATIONS, current_class, 0)
+    
+    def _walk_include(self, cursor, node, content: bytes, records: list, current_class: int):
+        """#include指令，不进入子节点"""
+        include = self._include_path(node, content)
+        if include is not None:
+            records.append((RECORD_INCLUDE, include))
+        return None
+    
+    def _walk_local_declaration(self, cursor, content: bytes, records: list):
+        """函数体内的变量声明，生成局部变量记录"""
+        for var_name, type_name, row, column in self._iter_declared_variables(cursor, content):
+            records.append((RECORD_LOCAL_VAR, var_name, type_name, row, column))
+    
+    @staticmethod
+    def _iter_declared_variables(cursor, content: bytes):
+        """生成游标所在声明中的(变量名, 类型, 行, 列)
+
+        只取初始化声明中被声明的标识符，不包括初始值。
+        """
+        type_name = None
+        for child in _cursor_children(cursor):
+            if type_name is None:
+                if child.type in ('primitive_type', 'type_identifier', 'qualified_identifier'):
+                    type_name = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
+            elif child.type == 'init_declarator':
+                decl_child = child.child_by_field_name('declarator')
+                if decl_child is not None and decl_child.type == 'identifier':
+                    var_name = content[decl_child.start_byte:decl_child.end_byte].decode('utf-8', errors='ignore')
+                    yield var_name, type_name, decl_child.start_point[0] + 1, decl_child.start_point[1] + 1
+    
+    # DECLARATIONS模式下按节点类型分派的处理函数表
+    _WALK_HANDLERS = {
+        'namespace_definition': _walk_namespace,
+        'class_specifier': _walk_class,
+        'struct_specifier': _walk_class,
+        'function_definition': _walk_function,
+        'field_declaration': _walk_field,
+        'declaration': _walk_declaration,
+        'using_declaration': _walk_using,
+        'alias_declaration': _walk_using,
+        'type_definition': _walk_using,
+        'namespace_alias_definition': _walk_using,
+        'preproc_include': _walk_include,
+    }
+    
+    def _extract_node(self, node, content: bytes, records: list, namespace: str = ""):
+        """使用所选的提取后端提取node子树中的符号，namespace为node所在的命名空间"""
+        if self.backend == 'query':
+            self._extract_with_query(node, content, records, namespace)
         else:
-            for child in node.children:
-                self._traverse_node(child, content, file_path, current_class)
+            self.namespace_stack = namespace.split('::') if namespace else []
+            self._traverse_node(node, content, records)
     
-    def _resolve_type_path(self, type_name: str) -> str:
-        """解析类型的完整路径"""
-        # 如果是原始类型，直接返回
-        primitive_types = {'int', 'char', 'float', 'double', 'bool', 'void', 'unsigned', 'signed', 'long', 'short'}
-        if type_name in primitive_types:
-            return type_name
+    def _extract_with_query(self, node, content: bytes, records: list, namespace: str = ""):
+        """基于编译后的符号查询提取node子树中的符号，生成与_traverse_node相同的记录
+
+        查询由tree-sitter的C查询引擎一次执行完毕，这里只按文档顺序处理捕获。
+        容器节点的捕获压入作用域栈，以模拟遍历器的下降规则：命名空间体、具名类的
+        类体以及其他未专门处理的节点会继续提取声明；具名函数的函数体内只收集局部
+        变量；变量声明、成员声明、匿名类等节点的内部则被忽略。
+        """
+        # 每个捕获的字节范围只读取一次；同一位置开始的节点中，范围大的容器先于其内部的捕获处理
+        captures = [(capture_node.start_byte, -capture_node.end_byte, index, capture_node, capture_name)
+                    for index, (capture_node, capture_name) in enumerate(self.symbol_query.captures(node))]
+        captures.sort()
+        
+        # 作用域栈，每项为[结束字节, 作用域类型, 作用域数据...]
+        stack = [[node.end_byte + 1, _SCOPE_OPEN, -1, namespace]]
+        # 类记录的基类在类名之后才陆续出现，先收集，处理完后再生成记录
+        pending_classes = []
+        
+        for start_byte, end_byte, _, capture_node, capture_name in captures:
+            end_byte = -end_byte
+            while stack[-1][0] <= start_byte:
+                stack.pop()
+            scope = stack[-1]
+            kind = scope[1]
+            
+            if capture_name == 'include':
+                if kind == _SCOPE_OPEN:
+                    include = self._include_path(capture_node, content)
+                    if include is not None:
+                        records.append((RECORD_INCLUDE, include))
+                continue
+            
+            if capture_name == 'using':
+                # 与遍历器一致，不改变作用域，typedef中定义的类照常提取
+                if kind == _SCOPE_OPEN:
+                    for name, target in self._using_entries(capture_node, content):
+                        records.append((RECORD_USING, scope[3], name, target))
+                continue
+            
+            if capture_name in _CONTAINER_CAPTURES:
+                if kind == _SCOPE_OPEN:
+                    current_class, ns_prefix = scope[2], scope[3]
+                    if capture_name == 'namespace':
+                        names = self._namespace_names(capture_node, content)
+                        if names:
+                            ns_prefix = '::'.join([ns_prefix] + names if ns_prefix else names)
+                        stack.append([end_byte, _SCOPE_OPEN, current_class, ns_prefix])
+                    elif capture_name == 'class':
+                        stack.append([end_byte, _SCOPE_CLASS, capture_node.start_point, ns_prefix, -1, None])
+                    elif capture_name == 'function':
+                        stack.append([end_byte, _SCOPE_FUNCTION, capture_node.start_point, ns_prefix,
+                                      current_class, None, False])
+                    elif capture_name == 'declaration':
+                        stack.append([end_byte, _SCOPE_DECLARATION, None, ns_prefix])
+                    elif current_class >= 0:
+                        stack.append([end_byte, _SCOPE_FIELD, None, current_class, ns_prefix])
+                    else:
+                        stack.append([end_byte, _SCOPE_CLOSED])
+                elif kind == _SCOPE_FIELD and capture_name == 'class' and capture_node.parent.type == 'field_declaration':
+                    # 成员声明中定义的嵌套类，作用域为外层类
+                    stack.append([end_byte, _SCOPE_CLASS, capture_node.start_point, scope[4], -1, None])
+                elif kind == _SCOPE_LOCAL or kind == _SCOPE_LOCAL_DECLARATION:
+                    # 函数体内的所有变量声明都是局部变量，包括嵌套在lambda或局部类中的声明
+                    if capture_name == 'declaration':
+                        stack.append([end_byte, _SCOPE_LOCAL_DECLARATION, None])
+                    else:
+                        stack.append([end_byte, _SCOPE_LOCAL])
+                else:
+                    stack.append([end_byte, _SCOPE_CLOSED])
+                continue
+            
+            if capture_name == 'class.name':
+                if kind == _SCOPE_CLASS and scope[4] < 0:
+                    class_name = content[start_byte:end_byte].decode('utf-8', errors='ignore')
+                    ns_prefix = scope[3]
+                    full_path = f"{ns_prefix}::{class_name}" if ns_prefix else class_name
+                    scope[4] = len(records)
+                    scope[5] = full_path
+                    records.append(None)
+                    pending_classes.append((scope[4], class_name, full_path, scope[2], []))
+            
+            elif capture_name == 'class.base':
+                if kind == _SCOPE_CLASS and scope[4] >= 0:
+                    pending_classes[-1][4].append(
+                        content[start_byte:end_byte].decode('utf-8', errors='ignore'))
+            
+            elif capture_name == 'class.body':
+                if kind == _SCOPE_CLASS and scope[4] >= 0:
+                    # 类体是嵌套类和类内别名的作用域
+                    stack.append([end_byte, _SCOPE_OPEN, scope[4], scope[5]])
+            
+            elif capture_name == 'function.return_type':
+                if kind == _SCOPE_FUNCTION:
+                    scope[5] = content[start_byte:end_byte].decode('utf-8', errors='ignore')
+            
+            elif capture_name == 'function.name':
+                if kind == _SCOPE_FUNCTION and not scope[6]:
+                    method_name = content[start_byte:end_byte].decode('utf-8', errors='ignore')
+                    ns_prefix, current_class = scope[3], scope[4]
+                    if current_class < 0 and ns_prefix:
+                        method_name = f"{ns_prefix}::{method_name}"
+                    row, column = scope[2]
+                    records.append((RECORD_METHOD, method_name, current_class, row + 1, column + 1, scope[5]))
+                    scope[6] = True
+            
+            elif capture_name == 'function.body':
+                if kind == _SCOPE_FUNCTION and scope[6]:
+                    stack.append([end_byte, _SCOPE_LOCAL])
+            
+            elif capture_name == 'field.type':
+                if kind == _SCOPE_FIELD and scope[2] is None:
+                    scope[2] = content[start_byte:end_byte].decode('utf-8', errors='ignore')
+            
+            elif capture_name == 'field.name':
+                if kind == _SCOPE_FIELD and scope[2] is not None:
+                    row, column = capture_node.start_point
+                    records.append((
+                        RECORD_FIELD, content[start_byte:end_byte].decode('utf-8', errors='ignore'),
+                        scope[2], row + 1, column + 1, scope[3]
+                    ))
+            
+            elif capture_name == 'variable.type':
+                if (kind == _SCOPE_DECLARATION or kind == _SCOPE_LOCAL_DECLARATION) and scope[2] is None:
+                    scope[2] = content[start_byte:end_byte].decode('utf-8', errors='ignore')
+            
+            elif capture_name == 'variable.name':
+                if (kind == _SCOPE_DECLARATION or kind == _SCOPE_LOCAL_DECLARATION) and scope[2] is not None:
+                    var_name = content[start_byte:end_byte].decode('utf-8', errors='ignore')
+                    row, column = capture_node.start_point
+                    if kind == _SCOPE_DECLARATION:
+                        ns_prefix = scope[3]
+                        full_name = f"{ns_prefix}::{var_name}" if ns_prefix else var_name
+                        records.append((RECORD_GLOBAL_VAR, full_name, scope[2], row + 1, column + 1))
+                    else:
+                        records.append((RECORD_LOCAL_VAR, var_name, scope[2], row + 1, column + 1))
         
-        # 如果类型已经包含命名空间，直接返回
-        if '::' in type_name:
-            return type_name
+        for index, class_name, full_path, (row, column), bases in pending_classes:
+            records[index] = (RECORD_CLASS, class_name, full_path, row + 1, column + 1, tuple(bases))
+    
+    @staticmethod
+    def _namespace_names(node, content: bytes) -> List[str]:
+        """获取命名空间定义的名称，C++17嵌套命名空间(namespace a::b)返回多层名称"""
+        namespace_names = []
+        for child in node.children:
+            if child.type in ('namespace_identifier', 'identifier'):
+                namespace_names.append(content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore'))
+                break
+            elif child.type == 'nested_namespace_specifier':
+                for name_node in child.children:
+                    if name_node.type in ('namespace_identifier', 'identifier'):
+                        namespace_names.append(content[name_node.start_byte:name_node.end_byte].decode('utf-8', errors='ignore'))
+                break
+        return namespace_names
+    
+    @staticmethod
+    def _include_path(node, content: bytes) -> Optional[str]:
+        """获取#include指令的路径原文（包括引号或尖括号），通过宏包含的返回None"""
+        path_node = node.child_by_field_name('path')
+        if path_node is None or path_node.type not in ('string_literal', 'system_lib_string'):
+            return None
+        return content[path_node.start_byte:path_node.end_byte].decode('utf-8', errors='ignore')
+    
+    @staticmethod
+    def _using_entries(node, content: bytes) -> List[Tuple[Optional[str], str]]:
+        """获取using指令、using声明、类型别名或命名空间别名定义的(别名, 目标原文)
+
+        using namespace指令的别名为None；匿名类型的typedef没有可解析的目标，不生成条目。
+        """
+        def text(text_node):
+            return content[text_node.start_byte:text_node.end_byte].decode('utf-8', errors='ignore')
         
-        # 如果在类型映射中找到，返回映射的完整路径
-        if type_name in self.type_map:
-            return self.type_map[type_name]
+        def type_text(type_node):
+            if type_node is None:
+                return None
+            if type_node.type in ('class_specifier', 'struct_specifier', 'union_specifier', 'enum_specifier'):
+                name_node = type_node.child_by_field_name('name')
+                return text(name_node) if name_node is not None else None
+            return text(type_node)
         
-        # 默认情况下返回原始类型名
-        return type_name
+        entries = []
+        node_type = node.type
+        if node_type == 'using_declaration':
+            directive = False
+            for child in node.children:
+                if child.type == 'namespace':
+                    directive = True
+                elif child.type in ('identifier', 'qualified_identifier'):
+                    target = text(child)
+                    if directive:
+                        entries.append((None, target))
+                    elif '::' in target:
+                        entries.append((target.rpartition('::')[2], target))
+        elif node_type == 'alias_declaration':
+            name_node = node.child_by_field_name('name')
+            descriptor = node.child_by_field_name('type')
+            target = type_text(descriptor.child_by_field_name('type')) if descriptor is not None else None
+            if name_node is not None and target:
+                entries.append((text(name_node), target))
+        elif node_type == 'type_definition':
+            target = type_text(node.child_by_field_name('type'))
+            if target:
+                for declarator in node.children_by_field_name('declarator'):
+                    # typedef Foo *FooPtr; 等声明符中的类型名在最内层
+                    while declarator is not None and declarator.type != 'type_identifier':
+                        declarator = declarator.child_by_field_name('declarator')
+                    if declarator is not None:
+                        entries.append((text(declarator), target))
+        elif node_type == 'namespace_alias_definition':
+            name_node = node.child_by_field_name('name')
+            target_node = node.named_children[-1] if node.named_child_count > 1 else None
+            if name_node is not None and target_node is not None:
+                entries.append((text(name_node), text(target_node)))
+        return entries
     
-    def parse_directory(self, directory: str = None):
-        """解析整个目录中的C++文件"""
+    def parse_directory(self, directory: str = None, jobs: int = 1, progress: bool = False):
+        """解析整个目录中的C++文件
+
+        jobs大于1时使用进程池并行解析，结果与串行解析完全一致。
+        progress为True时在标准错误上显示解析进度（见Progress）。
+        """
         if directory is None:
             directory = self.cpp_dir
         
-        print(f"开始解析目录: {directory}")
+        logger.info("开始解析目录: %s", directory)
         
-        for root, _, files in os.walk(directory):
-            for file in files:
-                if file.endswith(('.cpp', '.cc', '.cxx', '.h', '.hpp', '.hxx')):
-                    file_path = os.path.join(root, file)
+        with self._phase('discover'):
+            file_paths = self._discover_files(directory)
+        
+        with self._phase('parse'), (Progress(len(file_paths)) if progress else contextlib.nullcontext()) as progress_line:
+            if jobs > 1 and len(file_paths) > 1:
+                self._parse_files_parallel(file_paths, jobs, progress_line)
+            else:
+                for file_path in file_paths:
                     self.parse_file(file_path)
+                    if progress_line is not None:
+                        progress_line.advance()
         
-        # 在解析完所有文件后，修复命名空间问题
-        self._fix_missing_namespaces()
+        # 在解析完所有文件后，统一解析类型的完整路径
+        self._link_types()
+        self._log_parse_summary()
+    
+    async def parse_directory_async(self, directory: str = None, jobs: int = 1,
+                                    read_concurrency: int = ASYNC_READ_CONCURRENCY,
+                                    max_pending: Optional[int] = None, progress: bool = False):
+        """parse_directory的异步版本：文件读取与解析重叠进行，结果与parse_directory完全一致
+
+        适用于NFS等读取延迟高的存储，总耗时接近读取与解析两者中较长的一个，
+        而不是两者之和。各参数见parse_files_async。
+        """
+        import asyncio
         
-        # 显示解析结果
+        if directory is None:
+            directory = self.cpp_dir
+        
+        logger.info("开始解析目录: %s", directory)
+        
+        # 遍历目录同样需要等待存储，放到线程中进行，不阻塞事件循环
+        with self._phase('discover'):
+            file_paths = await asyncio.get_running_loop().run_in_executor(None, self._discover_files, directory)
+        
+        with self._phase('parse'), (Progress(len(file_paths)) if progress else contextlib.nullcontext()) as progress_line:
+            async for _ in self.parse_files_async(file_paths, jobs, read_concurrency, max_pending):
+                if progress_line is not None:
+                    progress_line.advance()
+        
+        self._link_types()
+        self._log_parse_summary()
+    
+    def _discover_files(self, directory: str) -> List[str]:
+        """列出目录中的C++源文件，按目录和文件名排序，保证解析顺序（以及输出顺序）是确定的"""
+        file_paths = []
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for file in sorted(files):
+                if file.endswith(SOURCE_EXTENSIONS):
+                    file_paths.append(os.path.join(root, file))
+        return file_paths
+    
+    def _log_parse_summary(self):
+        """输出解析结果的统计，DEBUG级别下逐个列出类、全局方法和全局变量"""
         class_count = len(self.classes)
         method_count = sum(len(cls.methods) for cls in self.classes.values()) + len(self.global_methods)
         var_count = sum(len(cls.variables) for cls in self.classes.values()) + len(self.global_variables)
         
-        print(f"解析完成，共找到 {class_count} 个类, {method_count} 个方法, {var_count} 个变量")
+        logger.info("解析完成，共找到 %d 个类, %d 个方法, %d 个变量", class_count, method_count, var_count)
+        if self.cache is not None:
+            logger.info("解析缓存: 命中 %d 个文件, 重新解析 %d 个文件", self.cache_hits, self.cache_misses)
+        
+        # 逐个列出符号的输出量与符号数成正比，只在DEBUG级别生成
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         
         # 输出找到的类
         for cls_path, cls in self.classes.items():
-            print(f"类: {cls_path}, 文件: {os.path.basename(cls.location[0])}")
+            logger.debug("类: %s, 文件: %s", cls_path, os.path.basename(cls.location[0]))
         
         # 输出包含命名空间的全局方法和变量
         for method in self.global_methods:
-            print(f"全局方法: {method.name}, 文件: {os.path.basename(method.location[0])}")
+            logger.debug("全局方法: %s, 文件: %s", method.name, os.path.basename(method.location[0]))
         
         for var in self.global_variables:
-            print(f"全局变量: {var.name}, 类型: {var.full_type_path}, 文件: {os.path.basename(var.location[0])}")
+            logger.debug("全局变量: %s, 类型: %s, 文件: %s",
+                         var.name, var.full_type_path, os.path.basename(var.location[0]))
     
-    def generate_markdown(self, output_file: str):
-        """生成Markdown报告文件"""
-        # 记录已处理的项目，避免重复
-        processed_methods = set()
-        processed_variables = set()
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            # 写入标题
-            f.write('# C++ 代码分析报告\n\n')
-            
-            # 写入类表格
-            f.write('## 类\n\n')
-            f.write('| 类 | 源文件位置 | 基类 |\n')
-            f.write('|---|---|---|\n')
-            
-            for class_path, class_obj in sorted(self.classes.items()):
-                file_path, line, col = class_obj.location
-                rel_path = os.path.relpath(file_path, self.cpp_dir)
-                
-                # 处理基类，如果是已知类，显示完整路径
-                formatted_base_classes = []
-                for base in class_obj.parent_classes:
-                    # 如果基类在我们的类型映射中，使用完整路径
-                    if base in self.type_map:
-                        formatted_base_classes.append(self.type_map[base])
-                    else:
-                        formatted_base_classes.append(base)
-                
-                base_classes = ', '.join(formatted_base_classes) if formatted_base_classes else '-'
-                f.write(f'| {class_obj.full_path} | {rel_path}:{line}:{col} | {base_classes} |\n')
-            
-            # 写入方法表格
-            f.write('\n## 方法\n\n')
-            f.write('| 类 | 方法 | 返回类型 | 源文件位置 |\n')
-            f.write('|---|---|---|---|\n')
+    def _parse_files_parallel(self, file_paths: List[str], jobs: int, progress: Optional[Progress] = None):
+        """使用进程池并行解析文件
+
+        工作进程只负责读取、解析和提取。任务按文件大小从大到小提交，
+        最大的文件最先开始，避免并行解析的尾部被单个大文件拖住；
+        主进程仍按原始文件顺序合并结果，与串行调用parse_file的处理顺序相同，
+        因此输出保持一致。
+        """
+        pending = [path for path in file_paths if path not in self.processed_files]
+        if not pending:
+            return
+        
+        # 只有并行解析时才需要进程池，延迟导入以减少启动时间
+        from concurrent.futures import ProcessPoolExecutor
+        
+        jobs = min(jobs, len(pending))
+        sizes = {}
+        for path in pending:
+            try:
+                sizes[path] = os.path.getsize(path)
+            except OSError:
+                sizes[path] = 0
+        
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=self._worker_initargs()) as executor:
+            # 文件路径 -> (所在分块的future, 在分块中的下标)
+            scheduled = {}
+            for chunk in _schedule_chunks(pending, sizes, jobs):
+                future = executor.submit(_extract_chunk_in_worker, chunk)
+                for index, path in enumerate(chunk):
+                    scheduled[path] = (future, index)
             
-            # 类方法
-            for class_path, class_obj in sorted(self.classes.items()):
-                for method in sorted(class_obj.methods, key=lambda m: m.name):
-                    file_path, line, col = method.location
-                    rel_path = os.path.relpath(file_path, self.cpp_dir)
-                    
-                    # 处理返回类型
-                    return_type = method.return_type if method.return_type else '-'
-                    if return_type in self.type_map:
-                        return_type = self.type_map[return_type]
-                    
-                    # 避免重复
-                    method_key = f"{class_obj.full_path}::{method.name}::{rel_path}:{line}:{col}"
-                    if method_key in processed_methods:
-                        continue
-                    processed_methods.add(method_key)
-                    
-                    f.write(f'| {class_obj.full_path} | {method.name} | {return_type} | {rel_path}:{line}:{col} |\n')
+            # 每个分块的结果只取一次，同时合并其中的文件耗时
+            results = {}
+            for file_path in pending:
+                future, index = scheduled.pop(file_path)
+                chunk_results = results.get(future)
+                if chunk_results is None:
+                    chunk_results = results[future] = self._take_worker_result(future)
+                records, cache_hit = chunk_results[index]
+                logger.debug("正在解析文件: %s", file_path)
+                self.processed_files.add(file_path)
+                self._count_cache_result(cache_hit)
+                self._merge_records(file_path, records)
+                if progress is not None:
+                    progress.advance()
+    
+    async def parse_files_async(self, file_paths: Iterable[str], jobs: int = 1,
+                                read_concurrency: int = ASYNC_READ_CONCURRENCY,
+                                max_pending: Optional[int] = None) -> AsyncIterator[Tuple[str, list]]:
+        """异步读取并解析一组文件，按输入顺序逐个合并并产出(文件路径, 新增的类、全局方法和全局变量)
+
+        最多read_concurrency个文件在线程中同时读取，读完的文件立即交给解析：
+        jobs大于1时在进程池中解析，否则在一个专用线程中使用本实例的Parser。
+        已开始读取但尚未合并的文件不超过max_pending个（默认为读取并发数与jobs
+        较大者的两倍），调用方消费产出较慢时读取也随之暂停，内存占用不随文件数增长。
+        结果按输入顺序合并，与逐个调用parse_file相同；已解析过的文件会被跳过。
+        """
+        import asyncio
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+        
+        loop = asyncio.get_running_loop()
+        if max_pending is None:
+            max_pending = 2 * max(read_concurrency, jobs)
+        read_executor = ThreadPoolExecutor(read_concurrency, thread_name_prefix='cpp_parser-read')
+        if jobs > 1:
+            parse_executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                                 initargs=self._worker_initargs())
+        else:
+            # tree-sitter的Parser不是线程安全的，只在这一个线程中使用
+            parse_executor = ThreadPoolExecutor(1, thread_name_prefix='cpp_parser-parse')
+        
+        async def load(file_path: str) -> Tuple[list, bool]:
+            content = await loop.run_in_executor(read_executor, self._read_source, file_path)
+            if content is None:
+                return [], False
+            if jobs > 1:
+                future = parse_executor.submit(_extract_buffer_in_worker, file_path, content)
+                await asyncio.wrap_future(future)
+                return self._take_worker_result(future)
+            return await loop.run_in_executor(parse_executor, self._extract_content, content, file_path)
+        
+        def merge(file_path: str, result: Tuple[list, bool]) -> list:
+            records, cache_hit = result
+            logger.debug("正在解析文件: %s", file_path)
+            self.processed_files.add(file_path)
+            self._count_cache_result(cache_hit)
+            symbols = []
+            self._merge_records(file_path, records, symbols)
+            return symbols
+        
+        in_flight = deque()
+        try:
+            for file_path in file_paths:
+                if file_path in self.processed_files:
+                    continue
+                if len(in_flight) >= max_pending:
+                    done_path, task = in_flight.popleft()
+                    yield done_path, merge(done_path, await task)
+                in_flight.append((file_path, loop.create_task(load(file_path))))
+            while in_flight:
+                done_path, task = in_flight.popleft()
+                yield done_path, merge(done_path, await task)
+        finally:
+            # 提前退出（出错、取消或调用方不再消费）时丢弃尚未开始的读取和解析
+            for _, task in in_flight:
+                task.cancel()
+            read_executor.shutdown(wait=not in_flight, cancel_futures=True)
+            parse_executor.shutdown(wait=not in_flight, cancel_futures=True)
+    
+    def _read_source(self, file_path: str) -> Optional[bytes]:
+        """读取源文件的全部内容，读取失败时记录警告并返回None，启用性能剖析时记录读取耗时"""
+        start = time.perf_counter()
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+        except OSError as e:
+            logger.warning("解析文件 %s 时出错: %s", file_path, e)
+            return None
+        if self.profiler is not None:
+            self.profiler.file(file_path).read += time.perf_counter() - start
+        return content
+    
+    def reindex_file(self, file_path: str, edits: Optional[List[Tuple[int, int, bytes]]] = None):
+        """增量重新索引单个文件
+
+        edits为按顺序应用的文本编辑列表，每项为(起始字节, 原结束字节, 新文本)，
+        每项的偏移量都相对于应用了之前各项编辑后的内容。
+        文件已有增量状态时，编辑会先应用到保存的语法树上，再基于旧树重新解析，
+        只重新提取与编辑范围或语法树变化范围重叠的顶层声明，之后的声明只平移
+        符号位置，之前的声明保持不变。文件尚无增量状态或edits为None时，从磁盘
+        读取文件完整重新索引（已解析过的文件也会先撤销旧的符号），并保存增量状态。
+        """
+        state = self.file_states.get(file_path)
+        if edits is None or state is None:
+            self._reindex_full(file_path)
+            return
+        
+        # 依次把编辑应用到源码和旧语法树上，同时记录新内容坐标下的编辑范围
+        old_content = content = state.content
+        tree = state.tree
+        dirty_ranges: List[Tuple[int, int]] = []
+        applied_edits: List[Tuple[int, int, int]] = []
+        for start_byte, old_end_byte, new_text in edits:
+            new_end_byte = start_byte + len(new_text)
+            new_content = content[:start_byte] + new_text + content[old_end_byte:]
+            tree.edit(
+                start_byte=start_byte,
+                old_end_byte=old_end_byte,
+                new_end_byte=new_end_byte,
+                start_point=_byte_to_point(content, start_byte),
+                old_end_point=_byte_to_point(content, old_end_byte),
+                new_end_point=_byte_to_point(new_content, new_end_byte),
+            )
+            dirty_ranges = [_shift_range(r, start_byte, old_end_byte, new_end_byte) for r in dirty_ranges]
+            dirty_ranges.append((start_byte, new_end_byte))
+            applied_edits.append((start_byte, old_end_byte, new_end_byte))
+            content = new_content
+        
+        new_tree = self.parser.parse(content, tree)
+        get_changed_ranges = getattr(tree, 'changed_ranges', None) or tree.get_changed_ranges
+        for changed in get_changed_ranges(new_tree):
+            dirty_ranges.append((changed.start_byte, changed.end_byte))
+        
+        # 所有变化都位于新内容坐标下的[window_start, window_end]内。窗口起点不晚于
+        # 任何编辑，在新旧内容中坐标相同；窗口终点不早于任何编辑，可以映射回旧内容。
+        # 与窗口重叠的新旧单元都可能超出窗口，因此反复扩展窗口直到覆盖它们
+        window_start = min(start for start, _ in dirty_ranges)
+        window_end = max(end for _, end in dirty_ranges)
+        units = state.units
+        while True:
+            new_nodes = []
+            namespace_bounds = []
+            self._iter_units_in_range(new_tree.root_node, content, window_start, window_end,
+                                      [], new_nodes, namespace_bounds)
+            old_window_end = _unshift_offset(window_end, applied_edits)
+            first = 0
+            while first < len(units) and units[first].end_byte < window_start:
+                first += 1
+            last = first
+            while last < len(units) and units[last].start_byte <= old_window_end:
+                last += 1
             
-            # 全局方法
-            for method in sorted(self.global_methods, key=lambda m: m.name):
-                file_path, line, col = method.location
-                rel_path = os.path.relpath(file_path, self.cpp_dir)
-                
-                # 处理返回类型
-                return_type = method.return_type if method.return_type else '-'
-                if return_type in self.type_map:
-                    return_type = self.type_map[return_type]
-                
+            bounds = [(node.start_byte, node.end_byte) for node, _ in new_nodes] + namespace_bounds
+            if first < last:
+                bounds.append((units[first].start_byte,
+                               _shift_offset(units[last - 1].end_byte, applied_edits)))
+            expanded_start = min([window_start] + [start for start, _ in bounds])
+            expanded_end = max([window_end] + [end for _, end in bounds])
+            if expanded_start == window_start and expanded_end == window_end:
+                break
+            window_start, window_end = expanded_start, expanded_end
+        
+        # 错误恢复可能重新划分窗口之外的结构（例如多出的括号吞并后面的命名空间），
+        # 增量解析的结果也可能与完整解析不同，窗口内有语法错误时改为完整解析
+        if self._has_error_in_range(new_tree.root_node, window_start, window_end):
+            self._reindex_content(file_path, content)
+            return
+        
+        # 先撤销窗口内旧单元的符号，再提取合并窗口内的新单元
+        global_offsets = self._global_offsets(file_path)
+        classes_changed = self._retract_symbols(
+            [symbol for unit in units[first:last] for symbol in unit.symbols])
+        file_id = FILE_TABLE.intern(file_path)
+        stale_usings = [entry for unit in units[first:last] for entry in unit.usings]
+        self.resolver.remove_usings(file_id, stale_usings)
+        stale_includes = [include for unit in units[first:last] for include in unit.includes]
+        file_includes = self.include_map.get(file_path, [])
+        for include in stale_includes:
+            file_includes.remove(include)
+        changed_classes = {(cls.name, cls.full_path) for unit in units[first:last]
+                           for cls in unit.symbols if isinstance(cls, Class)}
+        window_units = []
+        new_symbols = []
+        for node, namespace in new_nodes:
+            unit = self._extract_unit(file_path, node, content, namespace)
+            new_symbols.extend(unit.symbols)
+            window_units.append(unit)
+        changed_classes.update((cls.name, cls.full_path) for cls in new_symbols if isinstance(cls, Class))
+        usings_changed = (bool(stale_usings) or bool(stale_includes)
+                          or any(unit.usings or unit.includes for unit in window_units))
+        
+        # 窗口之后的单元内容未变，整体平移位置；只有与窗口终点同一行的单元列号会变化
+        tail = units[last:]
+        if tail:
+            byte_delta = len(content) - len(old_content)
+            row_delta = content.count(b'\n') - old_content.count(b'\n')
+            window_end_row = _byte_to_point(old_content, old_window_end)[0]
+            for unit in tail:
+                start_byte = unit.start_byte + byte_delta
+                row, col = unit.start_point
+                if row == window_end_row:
+                    new_point = _byte_to_point(content, start_byte)
+                else:
+                    new_point = (row + row_delta, col)
+                self._shift_unit(unit, start_byte, unit.end_byte + byte_delta, new_point)
+        
+        units = units[:first] + window_units + tail
+        self._restore_global_order(file_path, units, global_offsets)
+        # 包含路径按源码顺序排列
+        includes = [include for unit in units for include in unit.includes]
+        if includes:
+            self.include_map[file_path] = includes
+        else:
+            self.include_map.pop(file_path, None)
+        
+        if classes_changed or changed_classes or usings_changed:
+            # 与完整解析一致，同一完整路径的类以文件中靠后的定义为准，因此按文件顺序
+            # 重新登记本文件中受影响的类；类、别名和using指令的增删还会影响
+            # 其他文件中的类型解析，下次生成报告前重新整体链接
+            names = {name for name, _ in changed_classes}
+            full_paths = {full_path for _, full_path in changed_classes}
+            for unit in units:
+                for symbol in unit.symbols:
+                    if isinstance(symbol, Class) and (symbol.name in names or symbol.full_path in full_paths):
+                        self._register_class(symbol)
+            self._needs_link = True
+        self._link_symbols(new_symbols)
+        
+        state.content = content
+        state.tree = new_tree
+        state.units = units
+    
+    def _reindex_full(self, file_path: str):
+        """从磁盘完整重新索引单个文件，并保存增量状态"""
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        self._reindex_content(file_path, content)
+    
+    def _reindex_content(self, file_path: str, content: bytes):
+        """不复用旧语法树完整解析给定内容，重新索引单个文件并保存增量状态"""
+        global_offsets = self._global_offsets(file_path)
+        classes_changed = self._retract_file(file_path)
+        
+        tree = self.parser.parse(content)
+        units = []
+        new_symbols = []
+        for node, namespace in self._iter_units(tree.root_node, content):
+            unit = self._extract_unit(file_path, node, content, namespace)
+            new_symbols.extend(unit.symbols)
+            units.append(unit)
+        
+        self._restore_global_order(file_path, units, global_offsets)
+        self.file_states[file_path] = FileState(content=content, tree=tree, units=units)
+        self.processed_files.add(file_path)
+        
+        self._link_symbols(new_symbols)
+        if (classes_changed or any(unit.usings or unit.includes for unit in units)
+                or any(isinstance(symbol, Class) for symbol in new_symbols)):
+            self._needs_link = True
+    
+    def refresh_file(self, file_path: str):
+        """按磁盘上的当前内容刷新单个文件：文件已删除时撤销其符号，否则重新解析并替换旧的符号
+
+        与不带edits的reindex_file不同，这里不保存语法树和增量状态，适合批量处理
+        文件系统的变化（已有增量状态的文件仍交给reindex_file）。新符号的类型立即
+        解析；只有类、using指令或#include有增删时才标记需要重新整体链接。
+        """
+        exists = os.path.isfile(file_path)
+        if exists and file_path in self.file_states:
+            self.reindex_file(file_path)
+            return
+        
+        relink = False
+        if file_path in self.processed_files:
+            relink = self._retract_file(file_path)
+            self.processed_files.discard(file_path)
+        if exists:
+            logger.debug("正在解析文件: %s", file_path)
+            records, cache_hit = self._extract_file(file_path)
+            self._count_cache_result(cache_hit)
+            self.processed_files.add(file_path)
+            symbols, usings, includes = [], [], []
+            self._apply_records(file_path, records, symbols, usings, includes)
+            self._link_symbols(symbols)
+            relink = relink or bool(usings or includes) or any(isinstance(symbol, Class) for symbol in symbols)
+        if relink:
+            self._needs_link = True
+    
+    def link(self):
+        """需要时重新整体链接类型，之后符号的完整类型路径和基类都是最新的"""
+        if self._needs_link:
+            self._link_types()
+    
+    def load_local_variables(self, method: Method) -> List[Variable]:
+        """按需收集单个方法的局部变量并返回
+
+        提取深度不含局部变量时，方法的局部变量在此之前为空。这里重新读取并解析方法
+        所在的文件，只遍历该方法的函数体，解析类型后保存到方法中，之后再调用直接返回。
+        文件在索引之后被修改而找不到该定义时，记录警告并返回空列表。
+        """
+        if method.locals_collected:
+            return method.local_variables
+        file_path, line, column = method.location
+        content = self._read_source(file_path)
+        if content is None:
+            return []
+        tree = self.parser.parse(content)
+        node = _find_definition(tree.root_node, (line - 1, column - 1))
+        if node is None:
+            logger.warning("在 %s:%d 找不到方法 %s 的定义", file_path, line, method.name)
+            return []
+        records = []
+        for child in node.children:
+            if child.type == 'compound_statement':
+                self._traverse_node(child, content, records, mode=_WALK_LOCALS)
+        
+        # 与_link_symbols相同：类方法在类的作用域中解析，全局方法在其命名空间中解析
+        self.link()
+        resolve = self.resolver.resolve
+        scope = method.parent_class if method.parent_class is not None else method.name.rpartition('::')[0]
+        method.local_variables = [Variable(
+            name=var_name,
+            type=type_name,
+            full_type_path=resolve(type_name, scope, method.file_id),
+            location=(file_path, row, col),
+            parent_class=method.name
+        ) for _, var_name, type_name, row, col in records]
+        return method.local_variables
+    
+    def _iter_units(self, node, content: bytes, namespace_stack: Optional[List[str]] = None):
+        """按_traverse_node的遍历顺序生成(提取单元节点, 所在命名空间)"""
+        if namespace_stack is None:
+            namespace_stack = []
+        for child in node.children:
+            if child.type == 'namespace_definition':
+                namespace_names = self._namespace_names(child, content)
+                namespace_stack.extend(namespace_names)
+                for body in child.children:
+                    if body.type == 'declaration_list':
+                        yield from self._iter_units(body, content, namespace_stack)
+                        break
+                if namespace_names:
+                    del namespace_stack[-len(namespace_names):]
+            elif child.type in UNIT_NODE_TYPES:
+                yield child, '::'.join(namespace_stack)
+            else:
+                yield from self._iter_units(child, content, namespace_stack)
+    
+    def _iter_units_in_range(self, node, content: bytes, start_byte: int, end_byte: int,
+                             namespace_stack: List[str], units: list, namespace_bounds: list):
+        """收集与字节范围重叠的提取单元，只进入与范围重叠的子树
+
+        名称部分与范围重叠的命名空间会影响其中所有单元的完整路径，
+        其字节范围记录到namespace_bounds中，供调用方扩展范围。
+        """
+        for child in node.children:
+            if child.end_byte < start_byte or child.start_byte > end_byte:
+                continue
+            if child.type == 'namespace_definition':
+                body = None
+                for body_child in child.children:
+                    if body_child.type == 'declaration_list':
+                        body = body_child
+                        break
+                header_end = body.start_byte if body is not None else child.end_byte
+                if start_byte <= header_end:
+                    namespace_bounds.append((child.start_byte, child.end_byte))
+                namespace_names = self._namespace_names(child, content)
+                namespace_stack.extend(namespace_names)
+                if body is not None:
+                    self._iter_units_in_range(body, content, start_byte, end_byte,
+                                              namespace_stack, units, namespace_bounds)
+                if namespace_names:
+                    del namespace_stack[-len(namespace_names):]
+            elif child.type in UNIT_NODE_TYPES:
+                units.append((child, '::'.join(namespace_stack)))
+            else:
+                self._iter_units_in_range(child, content, start_byte, end_byte,
+                                          namespace_stack, units, namespace_bounds)
+    
+    def _has_error_in_range(self, node, start_byte: int, end_byte: int) -> bool:
+        """与字节范围重叠的子树中是否有ERROR节点或补全的缺失节点"""
+        for child in node.children:
+            if child.end_byte < start_byte or child.start_byte > end_byte or not child.has_error:
+                continue
+            if child.type == 'ERROR' or child.is_missing or self._has_error_in_range(child, start_byte, end_byte):
+                return True
+        return False
+    
+    def _global_offsets(self, file_path: str) -> Tuple[int, int]:
+        """返回本文件的第一个全局方法和全局变量在各自列表中的下标，没有时为列表长度"""
+        file_id = FILE_TABLE.lookup(file_path)
+        offsets = []
+        for symbols in (self.global_methods, self.global_variables):
+            offsets.append(next((index for index, symbol in enumerate(symbols) if symbol.file_id == file_id),
+                                len(symbols)))
+        return offsets[0], offsets[1]
+    
+    def _restore_global_order(self, file_path: str, units: List[SourceUnit], offsets: Tuple[int, int]):
+        """把本文件的全局方法和全局变量按单元顺序放回重新索引前所在的位置
+
+        重新提取的符号追加在列表末尾，报告中同名符号的先后顺序会与完整解析不同。
+        完整解析时每个文件的全局符号在列表中连续且按源码顺序排列，这里恢复这一顺序。
+        """
+        file_id = FILE_TABLE.lookup(file_path)
+        for symbols, kind, offset in ((self.global_methods, Method, offsets[0]),
+                                      (self.global_variables, Variable, offsets[1])):
+            others = [symbol for symbol in symbols if symbol.file_id != file_id]
+            ordered = [symbol for unit in units for symbol in unit.symbols if isinstance(symbol, kind)]
+            symbols[:] = others[:offset] + ordered + others[offset:]
+    
+    def _extract_unit(self, file_path: str, node, content: bytes, namespace: str) -> SourceUnit:
+        """提取并合并单个提取单元"""
+        records = []
+        self._extract_node(node, content, records, namespace)
+        symbols = []
+        usings = []
+        includes = []
+        self._apply_records(file_path, records, symbols, usings, includes)
+        return SourceUnit(
+            start_byte=node.start_byte,
+            end_byte=node.end_byte,
+            start_point=tuple(node.start_point),
+            namespace=namespace,
+            symbols=symbols,
+            usings=usings,
+            includes=includes
+        )
+    
+    def _shift_unit(self, unit: SourceUnit, start_byte: int, end_byte: int, start_point: Tuple[int, int]):
+        """把内容未变化的单元及其符号平移到新的位置"""
+        row, col = start_point
+        old_row, old_col = unit.start_point
+        if row != old_row or col != old_col:
+            row_delta = row - old_row
+            col_delta = col - old_col
+            first_line = old_row + 1
+            for symbol in _iter_symbol_tree(unit.symbols):
+                if symbol.line == first_line:
+                    symbol.column += col_delta
+                symbol.line += row_delta
+        unit.start_byte = start_byte
+        unit.end_byte = end_byte
+        unit.start_point = (row, col)
+    
+    def _retract_file(self, file_path: str) -> bool:
+        """撤销单个文件的全部符号和using指令，返回是否需要重新整体链接"""
+        state = self.file_states.pop(file_path, None)
+        if state is not None:
+            symbols = [symbol for unit in state.units for symbol in unit.symbols]
+        else:
+            # 类和没有所属类的全局方法、全局变量是顶层符号，成员随所属类一起撤销
+            symbols = [symbol for symbol in self.index.symbols_in_file(file_path)
+                       if isinstance(symbol, Class) or symbol.parent_class is None]
+        file_id = FILE_TABLE.lookup(file_path)
+        usings_changed = file_id is not None and self.resolver.remove_file(file_id)
+        includes_changed = self.include_map.pop(file_path, None) is not None
+        self._include_graph = None
+        return self._retract_symbols(symbols) or usings_changed or includes_changed
+    
+    def _retract_symbols(self, symbols: list) -> bool:
+        """从结果中撤销一组类、全局方法和全局变量，返回是否有类被移除"""
+        self.index.remove(symbols)
+        classes_changed = False
+        stale_methods = set()
+        stale_variables = set()
+        for symbol in symbols:
+            if isinstance(symbol, Class):
+                self.resolver.remove_type(symbol.full_path)
+                if self.classes.get(symbol.full_path) is symbol:
+                    del self.classes[symbol.full_path]
+                    classes_changed = True
+            elif isinstance(symbol, Method):
+                stale_methods.add(id(symbol))
+            else:
+                stale_variables.add(id(symbol))
+        
+        if stale_methods:
+            self.global_methods[:] = [m for m in self.global_methods if id(m) not in stale_methods]
+        if stale_variables:
+            self.global_variables[:] = [v for v in self.global_variables if id(v) not in stale_variables]
+        return classes_changed
+    
+    def generate_markdown(self, output_file: str):
+        """生成Markdown报告文件
+
+        报告按行流式生成，攒够一批后再写入文件，不在内存中构造完整报告。
+        """
+        if self._needs_link:
+            self._link_types()
+        
+        with self._phase('report'), open(output_file, 'w', encoding='utf-8', buffering=REPORT_BUFFER_SIZE) as f:
+            batch = []
+            for row in self._iter_markdown_rows():
+                batch.append(row)
+                if len(batch) >= REPORT_BATCH_ROWS:
+                    f.write(''.join(batch))
+                    batch.clear()
+            f.write(''.join(batch))
+    
+    def _iter_markdown_rows(self):
+        """按报告顺序生成Markdown报告的每一行
+
+        去重键只包含去重范围内会变化的部分（名称和位置），类方法、成员变量和类方法的
+        局部变量只在所属类内去重，处理完一个类即可丢弃；文件的相对路径按文件ID缓存。
+        """
+        by_name = attrgetter('name')
+        class_paths = sorted(self.classes)
+        
+        rel_paths: Dict[int, str] = {}
+        def position(symbol) -> str:
+            rel_path = rel_paths.get(symbol.file_id)
+            if rel_path is None:
+                rel_path = rel_paths[symbol.file_id] = os.path.relpath(FILE_TABLE.path(symbol.file_id), self.cpp_dir)
+            return f"{rel_path}:{symbol.line}:{symbol.column}"
+        
+        # 写入标题
+        yield '# C++ 代码分析报告\n\n'
+        
+        # 写入类表格
+        yield '## 类\n\n'
+        yield '| 类 | 源文件位置 | 基类 |\n'
+        yield '|---|---|---|\n'
+        for class_path in class_paths:
+            class_obj = self.classes[class_path]
+            # 基类在链接阶段已解析为完整路径
+            base_classes = ', '.join(class_obj.parent_classes) or '-'
+            yield f'| {class_obj.full_path} | {position(class_obj)} | {base_classes} |\n'
+        
+        # 写入方法表格
+        yield '\n## 方法\n\n'
+        yield '| 类 | 方法 | 返回类型 | 源文件位置 |\n'
+        yield '|---|---|---|---|\n'
+        
+        # 类方法
+        for class_path in class_paths:
+            class_obj = self.classes[class_path]
+            processed = set()
+            for method in sorted(class_obj.methods, key=by_name):
+                method_position = position(method)
                 # 避免重复
-                method_key = f"global::{method.name}::{rel_path}:{line}:{col}"
-                if method_key in processed_methods:
+                key = (method.name, method_position)
+                if key in processed:
                     continue
-                processed_methods.add(method_key)
-                
-                f.write(f'| 全局 | {method.name} | {return_type} | {rel_path}:{line}:{col} |\n')
-            
-            # 写入变量表格
-            f.write('\n## 变量\n\n')
-            f.write('| 作用域 | 类/方法 | 变量名 | 变量类型 | 变量位置 |\n')
-            f.write('|---|---|---|---|---|\n')
-            
-            # 类变量
-            for class_path, class_obj in sorted(self.classes.items()):
-                for var in sorted(class_obj.variables, key=lambda v: v.name):
-                    file_path, line, col = var.location
-                    rel_path = os.path.relpath(file_path, self.cpp_dir)
-                    var_type = var.full_type_path
-                    var_key = f"{class_obj.full_path}::{var.name}::{rel_path}:{line}:{col}"
-                    if var_key in processed_variables:
-                        continue
-                    processed_variables.add(var_key)
-                    f.write(f'| 类成员 | {class_obj.full_path} | {var.name} | {var_type} | {rel_path}:{line}:{col} |\n')
-            # 全局变量
-            for var in sorted(self.global_variables, key=lambda v: v.name):
-                file_path, line, col = var.location
-                rel_path = os.path.relpath(file_path, self.cpp_dir)
-                var_type = var.full_type_path
-                var_key = f"global::{var.name}::{rel_path}:{line}:{col}"
-                if var_key in processed_variables:
+                processed.add(key)
+                return_type = method.full_return_type or '-'
+                yield f'| {class_obj.full_path} | {method.name} | {return_type} | {method_position} |\n'
+        
+        # 全局方法
+        processed = set()
+        for method in sorted(self.global_methods, key=by_name):
+            method_position = position(method)
+            key = (method.name, method_position)
+            if key in processed:
+                continue
+            processed.add(key)
+            return_type = method.full_return_type or '-'
+            yield f'| 全局 | {method.name} | {return_type} | {method_position} |\n'
+        
+        # 写入变量表格
+        yield '\n## 变量\n\n'
+        yield '| 作用域 | 类/方法 | 变量名 | 变量类型 | 变量位置 |\n'
+        yield '|---|---|---|---|---|\n'
+        
+        # 类变量
+        for class_path in class_paths:
+            class_obj = self.classes[class_path]
+            processed = set()
+            for var in sorted(class_obj.variables, key=by_name):
+                var_position = position(var)
+                key = (var.name, var_position)
+                if key in processed:
                     continue
-                processed_variables.add(var_key)
-                f.write(f'| 全局 | - | {var.name} | {var_type} | {rel_path}:{line}:{col} |\n')
-            # 方法局部变量
-            for class_path, class_obj in sorted(self.classes.items()):
-                for method in class_obj.methods:
-                    for var in sorted(method.local_variables, key=lambda v: v.name):
-                        file_path, line, col = var.location
-                        rel_path = os.path.relpath(file_path, self.cpp_dir)
-                        var_type = var.full_type_path
-                        var_key = f"local::{class_obj.full_path}::{method.name}::{var.name}::{rel_path}:{line}:{col}"
-                        if var_key in processed_variables:
-                            continue
-                        processed_variables.add(var_key)
-                        f.write(f'| 局部 | {class_obj.full_path}::{method.name} | {var.name} | {var_type} | {rel_path}:{line}:{col} |\n')
-            for method in self.global_methods:
-                for var in sorted(method.local_variables, key=lambda v: v.name):
-                    file_path, line, col = var.location
-                    rel_path = os.path.relpath(file_path, self.cpp_dir)
-                    var_type = var.full_type_path
-                    var_key = f"local::global::{method.name}::{var.name}::{rel_path}:{line}:{col}"
-                    if var_key in processed_variables:
+                processed.add(key)
+                yield f'| 类成员 | {class_obj.full_path} | {var.name} | {var.full_type_path} | {var_position} |\n'
+        
+        # 全局变量
+        processed = set()
+        for var in sorted(self.global_variables, key=by_name):
+            var_position = position(var)
+            key = (var.name, var_position)
+            if key in processed:
+                continue
+            processed.add(key)
+            yield f'| 全局 | - | {var.name} | {var.full_type_path} | {var_position} |\n'
+        
+        # 方法局部变量
+        for class_path in class_paths:
+            class_obj = self.classes[class_path]
+            processed = set()
+            for method in class_obj.methods:
+                for var in sorted(method.local_variables, key=by_name):
+                    var_position = position(var)
+                    key = (method.name, var.name, var_position)
+                    if key in processed:
                         continue
-                    processed_variables.add(var_key)
-                    f.write(f'| 局部 | {method.name} | {var.name} | {var_type} | {rel_path}:{line}:{col} |\n')
+                    processed.add(key)
+                    yield f'| 局部 | {class_obj.full_path}::{method.name} | {var.name} | {var.full_type_path} | {var_position} |\n'
+        processed = set()
+        for method in self.global_methods:
+            for var in sorted(method.local_variables, key=by_name):
+                var_position = position(var)
+                key = (method.name, var.name, var_position)
+                if key in processed:
+                    continue
+                processed.add(key)
+                yield f'| 局部 | {method.name} | {var.name} | {var.full_type_path} | {var_position} |\n'
+
+    def export_jsonl(self, output_file: str):
+        """把符号索引导出为JSONL文件，每行一个JSON对象
+
+        每个对象的kind字段为表名（files、classes、bases、methods、variables），
+        其余字段与SQLite导出中同名表的列相同。
+        """
+        if self._needs_link:
+            self._link_types()
+        
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        with self._phase('export'), open(output_file, 'w', encoding='utf-8', buffering=REPORT_BUFFER_SIZE) as f:
+            batch = []
+            for table, row in self._iter_index_rows():
+                record = {'kind': table}
+                record.update(zip(INDEX_COLUMNS[table], row))
+                batch.append(dumps(record) + '\n')
+                if len(batch) >= REPORT_BATCH_ROWS:
+                    f.write(''.join(batch))
+                    batch.clear()
+            f.write(''.join(batch))
+    
+    def export_sqlite(self, output_file: str):
+        """把符号索引导出为SQLite数据库，已存在的文件会被覆盖
+
+        表结构见INDEX_SCHEMA，名称、完整路径和文件列上建有索引。
+        """
+        if self._needs_link:
+            self._link_types()
+        
+        import sqlite3
+        
+        with self._phase('export'):
+            if os.path.exists(output_file):
+                os.remove(output_file)
+            connection = sqlite3.connect(output_file)
+            try:
+                connection.executescript(INDEX_SCHEMA)
+                statements = {
+                    table: f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+                    for table, columns in INDEX_COLUMNS.items()
+                }
+                batches = {table: [] for table in INDEX_COLUMNS}
+                for table, row in self._iter_index_rows():
+                    batch = batches[table]
+                    batch.append(row)
+                    if len(batch) >= REPORT_BATCH_ROWS:
+                        connection.executemany(statements[table], batch)
+                        batch.clear()
+                for table, batch in batches.items():
+                    connection.executemany(statements[table], batch)
+                # 数据插入完成后再建索引，比逐行维护索引更快
+                connection.executescript(INDEX_INDEXES)
+                connection.commit()
+            finally:
+                connection.close()
+    
+    def _iter_index_rows(self):
+        """按类（按完整路径排序）、全局方法、全局变量的顺序生成符号索引的(表名, 行)
+
+        行中各列的顺序见INDEX_COLUMNS。文件行在文件第一次被引用之前生成，
+        文件ID即FILE_TABLE中的ID，路径为相对于cpp_dir的路径；类、方法和变量的ID
+        按生成顺序从1开始编号。类型列保存源码原文，full_前缀的列为链接后的完整路径。
+        """
+        seen_files = set()
+        method_ids = count(1)
+        variable_ids = count(1)
+        
+        def file_row(symbol):
+            file_id = symbol.file_id
+            if file_id in seen_files:
+                return None
+            seen_files.add(file_id)
+            return ('files', (file_id, os.path.relpath(FILE_TABLE.path(file_id), self.cpp_dir)))
+        
+        def method_rows(method, class_id):
+            row = file_row(method)
+            if row is not None:
+                yield row
+            method_id = next(method_ids)
+            yield ('methods', (method_id, class_id, method.name, method.return_type, method.full_return_type,
+                               method.file_id, method.line, method.column))
+            for var in method.local_variables:
+                yield from variable_rows(var, 'local', class_id, method_id)
+        
+        def variable_rows(var, scope, class_id, method_id):
+            row = file_row(var)
+            if row is not None:
+                yield row
+            yield ('variables', (next(variable_ids), scope, class_id, method_id, var.name, var.type,
+                                 var.full_type_path, var.file_id, var.line, var.column))
+        
+        for class_id, class_path in enumerate(sorted(self.classes), 1):
+            class_obj = self.classes[class_path]
+            row = file_row(class_obj)
+            if row is not None:
+                yield row
+            yield ('classes', (class_id, class_obj.name, class_obj.full_path,
+                               class_obj.file_id, class_obj.line, class_obj.column))
+            for position, (base, full_base) in enumerate(zip(class_obj.base_names, class_obj.parent_classes)):
+                yield ('bases', (class_id, position, base, full_base))
+            for var in class_obj.variables:
+                yield from variable_rows(var, 'member', class_id, None)
+            for method in class_obj.methods:
+                yield from method_rows(method, class_id)
+        
+        for method in self.global_methods:
+            yield from method_rows(method, None)
+        for var in self.global_variables:
+            yield from variable_rows(var, 'global', None, None)
 
     def _debug_print_state(self):
         """打印当前解析器状态的调试信息"""
@@ -521,9 +2642,12 @@ class CppParser:
         for file_path in sorted(self.processed_files):
             print(f"  {os.path.basename(file_path)}")
         
-        print(f"\n类型映射 ({len(self.type_map)}):")
-        for name, full_path in sorted(self.type_map.items()):
-            print(f"  {name} -> {full_path}")
+        resolver = self.resolver
+        print(f"\n类型解析 ({len(resolver.types)} 个类型, {len(resolver.aliases)} 个别名):")
+        for alias, entries in sorted(resolver.aliases.items()):
+            print(f"  {alias} -> {entries[-1][2]}")
+        for (file_id, scope), namespaces in sorted(resolver.directives.items()):
+            print(f"  {os.path.basename(FILE_TABLE.path(file_id))} {scope or '全局'}: using namespace {', '.join(namespaces)}")
         
         print(f"\n类定义 ({len(self.classes)}):")
         for full_path, cls in sorted(self.classes.items()):
@@ -554,109 +2678,519 @@ class CppParser:
         
         print("\n============ 调试结束 ============\n")
 
-    def _fix_missing_namespaces(self):
-        """修复可能缺失的命名空间信息"""
-        # 创建新的类映射，确保所有类都有正确的命名空间
-        new_classes = {}
-        
-        # 先处理类型映射
-        for class_name, full_path in list(self.type_map.items()):
-            if '::' not in full_path and class_name == full_path:
-                # 这里应该尝试找到命名空间
-                # 检查此类的文件路径，尝试分析文件内容寻找命名空间
-                for path, cls in self.classes.items():
-                    if cls.name == class_name:
-                        file_path, line, _ = cls.location
-                        try:
-                            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                lines = f.readlines()
-                                # 检查类定义前的几行，寻找namespace语句
-                                start_line = max(0, line - 10)
-                                end_line = min(len(lines), line + 2)
-                                
-                                current_ns = []
-                                for i in range(start_line, end_line):
-                                    if i < len(lines):
-                                        line_text = lines[i].strip()
-                                        # 检查namespace声明
-                                        if "namespace" in line_text and "{" in line_text:
-                                            ns_match = re.search(r'namespace\s+(\w+)', line_text)
-                                            if ns_match:
-                                                current_ns.append(ns_match.group(1))
-                                
-                                if current_ns:
-                                    # 找到命名空间，更新类路径
-                                    ns_prefix = "::".join(current_ns)
-                                    new_full_path = f"{ns_prefix}::{class_name}"
-                                    self.type_map[class_name] = new_full_path
-                                    print(f"修复命名空间: {class_name} -> {new_full_path}")
-                                    
-                                    # 更新类对象
-                                    cls.full_path = new_full_path
-                                    new_classes[new_full_path] = cls
-                                    continue
-                        except Exception as e:
-                            print(f"尝试修复命名空间时出错: {e}")
+    def _link_types(self):
+        """链接阶段：在所有文件合并完成后统一解析类型和基类的完整路径
+
+        命名空间已在遍历语法树时由命名空间栈确定，这里只需用类型解析器按各符号
+        所在的作用域对所有符号做一次线性扫描，不再重新读取源文件。
+        链接只依赖源码原文的类型名，可以重复执行。
+        """
+        with self._phase('link'):
+            self.resolver.set_included_directives(self._included_directive_files())
+            self._link_symbols(self.classes.values())
+            self._link_symbols(self.global_methods)
+            self._link_symbols(self.global_variables)
+        self._needs_link = False
+    
+    def include_graph(self) -> Dict[str, List[str]]:
+        """返回文件级包含关系图：已解析的文件 -> 它直接包含的已解析文件（按源码顺序）
+
+        引号形式的路径先相对于包含它的文件所在目录查找；找不到时（以及尖括号形式）
+        按路径后缀匹配已解析的文件，有多个匹配时取与包含者路径公共前缀最长的一个。
+        不属于已解析文件的头文件（如标准库）不计入。
+        """
+        if self._include_graph is None:
+            known = {os.path.normpath(path): path for path in self.processed_files}
+            by_basename: Dict[str, List[str]] = {}
+            for path in sorted(self.processed_files):
+                by_basename.setdefault(os.path.basename(path), []).append(path)
             
-            # 如果没有特殊处理，保留原始类
-            if full_path in self.classes:
-                new_classes[full_path] = self.classes[full_path]
-        
-        # 更新类映射
-        if new_classes:
-            self.classes = new_classes
-
-    def _collect_local_variables(self, node, content: bytes, file_path: str, method_obj: Method):
-        """递归收集函数体内的局部变量声明"""
-        if node.type == 'declaration':
-            type_name = None
-            for child in node.children:
-                if child.type in ['primitive_type', 'type_identifier', 'qualified_identifier']:
-                    type_name = content[child.start_byte:child.end_byte].decode('utf-8', errors='ignore')
-                    break
-            if type_name:
-                full_type = type_name
-                if type_name in self.type_map:
-                    full_type = self.type_map[type_name]
-                for child in node.children:
-                    if child.type == 'init_declarator':
-                        for decl_child in child.children:
-                            if decl_child.type == 'identifier':
-                                var_name = content[decl_child.start_byte:decl_child.end_byte].decode('utf-8', errors='ignore')
-                                var = Variable(
-                                    name=var_name,
-                                    type=type_name,
-                                    full_type_path=full_type,
-                                    location=(file_path, decl_child.start_point[0] + 1, decl_child.start_point[1] + 1),
-                                    parent_class=method_obj.name
-                                )
-                                method_obj.local_variables.append(var)
-        # 递归遍历子节点
-        for child in node.children:
-            self._collect_local_variables(child, content, file_path, method_obj)
+            graph = {}
+            for file_path in sorted(self.processed_files):
+                targets = []
+                for include in self.include_map.get(file_path, ()):
+                    target = _resolve_include(file_path, include, known, by_basename)
+                    if target is not None and target != file_path and target not in targets:
+                        targets.append(target)
+                graph[file_path] = targets
+            self._include_graph = graph
+        return self._include_graph
+    
+    def include_order(self) -> List[List[str]]:
+        """按包含关系把已解析的文件分组为强连通分量（互相包含的文件在同一组）
+
+        被包含的分量排在包含它的分量之前，即按依赖的拓扑顺序排列。
+        """
+        graph = self.include_graph()
+        index_of: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack: Set[str] = set()
+        components = []
+        
+        # 迭代实现的Tarjan算法，避免深的包含链触发递归深度限制
+        for root in graph:
+            if root in index_of:
+                continue
+            work = [(root, iter(graph[root]))]
+            index_of[root] = lowlink[root] = len(index_of)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, targets = work[-1]
+                for target in targets:
+                    if target not in index_of:
+                        index_of[target] = lowlink[target] = len(index_of)
+                        stack.append(target)
+                        on_stack.add(target)
+                        work.append((target, iter(graph[target])))
+                        break
+                    if target in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[target])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index_of[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(sorted(component))
+        return components
+    
+    def affected_files(self, file_paths: Iterable[str]) -> List[str]:
+        """返回修改file_paths后受影响的文件：这些文件本身以及直接或间接包含它们的文件"""
+        graph = self.include_graph()
+        included_by: Dict[str, List[str]] = {}
+        for file_path, targets in graph.items():
+            for target in targets:
+                included_by.setdefault(target, []).append(file_path)
+        
+        # 传入的路径与已解析文件的路径写法可能不同（相对或绝对路径）
+        by_abspath = {os.path.abspath(path): path for path in graph}
+        affected = set()
+        pending = [by_abspath.get(os.path.abspath(path), path) for path in file_paths]
+        while pending:
+            path = pending.pop()
+            if path not in affected:
+                affected.add(path)
+                pending.extend(included_by.get(path, ()))
+        return sorted(affected)
+    
+    def _included_directive_files(self) -> Dict[int, Tuple[int, ...]]:
+        """计算每个文件经#include（直接或间接）可见的、含using namespace指令的其他文件
+
+        按include_order的拓扑顺序合并，每个分量只计算一次。
+        """
+        directive_files = self.resolver.directive_files
+        if not directive_files:
+            return {}
+        
+        graph = self.include_graph()
+        reachable: Dict[str, frozenset] = {}
+        for component in self.include_order():
+            members = set(component)
+            visible = set()
+            for path in component:
+                file_id = FILE_TABLE.lookup(path)
+                if file_id in directive_files:
+                    visible.add(file_id)
+                for target in graph[path]:
+                    if target not in members:
+                        visible |= reachable[target]
+            visible = frozenset(visible)
+            for path in component:
+                reachable[path] = visible
+        
+        included = {}
+        for path, visible in reachable.items():
+            if visible:
+                file_id = FILE_TABLE.lookup(path)
+                others = tuple(sorted(visible - {file_id}))
+                if others:
+                    included[file_id] = others
+        return included
+    
+    def _link_symbols(self, symbols):
+        """解析一组类、方法或变量（包括其成员和局部变量）的类型完整路径
+
+        基类在类所在的作用域中解析，成员、类方法的返回类型和局部变量在类的作用域中
+        解析，全局方法和全局变量在其名称所属的命名空间中解析。
+        """
+        resolve = self.resolver.resolve
+        for symbol in symbols:
+            file_id = symbol.file_id
+            if isinstance(symbol, Class):
+                scope = symbol.full_path
+                enclosing = scope.rpartition('::')[0]
+                parent_classes = [resolve(base, enclosing, file_id) for base in symbol.base_names]
+                if parent_classes != symbol.parent_classes:
+                    self.index.rebase(symbol, parent_classes)
+                for var in symbol.variables:
+                    var.full_type_path = resolve(var.type, scope, file_id)
+                methods = symbol.methods
+            else:
+                scope = symbol.name.rpartition('::')[0]
+                if isinstance(symbol, Method):
+                    methods = (symbol,)
+                else:
+                    symbol.full_type_path = resolve(symbol.type, scope, file_id)
+                    continue
+            for method in methods:
+                method.full_return_type = resolve(method.return_type, scope, file_id)
+                for var in method.local_variables:
+                    var.full_type_path = resolve(var.type, scope, file_id)
+
+# 进程内已加载的C++语言及其语言库路径
+_cpp_language: Optional[Tuple[Language, str]] = None
+
+def load_cpp_language() -> Tuple[Language, str]:
+    """加载C++语言，返回(Language, 语言库文件路径)
+
+    优先使用版本为TREE_SITTER_CPP_VERSION的预编译tree_sitter_cpp绑定；
+    没有安装绑定，或绑定版本不一致而本仓库有语法源码时，
+    使用按内容哈希缓存的编译结果，只有缓存不存在时才编译。
+    """
+    global _cpp_language
+    if _cpp_language is None:
+        _cpp_language = _load_binding_language() or _load_built_language()
+    return _cpp_language
+
+# 进程内已编译的符号查询及其源码哈希
+_symbol_query: Optional[Tuple[object, str]] = None
+
+def load_symbol_query() -> Tuple[object, str]:
+    """编译query后端使用的符号查询，返回(Query, 查询源码的sha256)
+
+    编译查询是创建解析器时最耗时的一步，同一进程内只编译一次。
+    """
+    global _symbol_query
+    if _symbol_query is None:
+        with open(SYMBOLS_QUERY_PATH, 'r', encoding='utf-8') as f:
+            query_source = f.read()
+        language, _ = load_cpp_language()
+        _symbol_query = (language.query(query_source), hashlib.sha256(query_source.encode('utf-8')).hexdigest())
+    return _symbol_query
+
+def load_native_extractor():
+    """返回tree_sitter_cpp绑定中的原生符号提取函数，绑定不可用或编译时未启用时返回None
+
+    该函数接收源码字节，返回与walker后端相同的提取记录列表。只有语言同样来自
+    该绑定时才使用，避免两个后端基于不同版本的语法提取。
+    """
+    _, language_path = load_cpp_language()
+    try:
+        from tree_sitter_cpp import _binding
+    except ImportError:
+        return None
+    if language_path != _binding.__file__:
+        return None
+    return getattr(_binding, 'extract_symbols', None)
+
+def _load_binding_language() -> Optional[Tuple[Language, str]]:
+    """从tree_sitter_cpp绑定加载C++语言，绑定不可用时返回None"""
+    try:
+        import tree_sitter_cpp
+        from importlib.metadata import version
+        binding_version = version('tree-sitter-cpp')
+    except Exception:
+        return None
+    
+    if binding_version != TREE_SITTER_CPP_VERSION:
+        if os.path.exists(os.path.join(GRAMMAR_DIR, 'src', 'parser.c')):
+            logger.warning("tree-sitter-cpp绑定版本 %s 与固定版本 %s 不一致，改为使用本地语法源码",
+                           binding_version, TREE_SITTER_CPP_VERSION)
+            return None
+        logger.warning("tree-sitter-cpp绑定版本 %s 与固定版本 %s 不一致", binding_version, TREE_SITTER_CPP_VERSION)
+    
+    capsule = tree_sitter_cpp.language()
+    try:
+        # py-tree-sitter 0.22及以上可以直接从胶囊创建Language
+        language = Language(capsule)
+    except TypeError:
+        # 旧版本只能按符号名从共享库加载，而绑定隐藏了该符号，
+        # 因此取出胶囊中的TSLanguage指针直接填充Language
+        get_pointer = ctypes.pythonapi.PyCapsule_GetPointer
+        get_pointer.restype = ctypes.c_void_p
+        get_pointer.argtypes = [ctypes.py_object, ctypes.c_char_p]
+        language = Language.__new__(Language)
+        language.name = 'cpp'
+        language.lib = tree_sitter_cpp._binding  # 保持绑定模块的引用
+        language.language_id = get_pointer(capsule, b"tree_sitter.Language")
+    return language, tree_sitter_cpp._binding.__file__
+
+def _load_built_language() -> Tuple[Language, str]:
+    """从本仓库语法源码的编译缓存加载C++语言"""
+    language_path = CppParser.build_tree_sitter_lib()
+    return Language(language_path, 'cpp'), language_path
+
+def _tree_sitter_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version('tree_sitter')
+    except Exception:
+        return 'unknown'
+
+def _resolve_include(file_path: str, include: str, known: Dict[str, str],
+                     by_basename: Dict[str, List[str]]) -> Optional[str]:
+    """把#include路径原文解析为已解析的文件，找不到时返回None
+
+    known为规范化路径到已解析文件路径的映射，by_basename按文件名索引已解析的文件。
+    """
+    name = include[1:-1].strip()
+    if not name:
+        return None
+    if include.startswith('"'):
+        candidate = os.path.normpath(os.path.join(os.path.dirname(file_path), name))
+        if candidate in known:
+            return known[candidate]
+    
+    suffix = os.sep + os.path.normpath(name)
+    matches = [path for path in by_basename.get(os.path.basename(name), ()) if path.endswith(suffix)]
+    if not matches:
+        return None
+    return max(matches, key=lambda path: len(os.path.commonprefix([path, file_path])))
+
+def _count_nodes(node) -> int:
+    """用TreeCursor统计以node为根的语法树节点数，只在性能剖析时调用"""
+    cursor = node.walk()
+    nodes = 1
+    while True:
+        if cursor.goto_first_child() or cursor.goto_next_sibling():
+            nodes += 1
+            continue
+        while True:
+            if not cursor.goto_parent():
+                return nodes
+            if cursor.goto_next_sibling():
+                nodes += 1
+                break
+
+def _find_definition(node, point: Tuple[int, int]):
+    """返回node子树中从point开始的function_definition节点，找不到时返回None
+
+    只沿包含point的节点逐层向下，不遍历其余的子树。
+    """
+    cursor = node.walk()
+    while True:
+        current = cursor.node
+        if current.start_point == point and current.type == 'function_definition':
+            return current
+        if not cursor.goto_first_child():
+            return None
+        while cursor.node.end_point <= point:
+            if not cursor.goto_next_sibling():
+                return None
+        if cursor.node.start_point > point:
+            return None
+
+def _cursor_children(cursor):
+    """依次把游标移动到当前节点的每个子节点上并生成该子节点，迭代结束后游标回到当前节点
+
+    不创建子节点列表。调用方必须完整迭代，不能提前break，否则游标不会回到原节点。
+    """
+    if not cursor.goto_first_child():
+        return
+    yield cursor.node
+    while cursor.goto_next_sibling():
+        yield cursor.node
+    cursor.goto_parent()
+
+def _byte_to_point(content: bytes, byte_offset: int) -> Tuple[int, int]:
+    """将字节偏移转换为tree-sitter的(行, 列)坐标，列同样以字节计"""
+    row = content.count(b'\n', 0, byte_offset)
+    line_start = content.rfind(b'\n', 0, byte_offset) + 1
+    return (row, byte_offset - line_start)
+
+def _shift_range(byte_range: Tuple[int, int], start_byte: int, old_end_byte: int,
+                 new_end_byte: int) -> Tuple[int, int]:
+    """把一个字节范围映射到一次编辑之后的坐标，与编辑重叠的部分扩展到整个编辑范围"""
+    def shift(offset, inside):
+        if offset <= start_byte:
+            return offset
+        if offset >= old_end_byte:
+            return offset + new_end_byte - old_end_byte
+        return inside
+    start, end = byte_range
+    return (shift(start, start_byte), shift(end, new_end_byte))
+
+def _shift_offset(offset: int, applied_edits: List[Tuple[int, int, int]]) -> int:
+    """把编辑前的字节偏移映射到编辑后的坐标，位于被替换内容内部时映射到编辑末尾"""
+    for start_byte, old_end_byte, new_end_byte in applied_edits:
+        if offset >= old_end_byte:
+            offset += new_end_byte - old_end_byte
+        elif offset > start_byte:
+            offset = new_end_byte
+    return offset
+
+def _unshift_offset(offset: int, applied_edits: List[Tuple[int, int, int]]) -> int:
+    """把编辑后的字节偏移映射回编辑前的坐标，位于新插入内容内部时映射到被替换内容的末尾"""
+    for start_byte, old_end_byte, new_end_byte in reversed(applied_edits):
+        if offset >= new_end_byte:
+            offset += old_end_byte - new_end_byte
+        elif offset > start_byte:
+            offset = old_end_byte
+    return offset
+
+def _iter_symbol_tree(symbols):
+    """遍历一组符号及其包含的全部方法、成员变量和局部变量"""
+    for symbol in symbols:
+        yield symbol
+        if isinstance(symbol, Class):
+            yield from symbol.variables
+            for method in symbol.methods:
+                yield method
+                yield from method.local_variables
+        elif isinstance(symbol, Method):
+            yield from symbol.local_variables
+
+# 并行模式下每个工作进程独享的解析器实例
+_worker_parser: Optional[CppParser] = None
+
+def _init_worker(cpp_dir: str, cache_dir: Optional[str] = None, backend: str = 'walker',
+                 profile: bool = False, count_nodes: bool = True, depth: str = 'locals'):
+    """工作进程初始化：创建本进程自己的Parser和Language，profile为True时记录各文件耗时"""
+    global _worker_parser
+    _worker_parser = CppParser(cpp_dir, cache_dir=cache_dir, backend=backend,
+                               profiler=Profiler(count_nodes=count_nodes) if profile else None, depth=depth)
+
+def _take_worker_profiles() -> Optional[Dict[str, FileProfile]]:
+    """取出工作进程记录的文件耗时，未启用性能剖析时为None"""
+    profiler = _worker_parser.profiler
+    return profiler.take_files() if profiler is not None else None
+
+def _extract_chunk_in_worker(file_paths: List[str]):
+    """在工作进程中依次解析一组文件，返回(每个文件的提取记录及是否命中缓存, 文件耗时)"""
+    results = [_worker_parser._extract_file(file_path) for file_path in file_paths]
+    return results, _take_worker_profiles()
+
+def _schedule_chunks(file_paths: List[str], sizes: Dict[str, int], jobs: int) -> List[List[str]]:
+    """按文件大小从大到小把文件分成并行解析的任务块
+
+    大文件单独成块并最先提交；小文件合并成块以减少进程间通信，
+    每块的总大小和文件数都有上限，保证各进程的负载在尾部也能均衡。
+    """
+    ordered = sorted(file_paths, key=sizes.__getitem__, reverse=True)
+    max_bytes = max(1, sum(sizes.values()) // (jobs * 16))
+    max_files = max(1, len(file_paths) // (jobs * 4))
+    
+    chunks = []
+    chunk, chunk_bytes = [], 0
+    for path in ordered:
+        if chunk and (chunk_bytes + sizes[path] > max_bytes or len(chunk) >= max_files):
+            chunks.append(chunk)
+            chunk, chunk_bytes = [], 0
+        chunk.append(path)
+        chunk_bytes += sizes[path]
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def _extract_buffer_in_worker(name: str, content: bytes):
+    """在工作进程中解析一段内存中的源码，返回((提取记录, 是否命中缓存), 文件耗时)"""
+    return _worker_parser._extract_content(content, name), _take_worker_profiles()
+
+def configure_logging(verbose: int = 0, quiet: bool = False):
+    """命令行的日志配置：输出到标准错误，quiet只输出错误，verbose为1、2时分别输出INFO和DEBUG"""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    handler.addFilter(_clear_progress_line)
+    if quiet:
+        level = logging.ERROR
+    else:
+        level = (logging.WARNING, logging.INFO, logging.DEBUG)[min(verbose, 2)]
+    logging.basicConfig(level=level, handlers=[handler])
 
 def main():
-    if len(sys.argv) < 2:
-        print("用法: python cpp_parser.py <C++源码目录> [输出Markdown文件]")
-        sys.exit(1)
+    arg_parser = argparse.ArgumentParser(description='解析C++源码并生成Markdown分析报告')
+    arg_parser.add_argument('cpp_dir', help='C++源码目录')
+    arg_parser.add_argument('output_file', nargs='?', default='cpp_analysis.md',
+                            help='输出Markdown文件 (默认: cpp_analysis.md)')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help='并行解析的进程数，0表示使用全部CPU核心 (默认: 1)')
+    arg_parser.add_argument('--cache-dir',
+                            help='解析缓存目录，未变化的文件直接从缓存加载 (默认: 不使用缓存)')
+    arg_parser.add_argument('--backend', choices=EXTRACTION_BACKENDS, default='walker',
+                            help='符号提取后端：walker为逐节点遍历，query为基于tree-sitter查询，'
+                                 'native为绑定中的C函数 (默认: walker)')
+    arg_parser.add_argument('--depth', choices=EXTRACTION_DEPTHS, default='locals',
+                            help='提取深度：declarations只提取类和全局声明，members另外提取类成员，'
+                                 'locals另外提取局部变量；前两者不遍历函数体 (默认: locals)')
+    arg_parser.add_argument('--read-concurrency', type=int, default=0, metavar='N',
+                            help='使用异步流水线解析，同时读取N个文件，适合NFS等高延迟存储 (默认: 0，不使用)')
+    arg_parser.add_argument('--jsonl', metavar='FILE', help='同时把符号索引导出为JSONL文件')
+    arg_parser.add_argument('--sqlite', metavar='FILE', help='同时把符号索引导出为SQLite数据库')
+    arg_parser.add_argument('--affected', nargs='+', metavar='FILE',
+                            help='列出修改这些文件后受影响（直接或间接包含它们）的文件')
+    arg_parser.add_argument('--profile', metavar='FILE',
+                            help='把各阶段耗时、逐文件耗时和最慢的文件以JSON格式写入FILE')
+    arg_parser.add_argument('--profile-top', type=int, default=10, metavar='N',
+                            help='性能剖析中列出的最慢文件和函数数 (默认: 10)')
+    arg_parser.add_argument('--cprofile', choices=PROFILE_PHASES, metavar='PHASE',
+                            help='在指定阶段内启用cProfile，结果写入与--profile同名的.prof文件')
+    arg_parser.add_argument('--tracemalloc', choices=PROFILE_PHASES, metavar='PHASE',
+                            help='在指定阶段内启用tracemalloc，记录峰值内存和分配最多的位置')
+    arg_parser.add_argument('-v', '--verbose', action='count', default=0,
+                            help='输出更多信息：-v显示各阶段和统计信息，-vv显示每个文件和符号')
+    arg_parser.add_argument('-q', '--quiet', action='store_true',
+                            help='只输出错误，不显示进度')
+    args = arg_parser.parse_args()
+    if (args.cprofile or args.tracemalloc) and not args.profile:
+        arg_parser.error('--cprofile和--tracemalloc需要与--profile一起使用')
     
-    cpp_dir = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else 'cpp_analysis.md'
+    cpp_dir = args.cpp_dir
+    output_file = args.output_file
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
     
-    # 编译Tree-sitter语言支持
-    print("编译Tree-sitter C++语言支持...")
-    CppParser.build_tree_sitter_lib()
+    # 日志输出到标准错误，标准输出只保留--affected等命令结果
+    configure_logging(args.verbose, args.quiet)
     
     # 创建解析器并解析代码
-    print(f"开始解析C++代码: {cpp_dir}")
-    parser = CppParser(cpp_dir)
-    parser.parse_directory()
+    logger.info("开始解析C++代码: %s", cpp_dir)
+    profiler = Profiler(args.cprofile, args.tracemalloc) if args.profile else None
+    start = time.perf_counter()
+    parser = CppParser(cpp_dir, cache_dir=args.cache_dir, backend=args.backend, profiler=profiler,
+                       depth=args.depth)
+    if args.read_concurrency > 0:
+        import asyncio
+        asyncio.run(parser.parse_directory_async(jobs=jobs, read_concurrency=args.read_concurrency,
+                                                 progress=not args.quiet))
+    else:
+        parser.parse_directory(jobs=jobs, progress=not args.quiet)
     
     # 生成报告
-    print(f"生成分析报告: {output_file}")
+    logger.info("生成分析报告: %s", output_file)
     parser.generate_markdown(output_file)
     
-    print("完成!")
+    if args.jsonl:
+        logger.info("导出JSONL符号索引: %s", args.jsonl)
+        parser.export_jsonl(args.jsonl)
+    if args.sqlite:
+        logger.info("导出SQLite符号索引: %s", args.sqlite)
+        parser.export_sqlite(args.sqlite)
+    if args.affected:
+        affected = parser.affected_files(args.affected)
+        print(f"受影响的文件 ({len(affected)}):")
+        for file_path in affected:
+            print(f"  {os.path.relpath(file_path, parser.cpp_dir)}")
+    
+    if profiler is not None:
+        summary = {'backend': args.backend, 'depth': args.depth, 'jobs': jobs, 'total_seconds': round(time.perf_counter() - start, 6)}
+        summary.update(profiler.summary(args.profile_top, parser.cpp_dir))
+        if args.cprofile:
+            stats_file = os.path.splitext(args.profile)[0] + '.prof'
+            if profiler.dump_cprofile(stats_file):
+                summary['cprofile']['stats_file'] = stats_file
+        with open(args.profile, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        logger.info("性能剖析结果: %s", args.profile)
+    
+    logger.info("完成!")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
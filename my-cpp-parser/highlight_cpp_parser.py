@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+"""
+根据本仓库的queries/highlights.scm对C++源码做可视范围的语法高亮
+
+每个文档的语法树解析一次后缓存，之后每次只对请求的字节或行范围执行高亮查询，
+结果为紧凑的array('I')，依次存放每个捕获的(起始字节, 结束字节, 捕获编号)，
+捕获编号对应capture_names中的名称。大文件首屏的高亮只需遍历可见的几十行。
+
+与tree-sitter.json的配置一致，C++查询之前拼接tree-sitter-c的基础高亮查询，注释、
+数字、字符串和大部分类型名由它捕获。基础查询从npm安装的node_modules/tree-sitter-c
+或tree_sitter_c Python包中查找，都没有时只使用C++查询，这些节点不会被高亮。
+"""
+import os
+import re
+import importlib.util
+import time
+import logging
+import argparse
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from tree_sitter import Parser
+from cpp_parser import GRAMMAR_DIR, _byte_to_point, configure_logging, load_cpp_language
+
+logger = logging.getLogger('cpp_parser.highlight')
+
+# 本仓库语法的高亮查询
+HIGHLIGHTS_QUERY_PATH = os.path.join(GRAMMAR_DIR, 'queries', 'highlights.scm')
+
+# tree-sitter.json中排在C++查询之前的C语言基础高亮查询（npm开发依赖tree-sitter-c）
+C_HIGHLIGHTS_QUERY_PATH = os.path.join(GRAMMAR_DIR, 'node_modules', 'tree-sitter-c', 'queries', 'highlights.scm')
+
+# 缓存中最多保留语法树的文档数，超过后淘汰最久未使用的文档
+MAX_DOCUMENTS = 64
+
+# 高亮结果中每个捕获占用的元素数
+CAPTURE_STRIDE = 3
+
+# 查询源码中的注释、字符串和捕获名称
+_QUERY_TOKEN = re.compile(r';[^\n]*|"(?:[^"\\]|\\.)*"|@([\w.-]+)')
+
+# 进程内已编译的高亮查询及其捕获名称
+_highlight_query: Optional[Tuple[object, List[str]]] = None
+
+def _highlights_query_path(language_path: str) -> str:
+    """返回与所用语言库匹配的高亮查询：tree_sitter_cpp绑定自带的查询对应绑定的语法版本，
+    本仓库的查询可能引用该版本还没有的节点类型；从本仓库源码编译的语言使用本仓库的查询
+    """
+    bundled = os.path.join(os.path.dirname(language_path), 'queries', 'highlights.scm')
+    return bundled if os.path.exists(bundled) else HIGHLIGHTS_QUERY_PATH
+
+def _c_highlights_query_path() -> Optional[str]:
+    """返回C语言基础高亮查询的路径：先找npm安装的tree-sitter-c，再找tree_sitter_c Python包，都没有时返回None"""
+    if os.path.exists(C_HIGHLIGHTS_QUERY_PATH):
+        return C_HIGHLIGHTS_QUERY_PATH
+    spec = importlib.util.find_spec('tree_sitter_c')
+    if spec is not None and spec.origin is not None:
+        path = os.path.join(os.path.dirname(spec.origin), 'queries', 'highlights.scm')
+        if os.path.exists(path):
+            return path
+    return None
+
+def load_highlight_query() -> Tuple[object, List[str]]:
+    """编译高亮查询，返回(Query, 捕获名称列表)，同一进程内只编译一次
+
+    找到C语言基础查询时拼接在C++查询之前，同一节点的多个捕获以靠前的模式为准。
+    捕获名称按在查询源码中首次出现的顺序编号，与tree-sitter分配的捕获编号一致。
+    """
+    global _highlight_query
+    if _highlight_query is None:
+        language, language_path = load_cpp_language()
+        with open(_highlights_query_path(language_path), 'r', encoding='utf-8') as f:
+            query_source = f.read()
+        query = None
+        c_query_path = _c_highlights_query_path()
+        if c_query_path is None:
+            logger.info("未找到tree-sitter-c的高亮查询，注释、数字和大部分类型名不会被高亮")
+        else:
+            with open(c_query_path, 'r', encoding='utf-8') as f:
+                combined_source = f.read() + '\n' + query_source
+            try:
+                query = language.query(combined_source)
+                query_source = combined_source
+            except (NameError, SyntaxError, ValueError) as e:
+                logger.warning("C语言基础高亮查询与所用语法不兼容，只使用C++查询: %s", e)
+        if query is None:
+            query = language.query(query_source)
+        names = list(dict.fromkeys(match.group(1) for match in _QUERY_TOKEN.finditer(query_source)
+                                   if match.group(1)))
+        _highlight_query = (query, names)
+    return _highlight_query
+
+class Document:
+    """一个文档的源码及其缓存的语法树
+
+    查询游标越过请求的范围后仍会逐个访问根节点剩余的子节点，顶层声明很多时每次查询
+    的耗时与文件大小成正比。因此首次高亮时缓存顶层子节点及其位置，之后二分查找出与
+    范围相交的顶层节点，只在这些节点上执行查询。
+    """
+
+    def __init__(self, content: bytes, parser: Parser, stat: Optional[Tuple[int, int]] = None):
+        self.content = content
+        self.parser = parser
+        self.tree = parser.parse(content)
+        self.stat = stat
+        self._top_level = None
+
+    def top_level(self):
+        """返回(顶层子节点, 起始字节, 结束字节, 起始行, 结束行)，后四项为array('I')"""
+        if self._top_level is None:
+            children = self.tree.root_node.children
+            self._top_level = (
+                children,
+                array('I', [child.start_byte for child in children]),
+                array('I', [child.end_byte for child in children]),
+                array('I', [child.start_point[0] for child in children]),
+                array('I', [child.end_point[0] for child in children]),
+            )
+        return self._top_level
+
+    def edit(self, edits: List[Tuple[int, int, bytes]]):
+        """按顺序应用文本编辑并基于旧语法树增量重新解析
+
+        每项编辑为(起始字节, 原结束字节, 新文本)，偏移量相对于应用了之前各项编辑后的内容。
+        """
+        content = self.content
+        for start_byte, old_end_byte, new_text in edits:
+            new_end_byte = start_byte + len(new_text)
+            new_content = content[:start_byte] + new_text + content[old_end_byte:]
+            self.tree.edit(
+                start_byte=start_byte,
+                old_end_byte=old_end_byte,
+                new_end_byte=new_end_byte,
+                start_point=_byte_to_point(content, start_byte),
+                old_end_point=_byte_to_point(content, old_end_byte),
+                new_end_point=_byte_to_point(new_content, new_end_byte),
+            )
+            content = new_content
+        self.content = content
+        self.tree = self.parser.parse(content, self.tree)
+        self.stat = None
+        self._top_level = None
+
+class Highlighter:
+    """对缓存的文档执行范围受限的高亮查询
+
+    文档以调用方给出的键（通常是文件路径）缓存，最多保留max_documents个语法树。
+    从磁盘读取的文档在修改时间或大小变化后自动重新解析；通过open传入内容的文档
+    只通过edit或再次open更新。
+    """
+
+    def __init__(self, max_documents: int = MAX_DOCUMENTS):
+        language, _ = load_cpp_language()
+        self.parser = Parser()
+        self.parser.set_language(language)
+        self.query, self.capture_names = load_highlight_query()
+        self._capture_ids: Dict[str, int] = {name: index for index, name in enumerate(self.capture_names)}
+        self.max_documents = max_documents
+        self.documents: 'OrderedDict[str, Document]' = OrderedDict()
+
+    def open(self, key: str, content: bytes) -> Document:
+        """解析内存中的内容并以key缓存，替换同一key已有的文档"""
+        return self._store(key, Document(content, self.parser))
+
+    def edit(self, key: str, edits: List[Tuple[int, int, bytes]]) -> Document:
+        """对已缓存的文档应用文本编辑，文档不在缓存中时抛出KeyError"""
+        document = self.documents[key]
+        document.edit(edits)
+        self.documents.move_to_end(key)
+        return document
+
+    def close(self, key: str):
+        """丢弃key对应的文档，不存在时忽略"""
+        self.documents.pop(key, None)
+
+    def document(self, key: str) -> Document:
+        """返回key对应的文档；不在缓存中或磁盘上的文件已变化时从文件路径key读取并解析"""
+        document = self.documents.get(key)
+        if document is not None and document.stat is None:
+            self.documents.move_to_end(key)
+            return document
+        stat = os.stat(key)
+        stat = (stat.st_mtime_ns, stat.st_size)
+        if document is not None and document.stat == stat:
+            self.documents.move_to_end(key)
+            return document
+        with open(key, 'rb') as f:
+            content = f.read()
+        logger.debug("解析文档 %s: %d 字节", key, len(content))
+        return self._store(key, Document(content, self.parser, stat))
+
+    def _store(self, key: str, document: Document) -> Document:
+        self.documents[key] = document
+        self.documents.move_to_end(key)
+        while len(self.documents) > self.max_documents:
+            self.documents.popitem(last=False)
+        return document
+
+    def highlight(self, key: str, start_byte: int = 0, end_byte: Optional[int] = None) -> array:
+        """返回与[start_byte, end_byte)相交的捕获，按起始位置排序
+
+        结果为array('I')，每三个元素为一个捕获的(起始字节, 结束字节, 捕获编号)。
+        同一节点被多个模式捕获时只保留第一个，与tree-sitter高亮的约定一致。
+        """
+        document = self.document(key)
+        if end_byte is None:
+            end_byte = len(document.content)
+        children, starts, ends, _, _ = document.top_level()
+        # 结束位置晚于start_byte且起始位置早于end_byte的顶层节点
+        first = bisect_right(ends, start_byte)
+        last = bisect_left(starts, end_byte, first)
+        return self._pack(self.query.captures(child, start_byte=start_byte, end_byte=end_byte)
+                          for child in children[first:last])
+
+    def highlight_lines(self, key: str, start_row: int, end_row: int) -> array:
+        """返回与第start_row行到第end_row行之前（行号从0开始）相交的捕获，格式同highlight"""
+        document = self.document(key)
+        children, _, _, start_rows, end_rows = document.top_level()
+        # 按行选出的顶层节点可能多出首尾各一个，由查询的行列范围精确过滤
+        first = bisect_left(end_rows, start_row)
+        last = bisect_left(start_rows, end_row, first)
+        return self._pack(self.query.captures(child, start_point=(start_row, 0), end_point=(end_row, 0))
+                          for child in children[first:last])
+
+    def _pack(self, capture_lists) -> array:
+        """把各顶层节点的捕获依次写入一个array('I')，去掉同一节点的重复捕获"""
+        capture_ids = self._capture_ids
+        result = array('I')
+        last_start = last_end = -1
+        for captures in capture_lists:
+            for node, name in captures:
+                start_byte = node.start_byte
+                end_byte = node.end_byte
+                if start_byte == last_start and end_byte == last_end:
+                    continue
+                result.extend((start_byte, end_byte, capture_ids[name]))
+                last_start = start_byte
+                last_end = end_byte
+        return result
+
+def _parse_range(value: str) -> Tuple[int, int]:
+    start, _, end = value.partition(':')
+    return int(start), int(end)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='根据queries/highlights.scm输出C++源码指定范围的高亮捕获')
+    arg_parser.add_argument('file', help='C++源文件')
+    group = arg_parser.add_mutually_exclusive_group()
+    group.add_argument('--lines', type=_parse_range, metavar='START:END',
+                       help='高亮的行范围，行号从0开始，不含END (默认: 0:60)')
+    group.add_argument('--bytes', type=_parse_range, metavar='START:END', help='高亮的字节范围，不含END')
+    arg_parser.add_argument('-v', '--verbose', action='count', default=0, help='-v输出解析和查询的用时')
+    arg_parser.add_argument('-q', '--quiet', action='store_true', help='只输出错误')
+    args = arg_parser.parse_args()
+
+    configure_logging(args.verbose, args.quiet)
+    highlighter = Highlighter()
+    start = time.perf_counter()
+    document = highlighter.document(args.file)
+    parsed = time.perf_counter()
+    if args.bytes is not None:
+        result = highlighter.highlight(args.file, *args.bytes)
+    else:
+        result = highlighter.highlight_lines(args.file, *(args.lines or (0, 60)))
+    finished = time.perf_counter()
+    logger.info("解析 %.1f ms，高亮 %.3f ms，%d 个捕获",
+                (parsed - start) * 1000, (finished - parsed) * 1000, len(result) // CAPTURE_STRIDE)
+
+    for offset in range(0, len(result), CAPTURE_STRIDE):
+        start_byte, end_byte, capture_id = result[offset:offset + CAPTURE_STRIDE]
+        text = document.content[start_byte:end_byte].decode('utf-8', errors='replace')
+        print(f"{start_byte}\t{end_byte}\t{highlighter.capture_names[capture_id]}\t{text!r}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+; 符号提取查询，供CppParser的query后端使用。
+; 容器节点决定其内部捕获属于哪个作用域，其余捕获按所在容器解释为具体符号。
+
+; 容器
+(namespace_definition) @namespace
+(class_specifier) @class
+(struct_specifier) @class
+(function_definition) @function
+(declaration) @declaration
+(field_declaration) @field
+
+; 类与结构体
+(class_specifier name: (type_identifier) @class.name)
+(struct_specifier name: (type_identifier) @class.name)
+(base_class_clause [(type_identifier) (qualified_identifier)] @class.base)
+(class_specifier body: (field_declaration_list) @class.body)
+(struct_specifier body: (field_declaration_list) @class.body)
+
+; 函数与方法
+(function_definition type: [(primitive_type) (type_identifier) (qualified_identifier)] @function.return_type)
+(function_definition declarator: (function_declarator declarator: [(identifier) (field_identifier)] @function.name))
+(function_definition body: (compound_statement) @function.body)
+
+; 成员变量
+(field_declaration type: [(primitive_type) (type_identifier) (qualified_identifier)] @field.type)
+(field_declaration declarator: (field_identifier) @field.name)
+
+; 全局变量与局部变量
+(declaration type: [(primitive_type) (type_identifier) (qualified_identifier)] @variable.type)
+(declaration declarator: (init_declarator declarator: (identifier) @variable.name))
+
+; using指令、using声明、类型别名和命名空间别名，由CppParser._using_entries读取内容
+(using_declaration) @using
+(alias_declaration) @using
+(type_definition) @using
+(namespace_alias_definition) @using
+
+; #include指令，由CppParser._include_path读取路径
+(preproc_include) @include
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+"""
+根据本仓库的queries/tags.scm生成ctags格式的标签文件
+
+对目录中的每个C++源文件执行tags查询，得到类、函数、方法和类型的定义，写出按字节序
+排序的扩展格式标签文件（!_TAG_FILE_SORTED为1），编辑器可以直接二分查找。
+所有标签通过外部归并排序写出，内存占用与源文件总数无关；同时在标签文件旁保存
+各文件的修改时间和大小，再次运行时只重新解析变化的文件，与旧标签文件归并后替换。
+"""
+import os
+import json
+import time
+import heapq
+import logging
+import argparse
+import tempfile
+import contextlib
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from tree_sitter import Parser
+from cpp_parser import GRAMMAR_DIR, SOURCE_EXTENSIONS, Progress, configure_logging, load_cpp_language
+
+logger = logging.getLogger('cpp_parser.tags')
+
+# 生成标签使用的查询
+TAGS_QUERY_PATH = os.path.join(GRAMMAR_DIR, 'queries', 'tags.scm')
+
+# 查询中的定义类型对应的ctags种类
+TAG_KINDS = {'class': b'c', 'function': b'f', 'method': b'f', 'type': b't'}
+
+# 标签文件开头的伪标签，说明格式并声明已按字节序排序
+TAG_HEADER = (
+    b'!_TAG_FILE_FORMAT\t2\t/extended format; --format=1 will not append ;" to lines/\n'
+    b'!_TAG_FILE_SORTED\t1\t/0=unsorted, 1=sorted, 2=foldcase/\n'
+    b'!_TAG_PROGRAM_NAME\ttags_cpp_parser\t//\n'
+)
+
+# 记录各文件修改时间和大小的清单文件，与标签文件同名加上该后缀
+MANIFEST_SUFFIX = '.files.json'
+MANIFEST_VERSION = 1
+
+# 外部排序时内存中最多累积的标签行数，超过后排序写出一个临时有序段
+SORT_BUFFER_LINES = 200000
+
+# 并行生成时每个任务包含的最多文件数
+CHUNK_FILES = 64
+
+# 写文件的缓冲区大小
+WRITE_BUFFER_SIZE = 1 << 20
+
+class ExternalSorter:
+    """按字节序对标签行做外部归并排序
+
+    行先累积在内存中，达到buffer_lines后排序并写出为临时目录中的一个有序段；
+    迭代时把各有序段和内存中剩余的行逐行归并，任何时候只有一个缓冲区的行在内存中。
+    """
+
+    def __init__(self, buffer_lines: int = SORT_BUFFER_LINES, temp_dir: Optional[str] = None):
+        self.buffer_lines = buffer_lines
+        self.temp_dir = temp_dir
+        self.buffer: List[bytes] = []
+        self.runs: List[str] = []
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def extend(self, lines: List[bytes]):
+        self.buffer.extend(lines)
+        self.count += len(lines)
+        if len(self.buffer) >= self.buffer_lines:
+            self._spill()
+
+    def _spill(self):
+        self.buffer.sort()
+        fd, path = tempfile.mkstemp(prefix='cpp_tags_', suffix='.run', dir=self.temp_dir)
+        self.runs.append(path)
+        with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            for line in self.buffer:
+                f.write(line + b'\n')
+        logger.debug("写出第 %d 个有序段: %d 行", len(self.runs), len(self.buffer))
+        self.buffer = []
+
+    def __iter__(self) -> Iterator[bytes]:
+        self.buffer.sort()
+        return heapq.merge(*[_read_lines(path) for path in self.runs], iter(self.buffer))
+
+    def close(self):
+        for path in self.runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.runs = []
+        self.buffer = []
+
+def _read_lines(path: str) -> Iterator[bytes]:
+    """逐行读取文件，去掉行尾的换行符"""
+    with open(path, 'rb') as f:
+        for line in f:
+            yield line[:-1] if line.endswith(b'\n') else line
+
+class TagExtractor:
+    """用tags查询提取单个文件中的标签行"""
+
+    def __init__(self):
+        language, _ = load_cpp_language()
+        self.parser = Parser()
+        self.parser.set_language(language)
+        with open(TAGS_QUERY_PATH, 'r', encoding='utf-8') as f:
+            self.query = language.query(f.read())
+
+    def extract(self, content: bytes, tag_path: bytes) -> List[bytes]:
+        """返回content中定义的标签行，tag_path为写入标签行的文件路径
+
+        同一个定义的名称和作用域捕获都位于定义节点内部，因此捕获按文档顺序处理，
+        每个名称归属于包含它、且尚未得到名称的最内层定义。
+        """
+        tree = self.parser.parse(content)
+        captures = sorted((node.start_byte, -node.end_byte, index, node, name)
+                          for index, (node, name) in enumerate(self.query.captures(tree.root_node)))
+        lines = []
+        # 尚未结束的定义，每项为[结束字节, 种类, 作用域, 是否已有名称]
+        stack = []
+        for start_byte, _, _, node, name in captures:
+            while stack and stack[-1][0] <= start_byte:
+                stack.pop()
+            if name.startswith('definition.'):
+                stack.append([node.end_byte, TAG_KINDS.get(name[11:], name[11:12].encode()), None, False])
+            elif name == 'local.scope':
+                if stack:
+                    stack[-1][2] = content[node.start_byte:node.end_byte]
+            elif name == 'name':
+                for definition in reversed(stack):
+                    if not definition[3]:
+                        definition[3] = True
+                        line = b'%s\t%s\t%d;"\t%s' % (content[node.start_byte:node.end_byte], tag_path,
+                                                      node.start_point[0] + 1, definition[1])
+                        if definition[2] is not None:
+                            line += b'\tclass:' + definition[2]
+                        lines.append(line)
+                        break
+        return lines
+
+    def extract_file(self, file_path: str, tag_path: bytes) -> List[bytes]:
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+        except OSError as e:
+            logger.warning("读取文件 %s 时出错: %s", file_path, e)
+            return []
+        return self.extract(content, tag_path)
+
+# 并行模式下每个工作进程独享的提取器
+_worker_extractor: Optional[TagExtractor] = None
+
+def _init_worker():
+    global _worker_extractor
+    _worker_extractor = TagExtractor()
+
+def _extract_chunk_in_worker(chunk: List[Tuple[str, bytes]]) -> List[bytes]:
+    lines = []
+    for file_path, tag_path in chunk:
+        lines.extend(_worker_extractor.extract_file(file_path, tag_path))
+    return lines
+
+def scan_sources(cpp_dir: str) -> Dict[str, Tuple[int, int]]:
+    """列出目录中的C++源文件及其(修改时间, 大小)"""
+    sources = {}
+    for root, dirs, files in os.walk(cpp_dir):
+        for file in files:
+            if file.endswith(SOURCE_EXTENSIONS):
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                sources[path] = (stat.st_mtime_ns, stat.st_size)
+    return sources
+
+class TagIndex:
+    """一个标签文件及其文件清单
+
+    标签行中的路径相对于标签文件所在的目录，与ctags和编辑器的约定一致。
+    """
+
+    def __init__(self, cpp_dir: str, tag_file: str, jobs: int = 1,
+                 sort_buffer_lines: int = SORT_BUFFER_LINES, progress: bool = False):
+        self.cpp_dir = os.path.abspath(cpp_dir)
+        self.tag_file = os.path.abspath(tag_file)
+        self.manifest_file = self.tag_file + MANIFEST_SUFFIX
+        self.base_dir = os.path.dirname(self.tag_file)
+        self.jobs = jobs
+        self.sort_buffer_lines = sort_buffer_lines
+        self.progress = progress
+
+    def _tag_path(self, file_path: str) -> str:
+        return os.path.relpath(file_path, self.base_dir)
+
+    def update(self, full: bool = False) -> dict:
+        """生成或更新标签文件，返回文件数、重新解析的文件数、删除的文件数、标签数和耗时
+
+        已有标签文件和对应的清单时，只重新解析修改时间或大小变化的文件和新文件，
+        删除的文件和变化文件的旧标签从旧标签文件中过滤掉，与新标签归并后原子替换。
+        full为True或清单不可用时完整生成。
+        """
+        start = time.perf_counter()
+        sources = scan_sources(self.cpp_dir)
+        entries = {self._tag_path(path): stat for path, stat in sources.items()}
+        previous = None if full else self._load_manifest()
+
+        if previous is None:
+            changed = sorted(sources)
+            stale: Set[bytes] = set()
+        else:
+            changed = sorted(path for path, stat in sources.items() if previous.get(self._tag_path(path)) != stat)
+            stale = {os.fsencode(tag_path) for tag_path, stat in previous.items() if entries.get(tag_path) != stat}
+        removed = 0 if previous is None else len(previous.keys() - entries.keys())
+
+        if previous is not None and not stale and not changed:
+            logger.info("标签文件已是最新: %s", self.tag_file)
+            return self._stats(len(sources), 0, 0, None, start)
+
+        with ExternalSorter(self.sort_buffer_lines, self.base_dir) as sorter:
+            with (Progress(len(changed)) if self.progress else contextlib.nullcontext()) as progress:
+                for lines, count in self._extract(changed):
+                    sorter.extend(lines)
+                    if progress is not None:
+                        progress.advance(count)
+            if previous is None:
+                count = self._write(iter(sorter))
+            else:
+                old_lines = _filter_stale(_read_lines(self.tag_file), stale)
+                count = self._write(heapq.merge(old_lines, iter(sorter)))
+        self._save_manifest(entries)
+        return self._stats(len(sources), len(changed), removed, count, start)
+
+    def _stats(self, files: int, parsed: int, removed: int, tags: Optional[int], start: float) -> dict:
+        stats = {'files': files, 'parsed': parsed, 'removed': removed, 'tags': tags,
+                 'seconds': round(time.perf_counter() - start, 3)}
+        logger.info("标签文件 %s: %d 个文件，重新解析 %d 个，删除 %d 个，用时 %.2f 秒",
+                    self.tag_file, files, parsed, removed, stats['seconds'])
+        return stats
+
+    def _extract(self, file_paths: List[str]) -> Iterator[Tuple[List[bytes], int]]:
+        """依次产出每批文件的(标签行, 文件数)，jobs大于1时在进程池中提取，在途的批次不超过jobs的两倍"""
+        items = [(path, os.fsencode(self._tag_path(path))) for path in file_paths]
+        if self.jobs <= 1 or len(items) <= 1:
+            extractor = TagExtractor()
+            for file_path, tag_path in items:
+                yield extractor.extract_file(file_path, tag_path), 1
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+        chunk_size = max(1, min(CHUNK_FILES, len(items) // (self.jobs * 4)))
+        with ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker) as executor:
+            in_flight = deque()
+            for offset in range(0, len(items), chunk_size):
+                chunk = items[offset:offset + chunk_size]
+                in_flight.append((executor.submit(_extract_chunk_in_worker, chunk), len(chunk)))
+                if len(in_flight) >= self.jobs * 2:
+                    future, count = in_flight.popleft()
+                    yield future.result(), count
+            while in_flight:
+                future, count = in_flight.popleft()
+                yield future.result(), count
+
+    def _write(self, lines: Iterable[bytes]) -> int:
+        """写出标签文件：先写入同目录的临时文件再原子替换，读取旧文件的编辑器不会看到不完整的内容"""
+        fd, temp_path = tempfile.mkstemp(prefix='.tags_', dir=self.base_dir)
+        count = 0
+        try:
+            with os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+                f.write(TAG_HEADER)
+                for line in lines:
+                    f.write(line + b'\n')
+                    count += 1
+            os.replace(temp_path, self.tag_file)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return count
+
+    def _load_manifest(self) -> Optional[Dict[str, Tuple[int, int]]]:
+        """读取上次生成时的文件清单，标签文件或清单缺失、格式不符或代码目录不同时返回None"""
+        if not os.path.exists(self.tag_file):
+            return None
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('cpp_dir') != self.cpp_dir:
+            return None
+        return {path: tuple(stat) for path, stat in manifest['files'].items()}
+
+    def _save_manifest(self, entries: Dict[str, Tuple[int, int]]):
+        temp_path = self.manifest_file + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'cpp_dir': self.cpp_dir, 'files': entries}, f)
+        os.replace(temp_path, self.manifest_file)
+
+def _filter_stale(lines: Iterator[bytes], stale: Set[bytes]) -> Iterator[bytes]:
+    """去掉伪标签行和属于stale中文件的标签行"""
+    for line in lines:
+        if line.startswith(b'!_TAG_'):
+            continue
+        fields = line.split(b'\t', 2)
+        if len(fields) > 1 and fields[1] not in stale:
+            yield line
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='根据queries/tags.scm生成排序的ctags标签文件')
+    arg_parser.add_argument('cpp_dir', help='C++源码目录')
+    arg_parser.add_argument('-f', '--output', default='tags', help='标签文件路径 (默认: tags)')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help='并行解析的进程数，0表示使用全部CPU核心 (默认: 1)')
+    arg_parser.add_argument('--full', action='store_true', help='忽略已有的标签文件，完整重新生成')
+    arg_parser.add_argument('--sort-buffer', type=int, default=SORT_BUFFER_LINES, metavar='LINES',
+                            help=f'外部排序时内存中最多保留的标签行数 (默认: {SORT_BUFFER_LINES})')
+    arg_parser.add_argument('-v', '--verbose', action='count', default=0,
+                            help='-v输出统计信息，-vv输出每个临时有序段')
+    arg_parser.add_argument('-q', '--quiet', action='store_true', help='只输出错误，不显示进度')
+    args = arg_parser.parse_args()
+
+    configure_logging(args.verbose, args.quiet)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    index = TagIndex(args.cpp_dir, args.output, jobs=jobs, sort_buffer_lines=args.sort_buffer,
+                     progress=not args.quiet)
+    index.update(full=args.full)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
 #!/usr/bin/env python
 import os
 import sys
+import random
+import shutil
+import logging
 import traceback
-from cpp_parser import CppParser
+from cpp_parser import CppParser, load_native_extractor
+from tags_cpp_parser import TagIndex
+from highlight_cpp_parser import Highlighter
 
 def main():
+    # 显示解析器的逐文件和逐符号日志
+    logging.basicConfig(level=logging.DEBUG, format='%(message)s')
     try:
         # 创建一个测试目录
         test_dir = "test_cpp_files"
@@ -16,11 +23,6 @@ def main():
         create_test_files(test_dir)
         print(f"测试文件创建完成，共创建了 {len(os.listdir(test_dir))} 个文件")
         
-        # 编译Tree-sitter库
-        print("编译Tree-sitter C++语言支持...")
-        CppParser.build_tree_sitter_lib()
-        print("Tree-sitter C++语言库编译完成")
-        
         # 解析测试目录
         print(f"解析测试C++文件...")
         parser = CppParser(test_dir)
@@ -40,12 +42,227 @@ def main():
         else:
             print(f"错误：报告文件 {output_file} 未生成")
         
+        # 验证并行解析的结果与串行解析一致
+        print("使用2个进程并行解析测试C++文件...")
+        parallel_parser = CppParser(test_dir)
+        parallel_parser.parse_directory(jobs=2)
+        parallel_output_file = "test_cpp_analysis_parallel.md"
+        parallel_parser.generate_markdown(parallel_output_file)
+        with open(output_file, encoding='utf-8') as f1, open(parallel_output_file, encoding='utf-8') as f2:
+            if f1.read() == f2.read():
+                print("并行解析结果与串行解析一致")
+            else:
+                print(f"错误：并行解析结果与串行解析不一致，请比较 {output_file} 和 {parallel_output_file}")
+        os.remove(parallel_output_file)
+        
+        # 验证原生提取与walker后端逐个文件生成相同的记录
+        native_extract = load_native_extractor()
+        if native_extract is None:
+            print("tree_sitter_cpp绑定编译时未启用原生提取，跳过native后端一致性检查")
+        else:
+            walker_parser = CppParser(test_dir, backend='walker')
+            mismatched = []
+            for file_name in sorted(os.listdir(test_dir)):
+                with open(os.path.join(test_dir, file_name), 'rb') as f:
+                    content = f.read()
+                tree = walker_parser.parser.parse(content)
+                records = []
+                walker_parser._extract_node(tree.root_node, content, records)
+                if native_extract(content) != records:
+                    mismatched.append(file_name)
+            if mismatched:
+                print(f"错误：native后端与walker后端的提取结果不一致: {', '.join(mismatched)}")
+            else:
+                print("native后端与walker后端的提取结果一致")
+        
+        # 验证只提取签名时按需加载的局部变量与完整提取的一致
+        print("以members深度解析测试C++文件并按需加载局部变量...")
+        members_parser = CppParser(test_dir, depth='members')
+        members_parser.parse_directory()
+        members_parser.link()
+        full_methods = {(m.name, m.location): m for m in parser.global_methods}
+        members_methods = {(m.name, m.location): m for m in members_parser.global_methods}
+        for class_obj in parser.classes.values():
+            full_methods.update(((m.name, m.location), m) for m in class_obj.methods)
+        for class_obj in members_parser.classes.values():
+            members_methods.update(((m.name, m.location), m) for m in class_obj.methods)
+        as_tuples = lambda variables: [(v.name, v.full_type_path, v.location) for v in variables]
+        mismatched = [name for (name, location), method in sorted(members_methods.items())
+                      if as_tuples(members_parser.load_local_variables(method))
+                      != as_tuples(full_methods[(name, location)].local_variables)]
+        if members_methods.keys() != full_methods.keys() or mismatched:
+            print(f"错误：按需加载的局部变量与完整提取不一致: {', '.join(mismatched)}")
+        else:
+            print(f"按需加载的局部变量与完整提取一致（{len(members_methods)} 个方法）")
+        
+        # 验证随机编辑后增量重新索引的结果与完整解析一致
+        print("随机编辑测试C++文件并增量重新索引...")
+        mismatched = check_reindex(test_dir)
+        if mismatched:
+            print(f"错误：增量重新索引的报告与完整解析不一致: {', '.join(mismatched)}")
+        else:
+            print("增量重新索引的报告与完整解析一致")
+        
+        # 验证增量更新的标签文件与完整生成的逐字节相同且保持排序
+        print("生成并增量更新标签文件...")
+        errors = check_tags(test_dir)
+        if errors:
+            print(f"错误：{'; '.join(errors)}")
+        else:
+            print("增量更新的标签文件与完整生成一致且按字节序排序")
+        
+        # 验证只在相交的顶层节点上查询的范围高亮与在整棵语法树上查询的结果相同
+        print("对测试C++文件做范围高亮...")
+        mismatched = check_highlight(test_dir)
+        if mismatched:
+            print(f"错误：范围高亮与整棵语法树的查询结果不一致: {', '.join(mismatched)}")
+        else:
+            print("范围高亮与整棵语法树的查询结果一致")
+        
         print(f"完成! 请查看 {output_file}")
     
     except Exception as e:
         print(f"执行过程中发生错误: {e}")
         traceback.print_exc()
 
+def check_reindex(test_dir, seed=5, trials=6, steps=40):
+    """对测试文件拼接成的源码做多轮随机编辑，每轮结束后比较增量重新索引与完整解析的报告
+
+    编辑包括删除最多200字节和插入多余的括号，用于覆盖错误恢复改变语法树结构的情况。
+    返回报告不一致的轮次描述列表。
+    """
+    reindex_dir = "test_cpp_reindex"
+    os.makedirs(reindex_dir, exist_ok=True)
+    source_paths = [os.path.join(test_dir, name) for name in sorted(os.listdir(test_dir))]
+    source_paths.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'marker-index.h'))
+    source = b''
+    for source_path in source_paths:
+        if os.path.exists(source_path):
+            with open(source_path, 'rb') as f:
+                source += f.read()
+    file_path = os.path.join(reindex_dir, "combined.h")
+    incremental_report = os.path.join(reindex_dir, "incremental.md")
+    full_report = os.path.join(reindex_dir, "full.md")
+    snippets = [b'', b'{', b'}', b'}\n}', b'x', b'namespace q {', b'int g;\n', b'class K { int a; };\n']
+    rng = random.Random(seed)
+    mismatched = []
+    # 每次完整解析都会输出逐符号的调试日志，检查期间关闭
+    logging.disable(logging.DEBUG)
+    try:
+        for trial in range(trials):
+            content = source
+            with open(file_path, 'wb') as f:
+                f.write(content)
+            incremental = CppParser(reindex_dir, backend='walker')
+            incremental.reindex_file(file_path)
+            for step in range(steps):
+                edits = []
+                for _ in range(rng.randint(1, 3)):
+                    start = rng.randint(0, len(content))
+                    end = min(len(content), start + rng.choice([0, 1, 5, 40, 200]))
+                    text = rng.choice(snippets)
+                    edits.append((start, end, text))
+                    content = content[:start] + text + content[end:]
+                incremental.reindex_file(file_path, edits)
+            with open(file_path, 'wb') as f:
+                f.write(content)
+            full = CppParser(reindex_dir, backend='walker')
+            full.reindex_file(file_path)
+            incremental.generate_markdown(incremental_report)
+            full.generate_markdown(full_report)
+            with open(incremental_report, 'rb') as f1, open(full_report, 'rb') as f2:
+                if f1.read() != f2.read():
+                    mismatched.append(f"第{trial}轮")
+    finally:
+        logging.disable(logging.NOTSET)
+        for path in (file_path, incremental_report, full_report):
+            if os.path.exists(path):
+                os.remove(path)
+        os.rmdir(reindex_dir)
+    return mismatched
+
+def check_tags(test_dir):
+    """复制测试文件生成标签文件，修改、新增和删除文件后增量更新，与完整生成的标签文件比较
+
+    排序缓冲区设得很小，使外部排序写出多个有序段。返回发现的问题描述列表。
+    """
+    tags_dir = "test_cpp_tags"
+    source_dir = os.path.join(tags_dir, "src")
+    shutil.rmtree(tags_dir, ignore_errors=True)
+    shutil.copytree(test_dir, source_dir)
+    tag_file = os.path.join(tags_dir, "tags")
+    full_tag_file = os.path.join(tags_dir, "tags_full")
+    errors = []
+    try:
+        TagIndex(source_dir, tag_file, sort_buffer_lines=4).update()
+        
+        # 修改一个文件（同时推后修改时间），新增一个文件，删除一个文件
+        changed_file = os.path.join(source_dir, "person.h")
+        with open(changed_file, "a", encoding='utf-8') as f:
+            f.write("struct Extra {};\n")
+        mtime = os.stat(changed_file).st_mtime
+        os.utime(changed_file, (mtime + 1, mtime + 1))
+        with open(os.path.join(source_dir, "added.h"), "w", encoding='utf-8') as f:
+            f.write("class Added { void m(); };\nnamespace q { void free_fn() {} }\n")
+        os.remove(os.path.join(source_dir, "student.cpp"))
+        
+        stats = TagIndex(source_dir, tag_file, sort_buffer_lines=4).update()
+        if stats['parsed'] != 2 or stats['removed'] != 1:
+            errors.append(f"增量更新应重新解析2个文件、删除1个文件，实际为 {stats['parsed']} 和 {stats['removed']}")
+        TagIndex(source_dir, full_tag_file, sort_buffer_lines=4).update(full=True)
+        with open(tag_file, 'rb') as f1, open(full_tag_file, 'rb') as f2:
+            content = f1.read()
+            if content != f2.read():
+                errors.append("增量更新的标签文件与--full生成的不一致")
+        lines = content.splitlines()
+        if b'!_TAG_FILE_SORTED\t1\t/0=unsorted, 1=sorted, 2=foldcase/' not in lines:
+            errors.append("标签文件缺少!_TAG_FILE_SORTED伪标签")
+        tags = [line for line in lines if not line.startswith(b'!_TAG_')]
+        if tags != sorted(tags):
+            errors.append("标签行没有按字节序排序")
+        names = {line.split(b'\t', 1)[0] for line in tags}
+        paths = {os.path.basename(line.split(b'\t', 2)[1]) for line in tags}
+        if not {b'Added', b'free_fn', b'Extra'} <= names or b'student.cpp' in paths:
+            errors.append("标签文件没有反映修改、新增和删除的文件")
+    finally:
+        shutil.rmtree(tags_dir, ignore_errors=True)
+    return errors
+
+def check_highlight(test_dir):
+    """把测试文件拼接后打开为一个文档，比较若干字节和行范围的高亮与在根节点上执行同一查询的结果
+
+    编辑文档后再比较一次，确认缓存的顶层节点随语法树更新。返回不一致的范围描述列表。
+    """
+    content = b''
+    for name in sorted(os.listdir(test_dir)):
+        with open(os.path.join(test_dir, name), 'rb') as f:
+            content += f.read()
+    highlighter = Highlighter()
+    key = "combined.cpp"
+    highlighter.open(key, content)
+    mismatched = []
+    for round_name in ("编辑前", "编辑后"):
+        document = highlighter.document(key)
+        root = document.tree.root_node
+        size = len(document.content)
+        # 从命名空间内的类定义开始的范围，相交的第一个顶层节点是包含它的命名空间
+        class_start = document.content.index(b'class Student')
+        for start_byte, end_byte in ((0, size), (0, 1), (size // 3, size // 3 + 200),
+                                     (class_start, class_start + 100), (size // 2, size - 10), (size, size)):
+            expected = highlighter._pack([highlighter.query.captures(root, start_byte=start_byte, end_byte=end_byte)])
+            if highlighter.highlight(key, start_byte, end_byte) != expected:
+                mismatched.append(f"{round_name}字节{start_byte}:{end_byte}")
+        rows = root.end_point[0]
+        for start_row, end_row in ((0, 20), (rows // 2, rows // 2 + 5), (rows - 3, rows + 1)):
+            expected = highlighter._pack([highlighter.query.captures(root, start_point=(start_row, 0),
+                                                                     end_point=(end_row, 0))])
+            if highlighter.highlight_lines(key, start_row, end_row) != expected:
+                mismatched.append(f"{round_name}行{start_row}:{end_row}")
+        # 在文件中间插入一个类，之后的顶层节点整体后移
+        middle = content.index(b'\nnamespace', len(content) // 2)
+        highlighter.edit(key, [(middle, middle, b'\nclass Inserted { int value = 1; };\n')])
+    return mismatched
+
 def create_test_files(test_dir):
     """创建测试C++文件"""
     print("创建测试C++文件...")
@@ -5,6 +5,11 @@
 import sys
 import os
 import re
+import json
+import sqlite3
+
+# 与报告同名、可以提供统计信息的符号索引导出文件的扩展名
+INDEX_SUFFIXES = ('.sqlite', '.db', '.jsonl')
 
 def convert_links(content):
     """将文件路径转换为可点击的链接"""
@@ -16,8 +21,38 @@ def convert_links(content):
     pattern = r'(\w+\.[chp]+:\d+:\d+)'
     return re.sub(pattern, replace_path, content)
 
-def view_markdown(file_path):
-    """以正确的编码读取并显示Markdown文件内容"""
+def load_index_stats(index_path):
+    """从cpp_parser导出的SQLite或JSONL符号索引中统计类、方法和变量的数量"""
+    if index_path.endswith('.jsonl'):
+        counts = {'classes': 0, 'methods': 0, 'variables': 0}
+        with open(index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                kind = json.loads(line)['kind']
+                if kind in counts:
+                    counts[kind] += 1
+        return counts
+    
+    connection = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        return {table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ('classes', 'methods', 'variables')}
+    finally:
+        connection.close()
+
+def find_index(file_path):
+    """查找与报告同名的符号索引导出文件，找不到时返回None"""
+    stem = os.path.splitext(file_path)[0]
+    for suffix in INDEX_SUFFIXES:
+        if os.path.exists(stem + suffix):
+            return stem + suffix
+    return None
+
+def view_markdown(file_path, index_path=None):
+    """以正确的编码读取并显示Markdown文件内容
+
+    index_path为符号索引导出文件，未指定时查找与报告同名的导出文件，
+    统计信息优先从中读取，没有导出文件时才从报告表格中估算。
+    """
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
@@ -32,11 +67,17 @@ def view_markdown(file_path):
         print("="*80)
         
         # 输出一些统计信息
-        classes = len(re.findall(r'\|\s+(\w+(?:::\w+)*)\s+\|', content))
-        methods = len(re.findall(r'\|\s+(\w+(?:::\w+)*)\s+\|\s+(\w+)\s+\|', content))
-        variables = len(re.findall(r'\|\s+(\w+(?:::\w+)*)\s+\|\s+(\w+)\s+\|\s+(\w+(?:::\w+)*)', content))
-        
-        print(f"统计信息:")
+        if index_path is None:
+            index_path = find_index(file_path)
+        if index_path is not None:
+            stats = load_index_stats(index_path)
+            classes, methods, variables = stats['classes'], stats['methods'], stats['variables']
+            print(f"统计信息 (来自符号索引 {index_path}):")
+        else:
+            classes = len(re.findall(r'\|\s+(\w+(?:::\w+)*)\s+\|', content))
+            methods = len(re.findall(r'\|\s+(\w+(?:::\w+)*)\s+\|\s+(\w+)\s+\|', content))
+            variables = len(re.findall(r'\|\s+(\w+(?:::\w+)*)\s+\|\s+(\w+)\s+\|\s+(\w+(?:::\w+)*)', content))
+            print(f"统计信息:")
         print(f"- 类数量: {classes}")
         print(f"- 方法数量: {methods}")
         print(f"- 变量数量: {variables}")
@@ -47,9 +88,12 @@ def view_markdown(file_path):
 if __name__ == "__main__":
     # 如果没有提供文件路径参数，默认查看test_cpp_analysis.md
     file_path = sys.argv[1] if len(sys.argv) > 1 else "test_cpp_analysis.md"
+    # 可选的第二个参数指定符号索引导出文件（.sqlite/.db/.jsonl）
+    index_path = sys.argv[2] if len(sys.argv) > 2 else None
     
-    if not os.path.exists(file_path):
-        print(f"错误: 文件 {file_path} 不存在")
-        sys.exit(1)
+    for path in (file_path, index_path):
+        if path is not None and not os.path.exists(path):
+            print(f"错误: 文件 {path} 不存在")
+            sys.exit(1)
     
-    view_markdown(file_path) 
\ No newline at end of file
+    view_markdown(file_path, index_path) 
\ No newline at end of file
@@ -0,0 +1,635 @@
+#!/usr/bin/env python
+"""
+C++解析器的监视模式
+
+启动时完整解析一次代码目录，之后让CppParser的状态常驻内存：监视目录中源文件的新增、
+修改和删除（Linux上使用inotify，不可用时改为轮询文件状态），把一批连续的变化
+（例如git checkout）合并后只重新索引变化的文件，并通过本地套接字响应查询、
+生成报告和导出的请求，调用方不再需要每次重新加载语法和解析整个目录。
+
+请求和响应都是单行JSON，例如：
+
+    {"cmd": "find", "name": "Student"}
+    {"ok": true, "result": [{"kind": "class", "name": "Student", ...}]}
+
+Unix域套接字位于当前用户私有的运行时目录中，权限为0600；TCP端口对本机所有用户可见，
+因此每个请求都要带上启动时生成的令牌，令牌写在运行时目录的令牌文件中。report和export
+只写入--output-dir之内的路径，highlight只读取代码目录之内的文件。
+"""
+import os
+import sys
+import json
+import time
+import hmac
+import errno
+import struct
+import signal
+import socket
+import getpass
+import hashlib
+import secrets
+import argparse
+import contextlib
+import logging
+import selectors
+import tempfile
+import stat as stat_module
+from typing import Dict, List, Optional, Set, Tuple
+from cpp_parser import (CppParser, Class, Method, EXTRACTION_BACKENDS, EXTRACTION_DEPTHS, SOURCE_EXTENSIONS,
+                        configure_logging)
+from highlight_cpp_parser import Highlighter
+
+logger = logging.getLogger('cpp_parser.watch')
+
+# 去抖动：最后一个文件事件之后静默这么久（秒）才开始重新索引
+DEBOUNCE_QUIET = 0.02
+
+# 去抖动：从一批中的第一个事件起最多等待这么久（秒），持续的事件不会无限推迟重新索引
+DEBOUNCE_MAX_DELAY = 0.5
+
+# 轮询模式下两次扫描目录的间隔（秒）
+POLL_INTERVAL = 1.0
+
+# 单个请求的最大长度
+MAX_REQUEST_SIZE = 1 << 20
+
+# highlight请求未指定结束行时高亮的行数
+HIGHLIGHT_LINES = 60
+
+# inotify事件掩码，见inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+# struct inotify_event的定长部分：wd, mask, cookie, len
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+class InotifyWatcher:
+    """基于inotify的目录监视器，通过ctypes调用libc，不依赖第三方包
+
+    每个子目录一个监视描述符，新建或移入的子目录会自动加入监视。
+    read_changes返回变化的路径集合；内核事件队列溢出时返回None，调用方应完整重新扫描。
+    """
+    name = 'inotify'
+    poll_interval = None
+
+    def __init__(self, root: str):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._get_errno = ctypes.get_errno
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = self._get_errno()
+            raise OSError(error, f"inotify_init1失败: {os.strerror(error)}")
+        self._dirs: Dict[int, str] = {}
+        self._add_tree(root)
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def close(self):
+        os.close(self.fd)
+
+    def _add_tree(self, directory: str) -> List[str]:
+        """监视directory及其全部子目录，返回其中已有的源文件（目录新建后、加入监视前写入的文件）"""
+        found = []
+        for root, dirs, files in os.walk(directory):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                logger.warning("无法监视目录 %s: %s", root, os.strerror(self._get_errno()))
+                continue
+            self._dirs[wd] = root
+            found.extend(os.path.join(root, file) for file in files if file.endswith(SOURCE_EXTENSIONS))
+        return found
+
+    def _forget_tree(self, directory: str):
+        """停止监视已移走的目录及其子目录"""
+        prefix = directory + os.sep
+        for wd, path in list(self._dirs.items()):
+            if path == directory or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self.fd, wd)
+                del self._dirs[wd]
+
+    def read_changes(self) -> Optional[Set[str]]:
+        changes = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changes
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+                name = data[offset + _INOTIFY_EVENT.size:offset + _INOTIFY_EVENT.size + length].rstrip(b'\0')
+                offset += _INOTIFY_EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                directory = self._dirs.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self._dirs[wd]
+                    continue
+                if not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        changes.update(self._add_tree(path))
+                    elif mask & IN_MOVED_FROM:
+                        self._forget_tree(path)
+                    # 移走或删除的目录由调用方按路径前缀撤销其中的文件
+                    changes.add(path)
+                elif path.endswith(SOURCE_EXTENSIONS):
+                    changes.add(path)
+
+class PollingWatcher:
+    """轮询目录中源文件的修改时间和大小，在不支持inotify的平台上使用"""
+    name = 'polling'
+
+    def __init__(self, root: str, interval: float = POLL_INTERVAL):
+        self.root = root
+        self.poll_interval = interval
+        self._snapshot = self._scan()
+
+    def fileno(self):
+        return None
+
+    def close(self):
+        pass
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for root, dirs, files in os.walk(self.root):
+            for file in files:
+                if file.endswith(SOURCE_EXTENSIONS):
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def read_changes(self) -> Optional[Set[str]]:
+        snapshot = self._scan()
+        previous, self._snapshot = self._snapshot, snapshot
+        return {path for path in snapshot.keys() | previous.keys() if snapshot.get(path) != previous.get(path)}
+
+def create_watcher(root: str, polling: bool = False, interval: float = POLL_INTERVAL):
+    """创建目录监视器：优先使用inotify，不可用或polling为True时轮询"""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            logger.warning("inotify不可用，改为每 %.1f 秒轮询: %s", interval, e)
+    return PollingWatcher(root, interval)
+
+def runtime_dir() -> str:
+    """当前用户私有的运行时目录，存放套接字和令牌文件
+
+    优先使用XDG_RUNTIME_DIR，否则在临时目录中创建只有当前用户可以访问的子目录。
+    该子目录已存在但属于其他用户或对其他用户开放时抛出RuntimeError，避免在共享的
+    临时目录中使用他人可以预先创建的路径。
+    """
+    base = os.environ.get('XDG_RUNTIME_DIR')
+    if base and os.path.isdir(base):
+        return base
+    directory = os.path.join(tempfile.gettempdir(), f"cpp_parser-{getpass.getuser()}")
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if not stat_module.S_ISDIR(info.st_mode) or (
+            hasattr(os, 'getuid') and (info.st_uid != os.getuid() or info.st_mode & 0o077)):
+        raise RuntimeError(f"运行时目录 {directory} 不属于当前用户或对其他用户开放")
+    return directory
+
+def default_socket_path(cpp_dir: str) -> str:
+    """代码目录对应的默认套接字路径，位于运行时目录中，同一目录的服务端和客户端得到相同的路径"""
+    digest = hashlib.sha1(os.path.abspath(cpp_dir).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(runtime_dir(), f"cpp_parser-{digest}.sock")
+
+def token_file_path(port: int) -> str:
+    """TCP模式下保存访问令牌的文件路径，位于运行时目录中"""
+    return os.path.join(runtime_dir(), f"cpp_parser-{port}.token")
+
+def write_token_file(path: str) -> str:
+    """生成随机访问令牌，写入只有当前用户可读写的令牌文件并返回令牌"""
+    token = secrets.token_hex(16)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w', encoding='ascii') as f:
+        f.write(token)
+    return token
+
+def resolve_inside(path: str, root: str) -> str:
+    """把请求中的路径解析为root之内的真实路径，相对路径相对于root
+
+    符号链接先解析再检查，路径不在root之内时抛出PermissionError。
+    """
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([resolved, root]) != root:
+        raise PermissionError(f"路径 {path} 不在 {root} 之内")
+    return resolved
+
+def symbol_to_json(symbol) -> dict:
+    """把类、方法或变量转换为可序列化为JSON的字典"""
+    file_path, line, column = symbol.location
+    data = {'name': symbol.name, 'file': file_path, 'line': line, 'column': column}
+    if isinstance(symbol, Class):
+        data.update(kind='class', full_path=symbol.full_path, bases=symbol.parent_classes)
+    elif isinstance(symbol, Method):
+        data.update(kind='method', parent_class=symbol.parent_class, return_type=symbol.full_return_type)
+    else:
+        data.update(kind='variable', parent_class=symbol.parent_class, type=symbol.full_type_path)
+    return data
+
+class WatchServer:
+    """监视模式的事件循环：在同一个线程中处理文件变化和套接字请求
+
+    CppParser不是线程安全的，因此文件事件、去抖动后的重新索引和请求处理都在
+    selectors事件循环中串行进行。一批变化从第一个事件起，在静默quiet秒或
+    累计等待max_delay秒后统一重新索引，并立即完成链接，之后的查询不再有额外延迟。
+    """
+
+    def __init__(self, parser: CppParser, watcher, listener: socket.socket,
+                 quiet: float = DEBOUNCE_QUIET, max_delay: float = DEBOUNCE_MAX_DELAY,
+                 output_dir: Optional[str] = None, token: Optional[str] = None):
+        self.parser = parser
+        self.watcher = watcher
+        self.listener = listener
+        self.quiet = quiet
+        self.max_delay = max_delay
+        # report和export只能写入该目录之内；token不为None时每个请求都要带上相同的令牌
+        self.output_dir = os.path.realpath(output_dir or os.getcwd())
+        self.token = token
+        self.selector = selectors.DefaultSelector()
+        self.pending: Set[str] = set()
+        self.first_event: Optional[float] = None
+        self.last_event: Optional[float] = None
+        self.next_poll: Optional[float] = None
+        self.updates = 0
+        self.last_update: Optional[dict] = None
+        self.running = False
+        # 高亮使用的语法树缓存，第一个highlight请求时创建
+        self.highlighter: Optional[Highlighter] = None
+        self._buffers: Dict[socket.socket, bytearray] = {}
+        self._commands = {
+            'status': self._cmd_status,
+            'sync': self._cmd_sync,
+            'find': lambda request: [symbol_to_json(s) for s in self.parser.index.find(request['name'])],
+            'lookup': lambda request: [symbol_to_json(s) for s in self.parser.index.lookup(request['name'])],
+            'file': lambda request: [symbol_to_json(s) for s in
+                                     self.parser.index.symbols_in_file(os.path.abspath(request['path']))],
+            'methods': lambda request: [symbol_to_json(s) for s in self.parser.index.methods_of(request['name'])],
+            'locals': self._cmd_locals,
+            'subclasses': lambda request: [symbol_to_json(s) for s in self.parser.index.subclasses(
+                request['name'], recursive=request.get('recursive', False))],
+            'affected': lambda request: self.parser.affected_files(request['paths']),
+            'report': self._cmd_report,
+            'export': self._cmd_export,
+            'highlight': self._cmd_highlight,
+            'shutdown': self._cmd_shutdown,
+        }
+
+    def serve_forever(self):
+        self.running = True
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ, self._accept)
+        if self.watcher.fileno() is not None:
+            self.selector.register(self.watcher.fileno(), selectors.EVENT_READ, self._on_watcher)
+        else:
+            self.next_poll = time.monotonic() + self.watcher.poll_interval
+        try:
+            while self.running:
+                for key, _ in self.selector.select(self._timeout()):
+                    key.data(key.fileobj)
+                now = time.monotonic()
+                if self.next_poll is not None and now >= self.next_poll:
+                    self._add_changes(self.watcher.read_changes())
+                    self.next_poll = now + self.watcher.poll_interval
+                if self.pending and (now - self.last_event >= self.quiet or now - self.first_event >= self.max_delay):
+                    self._reindex_pending()
+        finally:
+            for client in list(self._buffers):
+                self._close_client(client)
+            self.selector.close()
+
+    def _timeout(self) -> Optional[float]:
+        now = time.monotonic()
+        deadlines = []
+        if self.pending:
+            deadlines.append(min(self.last_event + self.quiet, self.first_event + self.max_delay))
+        if self.next_poll is not None:
+            deadlines.append(self.next_poll)
+        return max(0.0, min(deadlines) - now) if deadlines else None
+
+    def _on_watcher(self, _):
+        self._add_changes(self.watcher.read_changes())
+
+    def _add_changes(self, changes: Optional[Set[str]]):
+        """登记一批文件变化，None表示事件丢失，需要按目录重新扫描全部文件"""
+        if changes is None:
+            logger.warning("文件事件队列溢出，重新扫描整个目录")
+            changes = set(self.parser.processed_files)
+            for root, dirs, files in os.walk(self.parser.cpp_dir):
+                changes.update(os.path.join(root, file) for file in files if file.endswith(SOURCE_EXTENSIONS))
+        if not changes:
+            return
+        now = time.monotonic()
+        if not self.pending:
+            self.first_event = now
+        self.last_event = now
+        self.pending.update(changes)
+
+    def _reindex_pending(self):
+        """重新索引去抖动后的一批变化，并立即完成链接"""
+        paths = set()
+        for path in self.pending:
+            if path.endswith(SOURCE_EXTENSIONS):
+                paths.add(path)
+            elif not os.path.exists(path):
+                # 移走或删除的目录：撤销其中所有已解析的文件
+                prefix = path + os.sep
+                paths.update(known for known in self.parser.processed_files if known.startswith(prefix))
+        first_event = self.first_event
+        self.pending = set()
+
+        start = time.perf_counter()
+        for path in sorted(paths):
+            self.parser.refresh_file(path)
+            if self.highlighter is not None and not os.path.exists(path):
+                self.highlighter.close(path)
+        self.parser.link()
+        elapsed = time.perf_counter() - start
+        self.updates += 1
+        self.last_update = {
+            'files': len(paths),
+            'reindex_ms': round(elapsed * 1000, 3),
+            'latency_ms': round((time.monotonic() - first_event) * 1000, 3),
+        }
+        logger.info("重新索引 %d 个文件，用时 %.1f ms，距第一个文件事件 %.1f ms",
+                    len(paths), self.last_update['reindex_ms'], self.last_update['latency_ms'])
+
+    def _accept(self, listener):
+        try:
+            client, _ = listener.accept()
+        except BlockingIOError:
+            return
+        client.setblocking(False)
+        self._buffers[client] = bytearray()
+        self.selector.register(client, selectors.EVENT_READ, self._on_client)
+
+    def _close_client(self, client: socket.socket):
+        self._buffers.pop(client, None)
+        self.selector.unregister(client)
+        client.close()
+
+    def _on_client(self, client: socket.socket):
+        try:
+            data = client.recv(64 * 1024)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._close_client(client)
+            return
+        buffer = self._buffers[client]
+        buffer += data
+        if len(buffer) > MAX_REQUEST_SIZE:
+            self._send(client, {'ok': False, 'error': '请求过长'})
+            self._close_client(client)
+            return
+        while self.running and b'\n' in buffer:
+            line, _, rest = bytes(buffer).partition(b'\n')
+            buffer[:] = rest
+            if line.strip():
+                self._send(client, self.handle_request(line))
+
+    def _send(self, client: socket.socket, response: dict):
+        data = json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n'
+        client.setblocking(True)
+        try:
+            client.sendall(data)
+        except OSError as e:
+            logger.debug("发送响应失败: %s", e)
+        finally:
+            client.setblocking(False)
+
+    def handle_request(self, line: bytes) -> dict:
+        """处理一行JSON请求，返回响应字典"""
+        try:
+            request = json.loads(line)
+            if self.token is not None and not hmac.compare_digest(
+                    str(request.get('token', '')).encode('utf-8'), self.token.encode('ascii')):
+                return {'ok': False, 'error': '访问令牌无效'}
+            command = self._commands.get(request.get('cmd'))
+            if command is None:
+                return {'ok': False, 'error': f"未知的命令: {request.get('cmd')}，可选: {', '.join(self._commands)}"}
+            if request['cmd'] not in ('status', 'highlight', 'shutdown'):
+                self.parser.link()
+            return {'ok': True, 'result': command(request)}
+        except Exception as e:
+            logger.debug("处理请求 %r 时出错", line, exc_info=True)
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+    def _cmd_status(self, request) -> dict:
+        return {
+            'cpp_dir': self.parser.cpp_dir,
+            'watcher': self.watcher.name,
+            'files': len(self.parser.processed_files),
+            'classes': len(self.parser.classes),
+            'pending': len(self.pending),
+            'updates': self.updates,
+            'last_update': self.last_update,
+        }
+
+    def _cmd_sync(self, request) -> dict:
+        """立即读取尚未处理的文件事件并重新索引，不等待去抖动，返回之后的状态"""
+        self._add_changes(self.watcher.read_changes())
+        if self.next_poll is not None:
+            self.next_poll = time.monotonic() + self.watcher.poll_interval
+        if self.pending:
+            self._reindex_pending()
+        return self._cmd_status(request)
+
+    def _cmd_locals(self, request) -> list:
+        """名为name的各个方法的局部变量，提取深度不含局部变量时在此按需加载"""
+        return [{
+            'method': symbol_to_json(method),
+            'locals': [symbol_to_json(var) for var in self.parser.load_local_variables(method)],
+        } for method in self.parser.index.find(request['name']) if isinstance(method, Method)]
+
+    def _cmd_report(self, request) -> dict:
+        output_file = resolve_inside(request['output'], self.output_dir)
+        start = time.perf_counter()
+        self.parser.generate_markdown(output_file)
+        return {'output': output_file, 'ms': round((time.perf_counter() - start) * 1000, 3)}
+
+    def _cmd_export(self, request) -> dict:
+        output_file = resolve_inside(request['output'], self.output_dir)
+        export = {'jsonl': self.parser.export_jsonl, 'sqlite': self.parser.export_sqlite}[request.get('format', 'jsonl')]
+        start = time.perf_counter()
+        export(output_file)
+        return {'output': output_file, 'ms': round((time.perf_counter() - start) * 1000, 3)}
+
+    def _cmd_highlight(self, request) -> dict:
+        """高亮一个文件的可见范围：指定start_byte时按字节范围，否则按start_line到end_line之前的行
+
+        captures中每三个整数为一个捕获的(起始字节, 结束字节, 捕获编号)，编号对应names中的名称。
+        文件的语法树在请求之间缓存，文件变化后的下一个请求重新解析。
+        """
+        if self.highlighter is None:
+            self.highlighter = Highlighter()
+        path = resolve_inside(request['path'], self.parser.cpp_dir)
+        if 'start_byte' in request:
+            captures = self.highlighter.highlight(path, request['start_byte'], request.get('end_byte'))
+        else:
+            start_line = request.get('start_line', 0)
+            captures = self.highlighter.highlight_lines(path, start_line,
+                                                        request.get('end_line', start_line + HIGHLIGHT_LINES))
+        return {'names': self.highlighter.capture_names, 'captures': captures.tolist()}
+
+    def _cmd_shutdown(self, request) -> dict:
+        self.running = False
+        return {'stopping': True}
+
+def open_listener(socket_path: Optional[str], port: Optional[int]) -> socket.socket:
+    """创建本地监听套接字：指定port时监听127.0.0.1上的TCP端口，否则使用权限为0600的Unix域套接字"""
+    if port is not None:
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(('127.0.0.1', port))
+    else:
+        if os.path.exists(socket_path):
+            # 上次异常退出遗留的套接字文件可以删除，仍有服务端在监听时报错
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+            except OSError as e:
+                if e.errno not in (errno.ECONNREFUSED, errno.ENOENT):
+                    raise
+                os.remove(socket_path)
+            else:
+                raise RuntimeError(f"已有监视进程在 {socket_path} 上运行")
+            finally:
+                probe.close()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # 套接字文件在bind时创建，先收紧umask，避免出现其他用户可以连接的时间窗口
+        old_umask = os.umask(0o177)
+        try:
+            listener.bind(socket_path)
+        finally:
+            os.umask(old_umask)
+    listener.listen(16)
+    return listener
+
+def send_request(request: dict, socket_path: Optional[str] = None, port: Optional[int] = None,
+                 timeout: float = 60.0) -> dict:
+    """向监视进程发送一个请求并返回响应，TCP模式下请求未带令牌时从令牌文件读取"""
+    if port is not None:
+        if 'token' not in request:
+            with open(token_file_path(port), encoding='ascii') as f:
+                request = dict(request, token=f.read().strip())
+        client = socket.create_connection(('127.0.0.1', port), timeout=timeout)
+    else:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.settimeout(timeout)
+        client.connect(socket_path)
+    with client:
+        client.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+        data = bytearray()
+        while not data.endswith(b'\n'):
+            chunk = client.recv(64 * 1024)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='监视C++代码目录并常驻内存响应查询')
+    arg_parser.add_argument('cpp_dir', help='C++源码目录')
+    arg_parser.add_argument('--socket', metavar='PATH',
+                            help='Unix域套接字路径 (默认: 临时目录中按代码目录命名的套接字)')
+    arg_parser.add_argument('--port', type=int,
+                            help='改为监听127.0.0.1上的TCP端口（不支持Unix域套接字的平台），请求需要带上令牌文件中的令牌')
+    arg_parser.add_argument('--output-dir', metavar='DIR',
+                            help='report和export命令只能写入该目录之内，相对路径也相对于该目录 (默认: 当前目录)')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=1,
+                            help='初次解析的进程数，0表示使用全部CPU核心 (默认: 1)')
+    arg_parser.add_argument('--cache-dir', help='解析缓存目录 (默认: 不使用缓存)')
+    arg_parser.add_argument('--backend', choices=EXTRACTION_BACKENDS, default='walker',
+                            help='符号提取后端 (默认: walker)')
+    arg_parser.add_argument('--depth', choices=EXTRACTION_DEPTHS, default='locals',
+                            help='提取深度，不含局部变量时可以通过locals命令按方法加载 (默认: locals)')
+    arg_parser.add_argument('--poll', action='store_true', help='不使用inotify，改为轮询文件状态')
+    arg_parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL,
+                            help=f'轮询间隔秒数 (默认: {POLL_INTERVAL})')
+    arg_parser.add_argument('--debounce', type=float, default=DEBOUNCE_QUIET * 1000,
+                            help=f'文件事件静默多少毫秒后重新索引 (默认: {DEBOUNCE_QUIET * 1000:.0f})')
+    arg_parser.add_argument('--send', metavar='JSON',
+                            help='作为客户端向运行中的监视进程发送一个请求并输出响应，例如 \'{"cmd": "status"}\'')
+    arg_parser.add_argument('-v', '--verbose', action='count', default=0,
+                            help='-v输出每次重新索引的耗时，-vv输出每个文件')
+    arg_parser.add_argument('-q', '--quiet', action='store_true', help='只输出错误')
+    args = arg_parser.parse_args()
+
+    socket_path = None
+    if args.port is None:
+        socket_path = args.socket or default_socket_path(args.cpp_dir)
+
+    if args.send:
+        response = send_request(json.loads(args.send), socket_path, args.port)
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+        sys.exit(0 if response.get('ok') else 1)
+
+    configure_logging(args.verbose, args.quiet)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    parser = CppParser(args.cpp_dir, cache_dir=args.cache_dir, backend=args.backend, depth=args.depth)
+    # 先开始监视再做初次解析，解析期间发生的变化不会丢失
+    watcher = create_watcher(parser.cpp_dir, args.poll, args.poll_interval)
+    parser.parse_directory(jobs=jobs, progress=not args.quiet)
+    parser.link()
+
+    listener = open_listener(socket_path, args.port)
+    token_file = token = None
+    if args.port is not None:
+        token_file = token_file_path(args.port)
+        token = write_token_file(token_file)
+    server = WatchServer(parser, watcher, listener, quiet=args.debounce / 1000,
+                         output_dir=args.output_dir, token=token)
+    # 空闲时事件循环阻塞在select中，信号处理函数返回后select会被自动重试（PEP 475），
+    # 只修改running不会让循环退出，因此抛出SystemExit，由下面的finally清理套接字文件
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.warning("正在监视 %s（%s），已索引 %d 个文件，监听 %s",
+                   parser.cpp_dir, watcher.name, len(parser.processed_files),
+                   f"127.0.0.1:{args.port}" if args.port is not None else socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        watcher.close()
+        for path in (socket_path, token_file):
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+if __name__ == "__main__":
+    main()
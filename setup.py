@@ -1,3 +1,4 @@
+from os import environ
 from os.path import isdir, join
 from platform import system
 
@@ -6,6 +7,28 @@ from setuptools.command.build import build
 from wheel.bdist_wheel import bdist_wheel
 
 
+# The optional extract_symbols() entry point parses with the tree-sitter runtime
+# itself, so it is only built when TREE_SITTER_LIB points at the runtime's lib
+# directory (the one containing src/lib.c and include/tree_sitter/api.h).
+runtime = environ.get("TREE_SITTER_LIB")
+sources = [
+    "bindings/python/tree_sitter_cpp/binding.c",
+    "src/parser.c",
+    "src/scanner.c",
+]
+include_dirs = ["src"]
+define_macros = [
+    ("Py_LIMITED_API", "0x03090000"),
+    ("PY_SSIZE_T_CLEAN", None),
+    ("TREE_SITTER_HIDE_SYMBOLS", None),
+]
+if runtime:
+    sources.append(join(runtime, "src", "lib.c"))
+    # Ahead of src, so the runtime keeps its own copy of tree_sitter/parser.h
+    include_dirs[:0] = [join(runtime, "include"), join(runtime, "src")]
+    define_macros += [("TREE_SITTER_CPP_EXTRACT", None), ("_DEFAULT_SOURCE", None)]
+
+
 class Build(build):
     def run(self):
         if isdir("queries"):
@@ -33,11 +56,7 @@ setup(
     ext_modules=[
         Extension(
             name="_binding",
-            sources=[
-                "bindings/python/tree_sitter_cpp/binding.c",
-                "src/parser.c",
-                "src/scanner.c",
-            ],
+            sources=sources,
             extra_compile_args=[
                 "-std=c11",
                 "-fvisibility=hidden",
@@ -45,12 +64,8 @@ setup(
                 "/std:c11",
                 "/utf-8",
             ],
-            define_macros=[
-                ("Py_LIMITED_API", "0x03090000"),
-                ("PY_SSIZE_T_CLEAN", None),
-                ("TREE_SITTER_HIDE_SYMBOLS", None),
-            ],
-            include_dirs=["src"],
+            define_macros=define_macros,
+            include_dirs=include_dirs,
             py_limited_api=True,
         )
     ],